@@ -10,88 +10,184 @@ from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_LEFT
 import io
 import base64
+import hashlib
+import math
+import os
+import time
+from services import binning, bitmap_index, excel_reader, export, ingestion, profiling, serialization, tree_engine, tree_estimate, parallel_tree, value_index
+from services.dataset_store import dataset_store
+from services.tree_cache import tree_cache
 # Imports matplotlib supprimés - les diagrammes sont maintenant générés côté frontend
 
-# Stockage temporaire en mémoire
-uploaded_files = {}
+# Taille des blocs lus lors de l'upload
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Lignes lues pour l'aperçu
+PREVIEW_ROWS = 5
+# Au-delà de cette taille, l'aperçu est renvoyé avant la lecture complète (faite en arrière-plan)
+INSTANT_PREVIEW_MIN_BYTES = int(os.getenv("INSTANT_PREVIEW_MIN_BYTES", str(1024 * 1024)))
 
-async def preview_excel(file):
-    if not file.filename.endswith((".xls", ".xlsx")):
-        return {"error": "Le fichier doit être un Excel (.xls ou .xlsx)"}
-    
-    df = pd.read_excel(file.file)
-    df = df.replace([np.nan, np.inf, -np.inf], None)
+def _parse_upload(buffer: io.BytesIO, filename: str,
+                  sheet_name: Optional[str] = None) -> Tuple[pd.DataFrame, str, Dict[str, Any]]:
+    df, engine = ingestion.read_table(buffer, filename, sheet_name)
+    df, memory = ingestion.optimize_dtypes(df)
+    return df, engine, memory
+
+def _json_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Lignes du DataFrame en dictionnaires sérialisables (valeurs manquantes -> None)."""
+    return df.astype(object).where(df.notna(), None).to_dict(orient="records")
+
+def preview_excel(file, sheet_name: Optional[str] = None):
+    if ingestion.file_kind(file.filename) is None:
+        return {"error": "Le fichier doit être un Excel (.xls ou .xlsx), un CSV ou un Parquet"}
+
+    # Hash calculé pendant la lecture du flux, par blocs
+    buffer = io.BytesIO()
+    hasher = hashlib.sha256()
+    for chunk in iter(lambda: file.file.read(UPLOAD_CHUNK_SIZE), b""):
+        hasher.update(chunk)
+        buffer.write(chunk)
+    content_hash = hasher.hexdigest()
+    size = buffer.tell()
+
+    # Classeur : feuille choisie (par défaut la première)
+    sheets = ingestion.list_sheets(buffer, file.filename)
+    if sheet_name and sheet_name not in sheets:
+        return {"error": f"Feuille '{sheet_name}' introuvable. Feuilles disponibles: {sheets}"}
+    if sheet_name and sheet_name != sheets[0]:
+        # Chaque feuille est un jeu de données distinct pour le cache
+        content_hash = hashlib.sha256(f"{content_hash}:{sheet_name}".encode("utf-8")).hexdigest()
+    sheet_name = sheet_name or (sheets[0] if sheets else None)
+
+    # Même contenu déjà analysé : pas de nouveau parsing
+    parse_ms = None
+    engine = None
+    memory = None
+    df = dataset_store.find_by_hash(content_hash)
+    cache_hit = df is not None
 
-    uploaded_files[file.filename] = df
+    if not cache_hit and sheets and size >= INSTANT_PREVIEW_MIN_BYTES:
+        # Gros classeur : en-tête et premières lignes tout de suite, lecture complète en arrière-plan
+        buffer.seek(0)
+        head, declared_rows = excel_reader.read_preview(buffer, file.filename, PREVIEW_ROWS, sheet_name)
+        if head is not None:
+            dataset_store.load_async(
+                file.filename, lambda: _parse_upload(buffer, file.filename, sheet_name)[0], content_hash
+            )
+            tree_cache.invalidate(file.filename)
+            return {
+                "filename": file.filename,
+                "rows": int(declared_rows),  # Nombre déclaré par le classeur
+                "columns": head.columns.tolist(),
+                "preview": _json_records(head.head(PREVIEW_ROWS)),
+                "sheets": sheets,
+                "sheet_name": sheet_name,
+                "cache_hit": False,
+                "parse_ms": None,
+                "parse_engine": None,
+                "parse_status": "loading",
+                "memory": None
+            }
+
+    if not cache_hit:
+        started = time.perf_counter()
+        df, engine, memory = _parse_upload(buffer, file.filename, sheet_name)
+        parse_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    dataset_store.put(file.filename, df, content_hash)
+    tree_cache.invalidate(file.filename)
 
     return {
         "filename": file.filename,
         "rows": int(len(df)),  # Convertir en int natif
         "columns": df.columns.tolist(),
-        "preview": df.head(5).to_dict(orient="records")
+        "preview": _json_records(df.head(PREVIEW_ROWS)),
+        "sheets": sheets,
+        "sheet_name": sheet_name,
+        "cache_hit": cache_hit,
+        "parse_ms": parse_ms,
+        "parse_engine": engine,
+        "parse_status": "done",
+        "memory": memory  # Empreinte mémoire avant/après compactage des types
     }
 
+def get_ingestion_stats():
+    """Statistiques du cache des types CSV."""
+    return {"dtype_cache": ingestion.dtype_cache.stats()}
+
 def _is_numeric_series(series: pd.Series) -> bool:
     try:
         return pd.api.types.is_numeric_dtype(series)
     except Exception:
         return False
 
-async def get_column_stats(filename: str):
+def _compute_column_stats(col: Any, series: pd.Series) -> Dict[str, Any]:
+    is_num = _is_numeric_series(series)
+    unique_count = int(series.nunique(dropna=True))
+    min_val = None
+    max_val = None
+    if is_num and unique_count > 0:
+        try:
+            numeric = pd.to_numeric(series, errors='coerce')
+            min_val = float(numeric.min())
+            max_val = float(numeric.max())
+        except Exception:
+            pass
+    return {
+        "column": str(col),
+        "is_numeric": bool(is_num),
+        "unique_count": unique_count,
+        "min": min_val,
+        "max": max_val,
+    }
+
+def _column_stats(filename: str, df: pd.DataFrame, col: Any) -> Dict[str, Any]:
+    """Statistiques de la colonne, calculées une fois puis mémorisées avec le jeu de données."""
+    return dataset_store.derived(filename, ("column_stats", col), lambda: _compute_column_stats(col, df[col]))
+
+def get_column_stats(filename: str):
     """
     Retourne pour chaque colonne: nom, is_numeric, unique_count, min, max.
+    Les statistiques sont calculées une fois par colonne puis mémorisées avec le jeu de données.
     """
-    if filename not in uploaded_files:
+    df = dataset_store.get(filename)
+    if df is None:
         return {"error": "Fichier non trouvé. Faites d'abord /excel/preview."}
 
-    df = uploaded_files[filename]
-
-    stats = []
-    for col in df.columns:
-        series = df[col]
-        is_num = _is_numeric_series(series)
-        unique_count = int(series.nunique(dropna=True))
-        min_val = None
-        max_val = None
-        if is_num and unique_count > 0:
-            try:
-                min_val = float(pd.to_numeric(series, errors='coerce').min())
-                max_val = float(pd.to_numeric(series, errors='coerce').max())
-            except Exception:
-                pass
-        stats.append({
-            "column": str(col),
-            "is_numeric": bool(is_num),
-            "unique_count": unique_count,
-            "min": min_val,
-            "max": max_val,
-        })
+    stats = [_column_stats(filename, df, col) for col in df.columns]
 
     return {"filename": str(filename), "stats": stats}
 
-def _format_bin_label(left: float, right: float, is_last: bool) -> str:
-    # Etiquette avec borne gauche incluse, borne droite ouverte sauf le dernier intervalle
-    if is_last:
-        return f"[{_trim_float(left)}–{_trim_float(right)}]"
-    return f"[{_trim_float(left)}–{_trim_float(right)}["
+def profile_columns(filename: str, columns: Optional[List[str]] = None, top_k: int = 10,
+                    bins: int = 20, sample: bool = False):
+    """
+    Profil détaillé des colonnes (valeurs manquantes, quantiles, fréquences, histogrammes).
+    En mode échantillonné, les jeux de plus de PROFILE_SAMPLE_ROWS lignes sont profilés sur un échantillon.
+    """
+    df = dataset_store.get(filename)
+    if df is None:
+        return {"error": "Fichier non trouvé. Faites d'abord /excel/preview."}
+    if columns:
+        missing = [col for col in columns if col not in df.columns]
+        if missing:
+            return {"error": f"Colonnes introuvables: {missing}"}
+    if top_k < 1 or bins < 1:
+        return {"error": "top_k et bins doivent être > 0"}
 
-def _trim_float(x: float) -> str:
-    # Supprimer .0 inutiles, limiter à 6 décimales pour propreté
-    try:
-        s = ("%f" % x).rstrip('0').rstrip('.')
-        if s == "-0":
-            s = "0"
-        return s
-    except Exception:
-        return str(x)
+    result = profiling.profile_dataframe(df, columns or None, top_k=top_k, bins=bins, sample=sample)
+    return {"filename": str(filename), **result}
 
-async def bin_variable(filename: str, source_column: str, bin_size: float, new_column_name: Optional[str] = None):
+def bin_variable(filename: str, source_column: str, bin_size: float, new_column_name: Optional[str] = None):
     """
     Crée une colonne discrétisée (binning) à partir d'une colonne numérique.
     Intervalles: largeur = bin_size, bornes alignées floor(min/bin)*bin ... ceil(max/bin)*bin
     Borne gauche incluse, borne droite ouverte, sauf le dernier intervalle qui inclut la borne droite.
     """
-    if filename not in uploaded_files:
+    with dataset_store.writing(filename):
+        return _bin_variable(filename, source_column, bin_size, new_column_name)
+
+def _bin_variable(filename: str, source_column: str, bin_size: float, new_column_name: Optional[str]):
+    df = dataset_store.get(filename)
+    if df is None:
         return {"error": "Fichier non trouvé. Faites d'abord /excel/preview."}
 
     if bin_size is None:
@@ -100,10 +196,9 @@ async def bin_variable(filename: str, source_column: str, bin_size: float, new_c
         bin_size_val = float(bin_size)
     except Exception:
         return {"error": "bin_size invalide"}
-    if bin_size_val <= 0:
-        return {"error": "bin_size doit être > 0"}
+    if not (math.isfinite(bin_size_val) and bin_size_val > 0):
+        return {"error": "bin_size doit être un nombre fini > 0"}
 
-    df = uploaded_files[filename]
     if source_column not in df.columns:
         return {"error": f"Colonne '{source_column}' introuvable"}
 
@@ -119,7 +214,6 @@ async def bin_variable(filename: str, source_column: str, bin_size: float, new_c
     s_min = float(valid.min())
     s_max = float(valid.max())
 
-    import math, numpy as np
     start = math.floor(s_min / bin_size_val) * bin_size_val
     end = math.ceil(s_max / bin_size_val) * bin_size_val
     # Ajouter un epsilon à la dernière borne pour inclure le max dans le dernier intervalle
@@ -134,7 +228,7 @@ async def bin_variable(filename: str, source_column: str, bin_size: float, new_c
         left = float(edges[i])
         right = float(edges[i + 1])
         is_last = (i == len(edges) - 2)
-        labels.append(_format_bin_label(left, right if is_last else right, is_last))
+        labels.append(binning.format_label(left, right if is_last else right, is_last))
 
     try:
         binned = pd.cut(series, bins=edges, right=False, include_lowest=True, labels=labels)
@@ -143,15 +237,18 @@ async def bin_variable(filename: str, source_column: str, bin_size: float, new_c
         binned = pd.cut(series, bins=edges, right=True, include_lowest=True, labels=labels)
 
     # Déterminer nom de colonne
-    base_name = new_column_name.strip() if new_column_name else f"{str(source_column)}_bin_{_trim_float(bin_size_val)}"
+    base_name = new_column_name.strip() if new_column_name else f"{str(source_column)}_bin_{binning.trim_float(bin_size_val)}"
     new_name = base_name
     suffix = 1
     while new_name in df.columns:
         new_name = f"{base_name}_{suffix}"
         suffix += 1
 
+    # Nouvelle version du jeu (le DataFrame publié n'est pas modifié)
+    df = df.copy(deep=False)
     df[new_name] = binned.astype(str)
-    uploaded_files[filename] = df
+    dataset_store.replace(filename, df, [new_name])
+    tree_cache.invalidate(filename)
 
     # Retourner résumé
     unique_bins = sorted([str(x) for x in df[new_name].dropna().unique()])
@@ -165,27 +262,136 @@ async def bin_variable(filename: str, source_column: str, bin_size: float, new_c
         "bins": unique_bins,
     }
 
-async def drop_columns(filename: str, columns: List[str]):
-    """Supprime des colonnes du DataFrame si elles existent."""
-    if filename not in uploaded_files:
+def _unique_column_name(df: pd.DataFrame, base_name: str, taken: List[str]) -> str:
+    new_name = base_name
+    suffix = 1
+    while new_name in df.columns or new_name in taken:
+        new_name = f"{base_name}_{suffix}"
+        suffix += 1
+    return new_name
+
+def bin_variables(filename: str, columns: List[str], strategy: str = "width",
+                  n_bins: Optional[int] = None, bin_size: Optional[float] = None,
+                  edges: Optional[List[float]] = None, suffix: Optional[str] = None):
+    """
+    Discrétise plusieurs colonnes numériques en une requête.
+    Stratégies : "width" (pas bin_size, ou n_bins intervalles égaux), "quantile" (n_bins
+    intervalles d'effectifs proches), "edges" (bornes explicites, communes à toutes les colonnes).
+    Chaque nouvelle colonne est un Categorical ordonné. Aucune colonne n'est créée si l'une échoue.
+    """
+    with dataset_store.writing(filename):
+        return _bin_variables(filename, columns, strategy, n_bins, bin_size, edges, suffix)
+
+def _bin_variables(filename: str, columns: List[str], strategy: str, n_bins: Optional[int],
+                   bin_size: Optional[float], edges: Optional[List[float]], suffix: Optional[str]):
+    df = dataset_store.get(filename)
+    if df is None:
         return {"error": "Fichier non trouvé. Faites d'abord /excel/preview."}
-    df = uploaded_files[filename]
-    removed = []
-    for col in columns:
-        if col in df.columns:
-            try:
-                del df[col]
-                removed.append(str(col))
-            except Exception:
-                pass
-    uploaded_files[filename] = df
+    if not columns:
+        return {"error": "Aucune colonne à discrétiser"}
+    if strategy not in binning.STRATEGIES:
+        return {"error": f"Stratégie invalide: {strategy} (attendu: {', '.join(binning.STRATEGIES)})"}
+
+    if strategy == "edges":
+        try:
+            edges_val = np.unique(np.asarray(edges or [], dtype=np.float64))
+        except (TypeError, ValueError):
+            return {"error": "edges invalides"}
+        if len(edges_val) < 2 or not np.isfinite(edges_val).all():
+            return {"error": "edges doit contenir au moins deux bornes finies distinctes"}
+        tag = "edges"
+    elif strategy == "width" and bin_size is not None:
+        if not (math.isfinite(bin_size) and bin_size > 0):
+            return {"error": "bin_size doit être un nombre fini > 0"}
+        tag = binning.trim_float(bin_size)
+    else:
+        if n_bins is None or n_bins < 1:
+            return {"error": "n_bins doit être > 0"}
+        tag = f"q{n_bins}" if strategy == "quantile" else f"w{n_bins}"
+
+    # Calculer toutes les colonnes avant d'en ajouter une seule
+    binned_columns = []
+    for source_column in columns:
+        if source_column not in df.columns:
+            return {"error": f"Colonne '{source_column}' introuvable"}
+        if not pd.api.types.is_numeric_dtype(df[source_column]) or pd.api.types.is_bool_dtype(df[source_column]):
+            return {"error": f"La colonne '{source_column}' n'est pas numérique"}
+        values = df[source_column].to_numpy(dtype=np.float64, na_value=np.nan)
+        finite = np.isfinite(values)
+        if not finite.any():
+            return {"error": f"Aucune valeur numérique valide dans '{source_column}'"}
+        s_min = float(values[finite].min())
+        s_max = float(values[finite].max())
+
+        if strategy == "edges":
+            column_edges = edges_val
+        elif strategy == "quantile":
+            column_edges = binning.quantile_edges(values[finite], n_bins)
+        else:
+            column_edges = binning.width_edges(s_min, s_max, bin_size, n_bins)
+        categorical, counts = binning.cut(values, column_edges)
+        binned_columns.append((source_column, categorical, counts, s_min, s_max))
+
+    results = []
+    created: List[str] = []
+    # Nouvelle version du jeu (le DataFrame publié n'est pas modifié)
+    df = df.copy(deep=False)
+    for source_column, categorical, counts, s_min, s_max in binned_columns:
+        new_name = _unique_column_name(df, f"{str(source_column)}_{suffix or 'bin_' + tag}", created)
+        df[new_name] = pd.Series(categorical, index=df.index)
+        created.append(new_name)
+        results.append({
+            "source_column": str(source_column),
+            "new_column": new_name,
+            "min": s_min,
+            "max": s_max,
+            "bins": [str(label) for label in categorical.categories],
+            "counts": counts,
+        })
+
+    dataset_store.replace(filename, df, created)
+    tree_cache.invalidate(filename)
+    return {"filename": str(filename), "strategy": strategy, "columns": results}
+
+def get_dataset_store_stats():
+    """Jeux de données résidents en mémoire et leur empreinte, et cache des arbres."""
+    return {**dataset_store.stats(), "tree_cache": tree_cache.stats()}
+
+def drop_columns(filename: str, columns: List[str]):
+    """Supprime des colonnes du DataFrame si elles existent."""
+    with dataset_store.writing(filename):
+        df = dataset_store.get(filename)
+        if df is None:
+            return {"error": "Fichier non trouvé. Faites d'abord /excel/preview."}
+        # Nouvelle version du jeu (le DataFrame publié n'est pas modifié)
+        df = df.copy(deep=False)
+        removed = []
+        for col in columns:
+            if col in df.columns:
+                try:
+                    del df[col]
+                    removed.append(str(col))
+                except Exception:
+                    pass
+        dataset_store.replace(filename, df, removed)
+        tree_cache.invalidate(filename)
     return {"filename": str(filename), "removed": removed}
 
-async def select_columns(filename: str, variables_explicatives: List[str], variable_a_expliquer: List[str], selected_data: Dict = None):
-    if filename not in uploaded_files:
+def _selection_counts(series: pd.Series, selected_values: List[Any]) -> Tuple[List[Any], List[int]]:
+    """
+    Modalités de la colonne présentes dans la sélection (en texte, ordre d'apparition)
+    et leurs effectifs : un isin puis un factorize sur les lignes retenues.
+    """
+    filtered = series[series.isin(selected_values)]
+    codes, uniques = pd.factorize(filtered, sort=False, use_na_sentinel=False)
+    counts = np.bincount(codes, minlength=len(uniques))
+    return serialization.string_values(uniques), counts.tolist()
+
+def select_columns(filename: str, variables_explicatives: List[str], variable_a_expliquer: List[str],
+                   selected_data: Dict = None, include_values: bool = False):
+    df = dataset_store.get(filename)
+    if df is None:
         return {"error": "Fichier non trouvé. Faites d'abord /excel/preview."}
-    
-    df = uploaded_files[filename]
 
     # Vérifier que toutes les colonnes existent
     all_columns = variables_explicatives + variable_a_expliquer
@@ -197,32 +403,26 @@ async def select_columns(filename: str, variables_explicatives: List[str], varia
     all_df_columns = set(df.columns)
     remaining_columns = list(all_df_columns - set(all_columns))
     
-    # Si selected_data n'est pas fourni, retourner les données des colonnes restantes
+    # Si selected_data n'est pas fourni, retourner le nombre de modalités des colonnes restantes
+    # (les valeurs elles-mêmes se parcourent page par page via /excel/get-column-values)
     if selected_data is None:
-        remaining_data = {}
-        for col in remaining_columns:
-            # Récupérer toutes les valeurs uniques de la colonne
-            unique_values = df[col].dropna().unique()
-            # Convertir en types Python natifs
-            converted_values = []
-            for val in unique_values:
-                if pd.isna(val):
-                    converted_values.append(None)
-                elif isinstance(val, (np.integer, np.floating)):
-                    converted_values.append(float(val) if isinstance(val, np.floating) else int(val))
-                else:
-                    converted_values.append(str(val))
-            
-            remaining_data[str(col)] = converted_values
-        
-        return {
+        remaining_cardinalities = {
+            str(col): _column_stats(filename, df, col)["unique_count"] for col in remaining_columns
+        }
+        response = {
             "filename": str(filename),
             "variables_explicatives": [str(col) for col in variables_explicatives],
             "variables_a_expliquer": [str(var) for var in variable_a_expliquer],
             "remaining_columns": [str(col) for col in remaining_columns],
-            "remaining_data": remaining_data,
+            "remaining_cardinalities": remaining_cardinalities,
             "message": "Veuillez sélectionner les données des colonnes restantes sur lesquelles vous voulez travailler"
         }
+        if include_values:
+            # Ancien format : toutes les valeurs uniques de chaque colonne restante
+            response["remaining_data"] = {
+                str(col): _value_index(filename, df, col).values for col in remaining_columns
+            }
+        return response
     
     # Si selected_data est fourni, traiter la sélection finale
     # Préparer les données explicatives
@@ -249,62 +449,46 @@ async def select_columns(filename: str, variables_explicatives: List[str], varia
         }
         
         # Vérifier si la colonne est numérique pour calculer les stats
-        if y_data.dtype in ['int64', 'float64']:
+        if pd.api.types.is_numeric_dtype(y_data) and not pd.api.types.is_bool_dtype(y_data):
             try:
-                y_stats["mean"] = float(y_data.mean()) if not pd.isna(y_data.mean()) else None
-                y_stats["std"] = float(y_data.std()) if not pd.isna(y_data.std()) else None
-                y_stats["min"] = float(y_data.min()) if not pd.isna(y_data.min()) else None
-                y_stats["max"] = float(y_data.max()) if not pd.isna(y_data.max()) else None
+                # Calcul en float64, quel que soit le type de stockage (int8, float32...)
+                y_num = y_data.astype('float64')
+                y_stats["mean"] = float(y_num.mean()) if not pd.isna(y_num.mean()) else None
+                y_stats["std"] = float(y_num.std()) if not pd.isna(y_num.std()) else None
+                y_stats["min"] = float(y_num.min()) if not pd.isna(y_num.min()) else None
+                y_stats["max"] = float(y_num.max()) if not pd.isna(y_num.max()) else None
             except:
                 # En cas d'erreur, garder None
                 pass
         
         # Convertir les aperçus en types natifs
-        y_preview = []
-        for val in y_data.head(5):
-            if pd.isna(val):
-                y_preview.append(None)
-            elif isinstance(val, (np.integer, np.floating)):
-                y_preview.append(float(val) if isinstance(val, np.floating) else int(val))
-            else:
-                y_preview.append(str(val))
+        y_preview = serialization.string_values(y_data.head(5))
         
         result = {
             "variable_a_expliquer": str(var),  # Convertir en string natif
             "variables_explicatives": [str(col) for col in variables_explicatives],  # Convertir en strings natifs
-            "X_preview": X.head(5).to_dict(orient="records"),
+            "X_preview": _json_records(X.head(5)),
             "y_preview": y_preview,
             "y_stats": y_stats
         }
         results.append(result)
 
-    # Préparer les données sélectionnées par l'utilisateur
+    # Résumer les données sélectionnées par l'utilisateur : modalités retenues, effectif de chacune
+    # et nombre de lignes filtrées par colonne (les lignes elles-mêmes passent par l'export)
     selected_data_with_columns = {}
+    selected_counts = {}
     for col_name, selected_values in selected_data.items():
         if col_name in df.columns:
-            # Filtrer le DataFrame pour ne garder que les lignes où la colonne contient les valeurs sélectionnées
-            mask = df[col_name].isin(selected_values)
-            filtered_df = df[mask]
-            
-            # Récupérer les données de cette colonne filtrée
-            col_data = filtered_df[col_name].tolist()
-            # Convertir en types Python natifs
-            converted_col_data = []
-            for val in col_data:
-                if pd.isna(val):
-                    converted_col_data.append(None)
-                elif isinstance(val, (np.integer, np.floating)):
-                    converted_col_data.append(float(val) if isinstance(val, np.floating) else int(val))
-                else:
-                    converted_col_data.append(str(val))
-            
-            selected_data_with_columns[str(col_name)] = converted_col_data
+            values, counts = _selection_counts(df[col_name], selected_values)
+            selected_data_with_columns[str(col_name)] = values
+            selected_counts[str(col_name)] = {"counts": counts, "total_rows": int(sum(counts))}
 
     return {
         "filename": str(filename),  # Convertir en string natif
         "variables_explicatives": [str(col) for col in variables_explicatives],  # Convertir en strings natifs
         "variables_a_expliquer": [str(var) for var in variable_a_expliquer],  # Convertir en strings natifs
-        "selected_data": selected_data_with_columns,  # Données choisies par l'utilisateur avec noms de colonnes
+        "selected_data": selected_data_with_columns,  # Modalités choisies par l'utilisateur avec noms de colonnes
+        "selected_counts": selected_counts,  # Effectifs des modalités (même ordre) et lignes retenues
         "results": results,
         "summary": {
             "total_variables_explicatives": int(len(variables_explicatives)),  # Convertir en int natif
@@ -314,250 +498,91 @@ async def select_columns(filename: str, variables_explicatives: List[str], varia
         }
     }
 
-async def get_column_unique_values(filename: str, column_name: str):
-    if filename not in uploaded_files:
+def _value_index(filename: str, df: pd.DataFrame, column_name: Any) -> value_index.ValueIndex:
+    """Index des valeurs de la colonne, construit au premier appel puis mémorisé avec le jeu de données."""
+    return dataset_store.derived(
+        filename, ("value_index", column_name), lambda: value_index.ValueIndex(df[column_name])
+    )
+
+def get_column_unique_values(filename: str, column_name: str, search: Optional[str] = None,
+                             match: str = "prefix", offset: int = 0, limit: Optional[int] = None,
+                             order: Optional[str] = None):
+    """
+    Valeurs uniques d'une colonne et leurs effectifs, filtrées par préfixe ou sous-chaîne
+    (insensible à la casse) et paginées (offset/limit).
+    Sans recherche ni limite : toutes les valeurs, dans l'ordre d'apparition.
+    """
+    df = dataset_store.get(filename)
+    if df is None:
         return {"error": "Fichier non trouvé. Faites d'abord /excel/preview."}
     
-    df = uploaded_files[filename]
-    
     if column_name not in df.columns:
         return {"error": f"La colonne '{column_name}' n'existe pas dans {filename}"}
+
+    if match not in value_index.MATCH_MODES:
+        return {"error": f"Mode de recherche invalide: {match} (attendu: {', '.join(value_index.MATCH_MODES)})"}
+    if order is None:
+        order = "appearance" if limit is None and not search else "value"
+    if order not in value_index.ORDERS:
+        return {"error": f"Ordre invalide: {order} (attendu: {', '.join(value_index.ORDERS)})"}
+    if offset < 0 or (limit is not None and limit < 1):
+        return {"error": "offset doit être >= 0 et limit > 0"}
     
-    # Récupérer toutes les valeurs uniques de la colonne
-    unique_values = df[column_name].dropna().unique()
-    
-    # Convertir en types Python natifs
-    converted_values = []
-    for val in unique_values:
-        if pd.isna(val):
-            converted_values.append(None)
-        elif isinstance(val, (np.integer, np.floating)):
-            converted_values.append(float(val) if isinstance(val, np.floating) else int(val))
-        else:
-            converted_values.append(str(val))
+    index = _value_index(filename, df, column_name)
+    page = index.page(search, match, offset, limit, order)
     
     return {
         "filename": str(filename),
         "column_name": str(column_name),
-        "unique_values": converted_values,
-        "total_unique_values": len(converted_values)
+        **page,
+        "total_unique_values": len(index),
+        "offset": offset,
+        "limit": limit,
     }
 
 # ============================================================================
 # NOUVELLES FONCTIONS POUR L'ARBRE DE DÉCISION
 # ============================================================================
 
-def calculate_percentage_variance(df: pd.DataFrame, explanatory_var: str, target_var: str, target_value: Any) -> float:
-    """
-    Calcule l'écart-type des pourcentages des valeurs d'une variable explicative
-    pour une valeur cible donnée.
-    
-    CORRECTION: Les pourcentages sont calculés par rapport au total des accidents
-    de chaque valeur de la variable explicative, pas par rapport au total filtré.
-    """
-    try:
-        # Filtrer pour la valeur cible (exclure les NaN)
-        target_mask = (df[target_var] == target_value) & (df[target_var].notna())
-        filtered_df = df[target_mask]
-        
-        if len(filtered_df) == 0:
-            return 0.0
-        
-        # Obtenir toutes les valeurs uniques de la variable explicative dans le dataset filtré
-        all_explanatory_values = df[explanatory_var].dropna().unique()
-        
-        if len(all_explanatory_values) == 0:
-            return 0.0
-        
-        # Pour chaque valeur de la variable explicative, calculer le pourcentage
-        # d'accidents de type "target_value" parmi tous les accidents de cette valeur
-        percentages = []
-        
-        for explanatory_value in all_explanatory_values:
-            # Nombre total d'accidents avec cette valeur explicative
-            total_explanatory = len(df[df[explanatory_var] == explanatory_value])
-            
-            # Nombre d'accidents avec cette valeur explicative ET la valeur cible
-            target_and_explanatory = len(
-                df[(df[explanatory_var] == explanatory_value) & 
-                   (df[target_var] == target_value) & 
-                   (df[target_var].notna())]
-            )
-            
-            # Calculer le pourcentage
-            if total_explanatory > 0:
-                percentage = (target_and_explanatory / total_explanatory) * 100
-                percentages.append(percentage)
-        
-        # Calculer l'écart-type des pourcentages
-        if len(percentages) > 1:
-            return float(np.std(percentages))
-        else:
-            return 0.0
-            
-    except Exception as e:
-        return 0.0
-
-def select_best_explanatory_variable(df: pd.DataFrame, available_vars: List[str], 
-                                   target_var: str, target_value: Any) -> Tuple[str, float]:
-    """
-    Sélectionne la variable explicative avec le plus grand écart-type des pourcentages.
-    """
-    best_var = None
-    best_variance = -1
-    
-    var_variances = {}
-    for var in available_vars:
-        variance = calculate_percentage_variance(df, var, target_var, target_value)
-        var_variances[var] = variance
-    
-    # Sélectionner la variable avec la plus grande variance
-    if var_variances:
-        best_var = max(var_variances, key=var_variances.get)
-        best_variance = var_variances[best_var]
-    
-    return best_var, best_variance
-
-def calculate_branch_percentages(df: pd.DataFrame, explanatory_var: str, 
-                               target_var: str, target_value: Any) -> Dict[str, Dict[str, Any]]:
-    """
-    Calcule les pourcentages et comptages pour chaque branche d'une variable explicative.
-    
-    CORRECTION: Les pourcentages sont calculés par rapport au total des accidents
-    de chaque valeur de la variable explicative, pas par rapport au total filtré.
-    """
-    try:
-
-        
-        # Obtenir toutes les valeurs uniques de la variable explicative dans le dataset filtré
-        all_explanatory_values = df[explanatory_var].dropna().unique()
-        
-        if len(all_explanatory_values) == 0:
-            return {}
-        
-        branches = {}
-        
-        for explanatory_value in all_explanatory_values:
-            # Nombre total d'accidents avec cette valeur explicative
-            total_explanatory = len(df[df[explanatory_var] == explanatory_value])
-            
-            # Nombre d'accidents avec cette valeur explicative ET la valeur cible
-            target_and_explanatory = len(
-                df[(df[explanatory_var] == explanatory_value) & 
-                   (df[target_var] == target_value) & 
-                   (df[target_var].notna())]
-            )
-            
-            # Calculer le pourcentage
-            if total_explanatory > 0:
-                percentage = (target_and_explanatory / total_explanatory) * 100
-                branches[str(explanatory_value)] = {
-                    "count": int(target_and_explanatory),   # cas cibles
-                    "total": int(total_explanatory),         # effectif total de la branche
-                    "percentage": round(percentage, 2),
-                    "subtree": None  # Sera rempli récursivement
-                }
-        
-        return branches
-        
-    except Exception as e:
-        return {}
-
 def construct_tree_for_value(df: pd.DataFrame, target_value: Any, target_var: str, 
                            available_explanatory_vars: List[str], current_path: List[str] = None,
                            min_population_threshold: Optional[int] = None) -> Dict[str, Any]:
     """
     Construit récursivement l'arbre de décision pour une valeur cible donnée.
+    Le DataFrame est encodé une fois (voir tree_engine.EncodedDataset), puis la
+    récursion travaille sur des tableaux d'indices de lignes.
     """
     if current_path is None:
         current_path = []
     
-    # Critère d'arrêt : plus de variables explicatives disponibles
-    if not available_explanatory_vars:
-        return {
-            "type": "leaf",
-            "message": "Plus de variables explicatives disponibles"
-        }
-    
-    # Sélectionner la meilleure variable explicative
-    best_var, best_variance = select_best_explanatory_variable(
-        df, available_explanatory_vars, target_var, target_value
+    dataset = tree_engine.EncodedDataset(df, available_explanatory_vars + [target_var])
+    hits = dataset.indicator(target_var, target_value)
+    return tree_engine.grow_tree(
+        dataset, dataset.all_rows(), hits,
+        available_explanatory_vars, current_path,
+        min_population_threshold
     )
-    
-    if best_var is None:
-        return {
-            "type": "leaf",
-            "message": "Aucune variable explicative valide trouvée"
-        }
-    
-    # Calculer les branches pour cette variable
-    branches = calculate_branch_percentages(df, best_var, target_var, target_value)
-    
-    # Créer le nœud de l'arbre
-    tree_node = {
-        "type": "node",
-        "variable": best_var,
-        "variance": round(best_variance, 4),
-        "branches": branches,
-        "path": current_path + [best_var]
-    }
-    
-    # Variables explicatives restantes pour les sous-arbres
-    remaining_vars = [var for var in available_explanatory_vars if var != best_var]
-    
-    # Construire récursivement les sous-arbres pour chaque branche
-    for branch_value, branch_data in branches.items():
-        # Filtrer le DataFrame pour cette branche
-        # Convertir branch_value en type approprié pour la comparaison
-        if branch_value == 'False':
-            branch_value_converted = False
-        elif branch_value == 'True':
-            branch_value_converted = True
-        else:
-            branch_value_converted = branch_value
-        
-        branch_mask = (df[best_var] == branch_value_converted) & (df[best_var].notna())
-        filtered_df = df[branch_mask]
-        
-        if len(filtered_df) > 0 and remaining_vars:
-            # Vérifier le seuil d'effectif minimum (0 = pas de limite)
-            if min_population_threshold and min_population_threshold > 0 and len(filtered_df) < min_population_threshold:
-                # Arrêter la construction si l'effectif est trop faible
-                branch_data["subtree"] = {
-                    "type": "leaf",
-                    "message": f"[ARRET] Branche arrêtée - Effectif insuffisant ({len(filtered_df)} < {min_population_threshold})"
-                }
-            else:
-                # Construire le sous-arbre récursivement
-                subtree = construct_tree_for_value(
-                    filtered_df, target_value, target_var, 
-                    remaining_vars, current_path + [best_var, branch_value],
-                    min_population_threshold
-                )
-                branch_data["subtree"] = subtree
-    
-    return tree_node
 
-async def build_decision_tree(filename: str, variables_explicatives: List[str], 
-                            variables_a_expliquer: List[str], selected_data: Dict[str, Any], 
-                            min_population_threshold: Optional[int] = None,
-                            treatment_mode: str = 'independent') -> Dict[str, Any]:
+def _bitmap_index(filename: str, df: pd.DataFrame, column_name: Any) -> Optional[bitmap_index.ColumnBitmaps]:
+    """Index inversé de la colonne (None si trop de modalités), mémorisé avec le jeu de données."""
+    return dataset_store.derived(filename, ("bitmap", column_name), lambda: bitmap_index.build(df[column_name]))
+
+def _initial_mask(df: pd.DataFrame, variables_explicatives: List[str],
+                  variables_a_expliquer: List[str], selected_data: Dict[str, Any],
+                  filename: Optional[str] = None) -> pd.Series:
     """
-    Construit l'arbre de décision complet pour toutes les variables à expliquer.
+    Masque de l'échantillon initial : lignes dont chaque colonne restante (ni explicative
+    ni à expliquer) présente dans selected_data prend l'une des valeurs sélectionnées.
+    Avec filename, les colonnes à faible cardinalité sont filtrées par leur index inversé
+    (ET de bitsets compactés) plutôt que par un isin sur toute la colonne.
     """
-    if filename not in uploaded_files:
-        return {"error": "Fichier non trouvé. Faites d'abord /excel/preview."}
-    
-    df = uploaded_files[filename]
-    
-    # Étape 1: Filtrer l'échantillon initial basé sur les variables restantes sélectionnées
-    
     # Identifier les colonnes restantes (ni explicatives ni à expliquer)
     all_columns = variables_explicatives + variables_a_expliquer
     remaining_columns = [col for col in df.columns if col not in all_columns]
     
     # Filtrer pour les variables restantes sélectionnées
-    initial_mask = pd.Series([True] * len(df), index=df.index)
+    initial_mask = np.ones(len(df), dtype=bool)
+    bits = None
     
     for col_name, selected_values in selected_data.items():
         if col_name in remaining_columns and selected_values:
@@ -574,54 +599,128 @@ async def build_decision_tree(filename: str, variables_explicatives: List[str],
                 else:
                     converted_values.append(val)
             
-            col_mask = df[col_name].isin(converted_values)
-            initial_mask = initial_mask & col_mask
+            index = _bitmap_index(filename, df, col_name) if filename is not None else None
+            if index is not None:
+                col_bits = index.isin(converted_values)
+                bits = col_bits if bits is None else bits & col_bits
+            else:
+                initial_mask &= df[col_name].isin(converted_values).to_numpy(dtype=bool)
     
-    filtered_df = df[initial_mask].copy()
+    if bits is not None:
+        initial_mask &= bitmap_index.to_mask(bits, len(df))
+    return pd.Series(initial_mask, index=df.index)
+
+def export_sample(filename: str, variables_explicatives: List[str], variables_a_expliquer: List[str],
+                  selected_data: Dict[str, Any], fmt: str = "ndjson", columns: Optional[List[str]] = None):
+    """
+    Prépare l'export en flux de l'échantillon filtré (même filtre que build_decision_tree).
+    Retourne un dict d'erreur, ou un dict contenant le générateur des blocs encodés.
+    """
+    df = dataset_store.get(filename)
+    if df is None:
+        return {"error": "Fichier non trouvé. Faites d'abord /excel/preview."}
+    if fmt not in export.available_formats():
+        return {"error": f"Format d'export invalide: {fmt} (attendu: {', '.join(export.available_formats())})"}
+    if columns:
+        missing = [col for col in columns if col not in df.columns]
+        if missing:
+            return {"error": f"Colonnes introuvables: {missing}"}
+
+    mask = _initial_mask(df, variables_explicatives, variables_a_expliquer, selected_data, filename)
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    return {
+        "content": export.iter_rows(df, mask, fmt, columns or None),
+        "media_type": export.MEDIA_TYPES[fmt],
+        "download_name": f"{stem}_echantillon.{export.EXTENSIONS[fmt]}",
+        "rows": int(mask.sum()),
+    }
+
+def _tree_budget(max_depth: Optional[int] = None, max_nodes: Optional[int] = None,
+                 max_branches_per_node: Optional[int] = None,
+                 time_limit: Optional[float] = None):
+    """Budget de croissance demandé (None ou 0 = pas de limite), ou dict d'erreur."""
+    for name, value in (("max_depth", max_depth), ("max_nodes", max_nodes),
+                        ("max_branches_per_node", max_branches_per_node), ("time_limit", time_limit)):
+        if value is not None and value < 0:
+            return {"error": f"{name} doit être positif (0 = pas de limite)"}
+    return tree_engine.TreeBudget.from_request(max_depth, max_nodes, max_branches_per_node, time_limit)
+
+def _budget_report(limits: Dict[str, Any], decision_trees: Dict[str, Any],
+                   elapsed_seconds: float, parallel: bool) -> Dict[str, Any]:
+    """Limites demandées et part utilisée : nœuds, profondeur atteinte, durée, branches tronquées."""
+    usages = [tree_engine.tree_usage(tree) for trees in decision_trees.values() for tree in trees.values()]
+    truncated = dict.fromkeys(tree_engine.TRUNCATION_REASONS, 0)
+    for usage in usages:
+        for reason, count in usage["truncated"].items():
+            truncated[reason] += count
+    return {
+        "limits": limits,
+        "used": {
+            "max_depth": max((usage["depth"] for usage in usages), default=0),
+            "max_nodes": max((usage["nodes"] for usage in usages), default=0),
+            "nodes_total": sum(usage["nodes"] for usage in usages),
+            "time_seconds": round(elapsed_seconds, 3),
+        },
+        "truncated": truncated,
+        "complete": not any(truncated.values()),
+        "parallel": parallel,
+    }
+
+def build_decision_tree(filename: str, variables_explicatives: List[str], 
+                      variables_a_expliquer: List[str], selected_data: Dict[str, Any], 
+                      min_population_threshold: Optional[int] = None,
+                      treatment_mode: str = 'independent',
+                      n_workers: Optional[int] = None,
+                      progress: Optional[tree_engine.BuildProgress] = None,
+                      keep_populations: bool = False,
+                      budget: Optional[tree_engine.TreeBudget] = None) -> Dict[str, Any]:
+    """
+    Construit l'arbre de décision complet pour toutes les variables à expliquer.
+    n_workers > 1 active la construction parallèle (résultat identique au mode séquentiel).
+    progress (optionnel) permet de suivre l'avancement et d'annuler la construction.
+    keep_populations conserve l'effectif interne des branches (pour tree_engine.prune_tree).
+    budget (optionnel) limite la croissance des arbres ; son utilisation est décrite
+    dans "tree_budget". Les limites de nœuds et de temps imposent le mode séquentiel.
+    """
+    df = dataset_store.get(filename)
+    if df is None:
+        return {"error": "Fichier non trouvé. Faites d'abord /excel/preview."}
+    if budget is None:
+        budget = tree_engine.TreeBudget()
+    started = time.perf_counter()
+    budget.start()
+    
+    # Étape 1: Filtrer l'échantillon initial basé sur les variables restantes sélectionnées
+    initial_mask = _initial_mask(df, variables_explicatives, variables_a_expliquer, selected_data, filename)
+    filtered_df = df[initial_mask]
     
     # Analyser l'impact du filtrage sur les variables explicatives
     filtering_analysis = analyze_sample_filtering_impact(df, filtered_df, variables_explicatives)
     
+    # Encodage compact des colonnes utiles, construit une seule fois pour tous les arbres
+    dataset = tree_engine.EncodedDataset(filtered_df, variables_explicatives + variables_a_expliquer)
+    all_rows = dataset.all_rows()
+    
     # Étape 2: Construire l'arbre selon le mode de traitement
     
     decision_trees = {}
+    # Arbres à construire : (clé variable, clé valeur, masque cible)
+    tree_targets = []
     
     if treatment_mode == 'together':
         # Mode ensemble : traiter toutes les variables ensemble
         # Créer une variable combinée qui prend la valeur True si l'une des variables cibles est présente
         
         # Créer un masque pour les lignes qui ont l'une des valeurs cibles
-        combined_mask = pd.Series([False] * len(filtered_df), index=filtered_df.index)
+        combined_mask = np.zeros(dataset.n_rows, dtype=bool)
         
-        # Si toutes les modalités sont dans la même variable
-        if len(variables_a_expliquer) == 1:
-            target_var = variables_a_expliquer[0]
+        for target_var in variables_a_expliquer:
             if target_var in selected_data and selected_data[target_var]:
                 # Utiliser toutes les modalités sélectionnées de cette variable
-                combined_mask = filtered_df[target_var].isin(selected_data[target_var])
+                var_mask = dataset.isin(target_var, selected_data[target_var])
             else:
-                combined_mask = filtered_df[target_var].notna()
-        else:
-            # Si les modalités sont dans plusieurs variables différentes
-            for target_var in variables_a_expliquer:
-                if target_var in selected_data and selected_data[target_var]:
-                    var_mask = filtered_df[target_var].isin(selected_data[target_var])
-                else:
-                    var_mask = filtered_df[target_var].notna()
-                combined_mask = combined_mask | var_mask
-        
-        # Créer un DataFrame avec une variable combinée
-        combined_df = filtered_df.copy()
-        combined_df['_combined_target'] = combined_mask
-        
-        # Construire l'arbre pour la variable combinée
-        target_trees = {}
-        tree = construct_tree_for_value(
-            combined_df, True, '_combined_target', 
-            variables_explicatives.copy(), [],
-            min_population_threshold
-        )
-        target_trees['Combined'] = tree
+                var_mask = dataset.notna(target_var)
+            combined_mask = combined_mask | var_mask
         
         # Créer un nom descriptif avec les noms des variables
         if len(variables_a_expliquer) == 1:
@@ -631,7 +730,8 @@ async def build_decision_tree(filename: str, variables_explicatives: List[str],
             # Plusieurs variables : les joindre avec des virgules
             combined_name = " + ".join(variables_a_expliquer)
         
-        decision_trees[combined_name] = target_trees
+        decision_trees[combined_name] = {}
+        tree_targets.append((combined_name, 'Combined', combined_mask))
         
     else:
         # Mode indépendant : traiter chaque variable séparément (comportement original)
@@ -644,19 +744,36 @@ async def build_decision_tree(filename: str, variables_explicatives: List[str],
                 # Fallback: utiliser toutes les valeurs uniques si aucune sélection
                 target_values = filtered_df[target_var].dropna().unique()
             
-            target_trees = {}
-            
+            decision_trees[target_var] = {}
             for target_value in target_values:
-                # Construire l'arbre pour cette valeur
-                tree = construct_tree_for_value(
-                    filtered_df, target_value, target_var, 
-                    variables_explicatives.copy(), [],
-                    min_population_threshold
-                )
-                
-                target_trees[str(target_value)] = tree
-            
-            decision_trees[target_var] = target_trees
+                tree_targets.append((target_var, str(target_value), dataset.indicator(target_var, target_value)))
+    
+    if progress is not None:
+        progress.stage = "tree"
+        progress.trees_total = len(tree_targets)
+    
+    # Construire les arbres (en parallèle si demandé)
+    workers = parallel_tree.resolve_workers(n_workers) if budget.parallelizable else 0
+    if workers > 1 and tree_targets:
+        trees = parallel_tree.build_trees(
+            dataset, [(hits, variables_explicatives) for _, _, hits in tree_targets],
+            min_population_threshold, workers, progress, budget
+        )
+    else:
+        trees = []
+        for _, _, hits in tree_targets:
+            trees.append(tree_engine.grow_tree(
+                dataset, all_rows, hits,
+                variables_explicatives.copy(), [],
+                min_population_threshold, progress, budget
+            ))
+            if progress is not None:
+                progress.trees_done += 1
+    
+    for (target_key, value_key, _), tree in zip(tree_targets, trees):
+        if not keep_populations:
+            tree = tree_engine.prune_tree(tree, min_population_threshold)
+        decision_trees[target_key][value_key] = tree
     
     return {
         "filename": filename,
@@ -665,7 +782,9 @@ async def build_decision_tree(filename: str, variables_explicatives: List[str],
         "filtered_sample_size": len(filtered_df),
         "original_sample_size": len(df),
         "decision_trees": decision_trees,
-        "treatment_mode": treatment_mode
+        "treatment_mode": treatment_mode,
+        "tree_budget": _budget_report(budget.limits(), decision_trees,
+                                      time.perf_counter() - started, workers > 1 and bool(tree_targets))
     }
 
 def create_tree_diagram(decision_trees: Dict[str, Any]) -> str:
@@ -808,16 +927,36 @@ def create_tree_diagram(decision_trees: Dict[str, Any]) -> str:
 
         return ""
 
-def generate_tree_pdf(decision_trees: Dict[str, Any], filename: str) -> str:
+class PdfTimeout(Exception):
+    """Échéance (time_limit) atteinte pendant la génération du PDF."""
+
+
+class _TimedDocTemplate(SimpleDocTemplate):
+    """Document interrompu (PdfTimeout) dès que l'échéance est dépassée."""
+
+    def __init__(self, *args, deadline: Optional[float] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.deadline = deadline
+
+    def check_deadline(self):
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise PdfTimeout()
+
+    def afterFlowable(self, flowable):
+        self.check_deadline()
+
+
+def generate_tree_pdf(decision_trees: Dict[str, Any], filename: str, deadline: Optional[float] = None) -> str:
     """
     Génère un PDF de l'arbre de décision avec structure arborescente claire et branches gauche/droite.
+    Avec deadline (time.monotonic()), la génération est abandonnée (PdfTimeout) une fois l'échéance dépassée.
     """
     try:
         # Créer un buffer en mémoire pour le PDF
         buffer = io.BytesIO()
         
         # Créer le document PDF
-        doc = SimpleDocTemplate(buffer, pagesize=A4)
+        doc = _TimedDocTemplate(buffer, pagesize=A4, deadline=deadline)
         story = []
         
         # Styles
@@ -881,6 +1020,7 @@ def generate_tree_pdf(decision_trees: Dict[str, Any], filename: str) -> str:
         # Fonction récursive pour afficher l'arbre avec structure claire
         def add_tree_to_story(node, level=0, path=""):
             try:
+                doc.check_deadline()
                 if node.get("type") == "leaf":
                     # Feuille de l'arbre
                     story.append(Paragraph(f"🍃 {node.get('message', 'Fin de branche')}", leaf_style))
@@ -923,6 +1063,8 @@ def generate_tree_pdf(decision_trees: Dict[str, Any], filename: str) -> str:
                                 add_tree_to_story(branch_data['subtree'], level + 1, f"{path} → {branch_value}")
                     
                     story.append(Spacer(1, 10))
+            except PdfTimeout:
+                raise
             except Exception as e:
                 story.append(Paragraph(f"❌ Erreur lors de l'affichage du nœud", styles['Normal']))
         
@@ -941,10 +1083,14 @@ def generate_tree_pdf(decision_trees: Dict[str, Any], filename: str) -> str:
                         # Construire l'arbre récursivement
                         add_tree_to_story(tree, 0, target_value)
                         story.append(Spacer(1, 20))
+                    except PdfTimeout:
+                        raise
                     except Exception as e:
                         story.append(Paragraph(f"❌ Erreur lors du traitement de la valeur {target_value}", styles['Normal']))
                 
                 story.append(Spacer(1, 25))
+            except PdfTimeout:
+                raise
             except Exception as e:
                 story.append(Paragraph(f"❌ Erreur lors du traitement de la variable {target_var}", styles['Normal']))
         
@@ -960,24 +1106,93 @@ def generate_tree_pdf(decision_trees: Dict[str, Any], filename: str) -> str:
         
         return pdf_base64
         
+    except PdfTimeout:
+        raise
     except Exception as e:
         return ""
 
-async def build_decision_tree_with_pdf(filename: str, variables_explicatives: List[str], 
-                                     variables_a_expliquer: List[str], selected_data: Dict[str, Any], 
-                                     min_population_threshold: Optional[int] = None,
-                                     treatment_mode: str = 'independent') -> Dict[str, Any]:
+def _prune_trees(tree_result: Dict[str, Any], min_population_threshold: Optional[int]) -> Dict[str, Any]:
+    """Copie du résultat avec chaque arbre élagué au seuil (et sans effectifs internes)."""
+    decision_trees = {
+        target_key: {value_key: tree_engine.prune_tree(tree, min_population_threshold)
+                     for value_key, tree in trees.items()}
+        for target_key, trees in tree_result["decision_trees"].items()
+    }
+    report = tree_result["tree_budget"]
+    return {**tree_result, "decision_trees": decision_trees,
+            "tree_budget": _budget_report(report["limits"], decision_trees,
+                                          report["used"]["time_seconds"], report["parallel"])}
+
+def build_decision_tree_with_pdf(filename: str, variables_explicatives: List[str], 
+                               variables_a_expliquer: List[str], selected_data: Dict[str, Any], 
+                               min_population_threshold: Optional[int] = None,
+                               treatment_mode: str = 'independent',
+                               n_workers: Optional[int] = None,
+                               max_depth: Optional[int] = None,
+                               max_nodes: Optional[int] = None,
+                               max_branches_per_node: Optional[int] = None,
+                               time_limit: Optional[float] = None,
+                               progress: Optional[tree_engine.BuildProgress] = None) -> Dict[str, Any]:
     """
     Construit l'arbre de décision et génère le PDF correspondant.
+    Le résultat est mémorisé par (état du jeu, paramètres) : une requête identique sur des
+    données inchangées le renvoie sans reconstruction ("tree_cache": "hit"). Un seuil d'effectif
+    supérieur à celui d'un arbre déjà construit s'obtient par élagage de cet arbre
+    ("pruned") ; sinon l'arbre est construit ("miss").
+    max_depth, max_nodes, max_branches_per_node et time_limit bornent la croissance des arbres
+    (voir tree_engine.TreeBudget). Sous une limite de nœuds ou de temps, l'arbre n'est pas
+    réutilisé pour d'autres seuils, et un résultat tronqué par le temps n'est pas mémorisé.
+    time_limit borne aussi la génération du PDF : le temps restant après la construction lui
+    est alloué ; une fois écoulé, le PDF n'est pas produit ("pdf_generated": False,
+    "tree_budget.pdf_skipped": True) et le résultat n'est pas mémorisé.
     """
-    # Construire l'arbre
-    tree_result = await build_decision_tree(filename, variables_explicatives, variables_a_expliquer, selected_data, min_population_threshold, treatment_mode)
+    if dataset_store.get(filename) is None:
+        return {"error": "Fichier non trouvé. Faites d'abord /excel/preview."}
+    budget = _tree_budget(max_depth, max_nodes, max_branches_per_node, time_limit)
+    if isinstance(budget, dict):
+        return budget
+    threshold = min_population_threshold if min_population_threshold and min_population_threshold > 0 else 0
+    state = dataset_store.state_token(filename)
+    cache_key = base_key = None
+    if state is not None:
+        cache_key = tree_cache.make_key(filename, state, variables_explicatives, variables_a_expliquer,
+                                        selected_data, min_population_threshold, treatment_mode, budget.limits())
+        cached = tree_cache.get(cache_key)
+        if cached is not None:
+            return {**cached, "tree_cache": "hit"}
+        if budget.prunable:
+            base_key = tree_cache.make_key(filename, state, variables_explicatives, variables_a_expliquer,
+                                           selected_data, None, treatment_mode, budget.limits())
+
+    base = tree_cache.get_base(base_key, threshold) if base_key is not None else None
+    if base is not None:
+        # Élaguer l'arbre construit à un seuil inférieur
+        cache_status = "pruned"
+    else:
+        # Construire l'arbre (effectifs conservés pour les élagages suivants)
+        cache_status = "miss"
+        tree_cache.miss()
+        base = build_decision_tree(filename, variables_explicatives, variables_a_expliquer, selected_data,
+                                   min_population_threshold, treatment_mode, n_workers, progress,
+                                   keep_populations=base_key is not None, budget=budget)
+        if "error" in base:
+            return base
+        if base_key is not None:
+            tree_cache.put_base(base_key, threshold, base)
+    tree_result = _prune_trees(base, min_population_threshold) if base_key is not None else base
     
-    if "error" in tree_result:
-        return tree_result
+    if progress is not None:
+        progress.check()
+        progress.stage = "pdf"
     
-    # Générer le PDF
-    pdf_base64 = generate_tree_pdf(tree_result["decision_trees"], filename)
+    # Générer le PDF, dans le temps restant de la limite de construction
+    try:
+        pdf_base64 = generate_tree_pdf(tree_result["decision_trees"], filename, budget.deadline)
+        pdf_skipped = False
+    except PdfTimeout:
+        pdf_base64 = ""
+        pdf_skipped = True
+    tree_result = {**tree_result, "tree_budget": {**tree_result["tree_budget"], "pdf_skipped": pdf_skipped}}
     
     if pdf_base64:
         tree_result["pdf_base64"] = pdf_base64
@@ -985,7 +1200,65 @@ async def build_decision_tree_with_pdf(filename: str, variables_explicatives: Li
     else:
         tree_result["pdf_generated"] = False
     
-    return tree_result
+    if cache_key is not None and not tree_result["tree_budget"]["truncated"]["time_limit"] and not pdf_skipped:
+        tree_cache.put(cache_key, tree_result)
+    return {**tree_result, "tree_cache": cache_status}
+
+def estimate_decision_tree(filename: str, variables_explicatives: List[str],
+                           variables_a_expliquer: List[str], selected_data: Dict[str, Any],
+                           min_population_threshold: Optional[int] = None,
+                           treatment_mode: str = 'independent',
+                           max_depth: Optional[int] = None,
+                           max_nodes: Optional[int] = None,
+                           max_branches_per_node: Optional[int] = None,
+                           time_limit: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Estime, sans construire l'arbre, le coût de build_decision_tree_with_pdf avec les mêmes
+    paramètres : taille de l'échantillon filtré, nombre d'arbres, bornes sur les nœuds et la
+    profondeur, taille de réponse et durée approximatives (voir services/tree_estimate.py).
+    Utilise les cardinalités mémorisées des colonnes et les index du filtre selected_data.
+    """
+    df = dataset_store.get(filename)
+    if df is None:
+        return {"error": "Fichier non trouvé. Faites d'abord /excel/preview."}
+    missing = [col for col in variables_explicatives + variables_a_expliquer if col not in df.columns]
+    if missing:
+        return {"error": f"Colonnes introuvables: {missing}"}
+    budget = _tree_budget(max_depth, max_nodes, max_branches_per_node, time_limit)
+    if isinstance(budget, dict):
+        return budget
+
+    filtered_size = int(_initial_mask(df, variables_explicatives, variables_a_expliquer, selected_data, filename).sum())
+    cardinalities = {
+        col: _column_stats(filename, df, col)["unique_count"]
+        for col in dict.fromkeys(variables_explicatives + variables_a_expliquer)
+    }
+
+    # Un arbre par valeur cible sélectionnée (ou par modalité en l'absence de sélection), un seul en mode ensemble
+    if treatment_mode == 'together':
+        n_trees = 1 if variables_a_expliquer else 0
+    else:
+        n_trees = sum(len(selected_data[target_var]) if selected_data.get(target_var) else cardinalities[target_var]
+                      for target_var in variables_a_expliquer)
+
+    tree = tree_estimate.estimate_tree(
+        filtered_size,
+        [cardinalities[col] for col in variables_explicatives],
+        [tree_estimate.branches_recurse(df[col]) for col in variables_explicatives],
+        min_population_threshold, budget.max_depth, budget.max_nodes, budget.max_branches_per_node,
+    )
+    return {
+        "filename": filename,
+        "filtered_sample_size": filtered_size,
+        "original_sample_size": len(df),
+        "treatment_mode": treatment_mode,
+        "trees": n_trees,
+        "worst_case_depth": tree["depth"],
+        "estimated_nodes_per_tree": tree["nodes"],
+        **tree_estimate.estimate_cost(n_trees, tree),
+        "cardinalities": {str(col): card for col, card in cardinalities.items()},
+        "limits": budget.limits(),
+    }
 
 def analyze_sample_filtering_impact(df: pd.DataFrame, filtered_df: pd.DataFrame, 
                                    variables_explicatives: List[str]) -> Dict[str, Any]:
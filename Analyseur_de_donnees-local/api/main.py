@@ -2,6 +2,7 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import os
 from routers import excel_router
+from services.job_runner import job_runner
 
 app = FastAPI(
     title="API Analyse Statistique",
@@ -36,5 +37,10 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/metrics/jobs")
+async def jobs_metrics():
+    # Profondeur des files d'attente et temps d'attente par endpoint (dimensionnement du pool)
+    return job_runner.metrics()
+
 # Inclusion du routeur Excel
 app.include_router(excel_router.router)
@@ -1,19 +1,30 @@
+import asyncio
 from fastapi import APIRouter, UploadFile, Form
+from fastapi.responses import StreamingResponse
 from typing import Optional, Dict, Any
 from controllers import excel_controller
+from services.job_runner import job_runner
+from services.serialization import FastJSONResponse
+from services.tree_jobs import tree_jobs
 
-router = APIRouter(prefix="/excel", tags=["Excel"])
+# Réponses sérialisées par orjson. Les endpoints volumineux renvoient directement une
+# FastJSONResponse, ce qui évite en plus le passage par jsonable_encoder de FastAPI.
+router = APIRouter(prefix="/excel", tags=["Excel"], default_response_class=FastJSONResponse)
 
 @router.post("/preview")
-async def preview_excel(file: UploadFile):
-    return await excel_controller.preview_excel(file)
+async def preview_excel(
+    file: UploadFile,
+    sheet_name: Optional[str] = Form(None)  # Feuille à charger (par défaut la première)
+):
+    return await job_runner.run("preview", excel_controller.preview_excel, file, sheet_name)
 
 @router.post("/select-columns")
 async def select_columns(
     filename: str = Form(...),
     variables_explicatives: str = Form(...),  # Changé en str pour gérer la séparation
     variable_a_expliquer: str = Form(...),  # Peut contenir plusieurs variables séparées par des virgules
-    selected_data: Optional[str] = Form(None)  # Données sélectionnées par l'utilisateur (JSON string)
+    selected_data: Optional[str] = Form(None),  # Données sélectionnées par l'utilisateur (JSON string)
+    include_values: bool = Form(False)  # Renvoyer aussi toutes les valeurs des colonnes restantes (ancien format)
 ):
     # Séparer les variables explicatives (elles arrivent comme "col1,col2,col3")
     if variables_explicatives:
@@ -36,23 +47,47 @@ async def select_columns(
         except json.JSONDecodeError:
             return {"error": "Format invalide pour selected_data"}
     
-    return await excel_controller.select_columns(
+    return FastJSONResponse(await job_runner.run(
+        "select-columns",
+        excel_controller.select_columns,
         filename,
         variables_explicatives_list,  # Passer la liste séparée
         variables_a_expliquer_list,   # Passer la liste des variables à expliquer
-        selected_data_dict  # Passer les données sélectionnées ou None
-    )
+        selected_data_dict,  # Passer les données sélectionnées ou None
+        include_values
+    ))
 
 @router.post("/get-column-values")
 async def get_column_values(
     filename: str = Form(...),
-    column_name: str = Form(...)
+    column_name: str = Form(...),
+    search: Optional[str] = Form(None),  # Texte recherché dans les valeurs (insensible à la casse)
+    match: str = Form("prefix"),  # "prefix" ou "contains"
+    offset: int = Form(0),
+    limit: Optional[int] = Form(None),  # Taille de page (par défaut toutes les valeurs)
+    order: Optional[str] = Form(None)  # "value", "count" ou "appearance"
 ):
-    return await excel_controller.get_column_unique_values(filename, column_name)
+    return FastJSONResponse(await job_runner.run(
+        "get-column-values", excel_controller.get_column_unique_values,
+        filename, column_name, search, match, offset, limit, order
+    ))
 
 @router.post("/column-stats")
 async def column_stats(filename: str = Form(...)):
-    return await excel_controller.get_column_stats(filename)
+    return await job_runner.run("column-stats", excel_controller.get_column_stats, filename)
+
+@router.post("/profile")
+async def profile_columns(
+    filename: str = Form(...),
+    columns: Optional[str] = Form(None),  # "col1,col2" (par défaut toutes les colonnes)
+    top_k: int = Form(10),
+    bins: int = Form(20),
+    sample: bool = Form(False)  # Profiler un échantillon des gros jeux de données
+):
+    columns_list = [c.strip() for c in columns.split(',') if c.strip()] if columns else None
+    return FastJSONResponse(await job_runner.run(
+        "profile", excel_controller.profile_columns, filename, columns_list, top_k, bins, sample
+    ))
 
 @router.post("/bin-variable")
 async def bin_variable(
@@ -61,7 +96,34 @@ async def bin_variable(
     bin_size: float = Form(...),
     new_column_name: Optional[str] = Form(None)
 ):
-    return await excel_controller.bin_variable(filename, source_column, bin_size, new_column_name)
+    return await job_runner.run("bin-variable", excel_controller.bin_variable, filename, source_column, bin_size, new_column_name)
+
+@router.post("/bin-variables")
+async def bin_variables(
+    filename: str = Form(...),
+    columns: str = Form(...),  # "col1,col2,col3"
+    strategy: str = Form("width"),  # "width", "quantile" ou "edges"
+    n_bins: Optional[int] = Form(None),  # Nombre d'intervalles (width sans bin_size, quantile)
+    bin_size: Optional[float] = Form(None),  # Largeur des intervalles (width)
+    edges: Optional[str] = Form(None),  # Bornes explicites "0,18,65,120" (edges)
+    suffix: Optional[str] = Form(None)  # Suffixe des nouvelles colonnes (par défaut "bin_<paramètre>")
+):
+    columns_list = [c.strip() for c in columns.split(',') if c.strip()]
+    edges_list = None
+    if edges:
+        try:
+            edges_list = [float(e) for e in edges.split(',') if e.strip()]
+        except ValueError:
+            return {"error": "edges invalides"}
+    return await job_runner.run(
+        "bin-variables", excel_controller.bin_variables,
+        filename, columns_list, strategy, n_bins, bin_size, edges_list, suffix
+    )
+
+@router.get("/datasets")
+async def datasets_stats():
+    # Jeux de données résidents, taille mémoire et budget du stockage
+    return excel_controller.get_dataset_store_stats()
 
 @router.post("/drop-columns")
 async def drop_columns(
@@ -72,7 +134,33 @@ async def drop_columns(
         cols = [c.strip() for c in columns.split(',') if c.strip()]
     except Exception:
         cols = []
-    return await excel_controller.drop_columns(filename, cols)
+    return await job_runner.run("drop-columns", excel_controller.drop_columns, filename, cols)
+
+def _parse_tree_form(variables_explicatives: str, variable_a_expliquer: str, selected_data: str):
+    """
+    Sépare les listes de variables et parse selected_data.
+    Retourne (variables explicatives, variables à expliquer, selected_data) ou un dict d'erreur.
+    """
+    # Séparer les variables explicatives
+    if variables_explicatives:
+        variables_explicatives_list = [col.strip() for col in variables_explicatives.split(',')]
+    else:
+        variables_explicatives_list = []
+    
+    # Séparer les variables à expliquer
+    if variable_a_expliquer:
+        variables_a_expliquer_list = [col.strip() for col in variable_a_expliquer.split(',')]
+    else:
+        variables_a_expliquer_list = []
+    
+    # Parser selected_data
+    import json
+    try:
+        selected_data_dict = json.loads(selected_data)
+    except json.JSONDecodeError:
+        return {"error": "Format invalide pour selected_data"}
+    
+    return variables_explicatives_list, variables_a_expliquer_list, selected_data_dict
 
 @router.post("/build-decision-tree")
 async def build_decision_tree_endpoint(
@@ -81,42 +169,198 @@ async def build_decision_tree_endpoint(
     variable_a_expliquer: str = Form(...),
     selected_data: str = Form(...),
     min_population_threshold: Optional[int] = Form(None),
-    treatment_mode: Optional[str] = Form('independent')
+    treatment_mode: Optional[str] = Form('independent'),
+    n_workers: Optional[int] = Form(None),  # > 1 : construction parallèle (opt-in)
+    max_depth: Optional[int] = Form(None),  # Niveaux de nœuds de décision (0 = pas de limite)
+    max_nodes: Optional[int] = Form(None),  # Nœuds de décision par arbre
+    max_branches_per_node: Optional[int] = Form(None),  # Branches développées par nœud (les plus peuplées)
+    time_limit: Optional[float] = Form(None)  # Durée maximale de construction et du PDF (secondes)
 ):
     """
     Construit l'arbre de décision et génère le PDF correspondant.
+    max_depth, max_nodes, max_branches_per_node et time_limit bornent la croissance de l'arbre :
+    les branches tronquées deviennent des feuilles avec leur motif, et "tree_budget" décrit
+    la part du budget utilisée. Le PDF dispose du temps restant ; s'il ne tient pas dans
+    time_limit, il est omis ("tree_budget.pdf_skipped").
     """
     try:
-        # Séparer les variables explicatives
-        if variables_explicatives:
-            variables_explicatives_list = [col.strip() for col in variables_explicatives.split(',')]
-        else:
-            variables_explicatives_list = []
-        
-        # Séparer les variables à expliquer
-        if variable_a_expliquer:
-            variables_a_expliquer_list = [col.strip() for col in variable_a_expliquer.split(',')]
-        else:
-            variables_a_expliquer_list = []
-        
-        # Parser selected_data
-        import json
-        try:
-            selected_data_dict = json.loads(selected_data)
-        except json.JSONDecodeError:
-            return {"error": "Format invalide pour selected_data"}
+        parsed = _parse_tree_form(variables_explicatives, variable_a_expliquer, selected_data)
+        if isinstance(parsed, dict):
+            return parsed
+        variables_explicatives_list, variables_a_expliquer_list, selected_data_dict = parsed
         
         # Construire l'arbre de décision avec PDF
-        result = await excel_controller.build_decision_tree_with_pdf(
+        result = await job_runner.run(
+            "build-decision-tree",
+            excel_controller.build_decision_tree_with_pdf,
             filename,
             variables_explicatives_list,
             variables_a_expliquer_list,
             selected_data_dict,
             min_population_threshold,
-            treatment_mode
+            treatment_mode,
+            n_workers,
+            max_depth,
+            max_nodes,
+            max_branches_per_node,
+            time_limit
         )
         
-        return result
+        return FastJSONResponse(result)
         
     except Exception as e:
         return {"error": f"Erreur lors de la construction de l'arbre: {str(e)}"}
+
+@router.post("/estimate-decision-tree")
+async def estimate_decision_tree(
+    filename: str = Form(...),
+    variables_explicatives: str = Form(...),
+    variable_a_expliquer: str = Form(...),
+    selected_data: str = Form(...),
+    min_population_threshold: Optional[int] = Form(None),
+    treatment_mode: Optional[str] = Form('independent'),
+    max_depth: Optional[int] = Form(None),
+    max_nodes: Optional[int] = Form(None),
+    max_branches_per_node: Optional[int] = Form(None),
+    time_limit: Optional[float] = Form(None)
+):
+    """
+    Estime le coût de /excel/build-decision-tree (mêmes champs) sans construire l'arbre :
+    taille de l'échantillon filtré, nœuds, profondeur, taille de réponse et durée approximatives.
+    """
+    parsed = _parse_tree_form(variables_explicatives, variable_a_expliquer, selected_data)
+    if isinstance(parsed, dict):
+        return parsed
+    variables_explicatives_list, variables_a_expliquer_list, selected_data_dict = parsed
+
+    return FastJSONResponse(await job_runner.run(
+        "estimate-decision-tree",
+        excel_controller.estimate_decision_tree,
+        filename,
+        variables_explicatives_list,
+        variables_a_expliquer_list,
+        selected_data_dict,
+        min_population_threshold,
+        treatment_mode,
+        max_depth,
+        max_nodes,
+        max_branches_per_node,
+        time_limit
+    ))
+
+@router.post("/export-sample")
+async def export_sample(
+    filename: str = Form(...),
+    variables_explicatives: str = Form(""),
+    variable_a_expliquer: str = Form(""),
+    selected_data: str = Form("{}"),
+    format: str = Form("ndjson"),  # "ndjson", "csv" ou "arrow"
+    columns: Optional[str] = Form(None)  # "col1,col2" (par défaut toutes les colonnes)
+):
+    """
+    Exporte en flux les lignes de l'échantillon filtré par selected_data
+    (même filtre que la construction de l'arbre).
+    """
+    parsed = _parse_tree_form(variables_explicatives, variable_a_expliquer, selected_data)
+    if isinstance(parsed, dict):
+        return parsed
+    variables_explicatives_list, variables_a_expliquer_list, selected_data_dict = parsed
+    columns_list = [c.strip() for c in columns.split(',') if c.strip()] if columns else None
+
+    result = await job_runner.run(
+        "export-sample",
+        excel_controller.export_sample,
+        filename,
+        variables_explicatives_list,
+        variables_a_expliquer_list,
+        selected_data_dict,
+        format,
+        columns_list
+    )
+    if "error" in result:
+        return result
+    return StreamingResponse(
+        result["content"],
+        media_type=result["media_type"],
+        headers={
+            "Content-Disposition": f'attachment; filename="{result["download_name"]}"',
+            "X-Total-Rows": str(result["rows"]),
+        },
+    )
+
+@router.post("/decision-tree-jobs")
+async def submit_decision_tree_job(
+    filename: str = Form(...),
+    variables_explicatives: str = Form(...),
+    variable_a_expliquer: str = Form(...),
+    selected_data: str = Form(...),
+    min_population_threshold: Optional[int] = Form(None),
+    treatment_mode: Optional[str] = Form('independent'),
+    n_workers: Optional[int] = Form(None),
+    max_depth: Optional[int] = Form(None),
+    max_nodes: Optional[int] = Form(None),
+    max_branches_per_node: Optional[int] = Form(None),
+    time_limit: Optional[float] = Form(None)
+):
+    """
+    Soumet la construction de l'arbre (et du PDF) en tâche de fond.
+    Retourne immédiatement un identifiant de job à interroger ensuite
+    (429 si trop de jobs sont déjà en attente ou en cours).
+    """
+    parsed = _parse_tree_form(variables_explicatives, variable_a_expliquer, selected_data)
+    if isinstance(parsed, dict):
+        return parsed
+    variables_explicatives_list, variables_a_expliquer_list, selected_data_dict = parsed
+    
+    job = tree_jobs.create({"filename": filename})
+    if job is None:
+        return FastJSONResponse(
+            {"error": f"Trop de constructions en attente ({tree_jobs.max_active}), réessayez plus tard"},
+            status_code=429,
+        )
+    job.task = asyncio.create_task(job_runner.run(
+        "build-decision-tree",
+        tree_jobs.run,
+        job,
+        excel_controller.build_decision_tree_with_pdf,
+        filename,
+        variables_explicatives_list,
+        variables_a_expliquer_list,
+        selected_data_dict,
+        min_population_threshold,
+        treatment_mode,
+        n_workers,
+        max_depth,
+        max_nodes,
+        max_branches_per_node,
+        time_limit
+    ))
+    return job.status_dict()
+
+@router.get("/decision-tree-jobs/{job_id}")
+async def decision_tree_job_status(job_id: str):
+    job = tree_jobs.get(job_id)
+    if job is None:
+        return {"error": "Job introuvable ou expiré"}
+    return job.status_dict()
+
+@router.get("/decision-tree-jobs/{job_id}/result")
+async def decision_tree_job_result(job_id: str):
+    job = tree_jobs.get(job_id)
+    if job is None:
+        return {"error": "Job introuvable ou expiré"}
+    if job.status != "done":
+        return {**job.status_dict(), "error": f"Résultat non disponible (statut: {job.status})"}
+    return job.result
+
+@router.delete("/decision-tree-jobs/{job_id}")
+async def cancel_decision_tree_job(job_id: str):
+    job = tree_jobs.cancel(job_id)
+    if job is None:
+        return {"error": "Job introuvable ou expiré"}
+    return job.status_dict()
+
+@router.get("/ingestion-stats")
+async def ingestion_stats():
+    # Cache des types inférés pour les CSV
+    return excel_controller.get_ingestion_stats()
@@ -0,0 +1,77 @@
+"""
+Compare les moteurs de lecture Excel (services.excel_reader) sur des classeurs générés.
+
+Usage (depuis le dossier api/) :
+    python scripts/benchmark_excel_engines.py
+    python scripts/benchmark_excel_engines.py --rows 10000 100000 --engines calamine openpyxl
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+import numpy as np
+from openpyxl import Workbook
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from services import excel_reader  # noqa: E402
+
+COLUMNS = ["sexe", "age", "meteo", "route", "vitesse", "taux", "gravite"]
+
+
+def generate_workbook(n_rows: int, seed: int = 0) -> bytes:
+    """Classeur .xlsx de n_rows lignes (mélange de colonnes texte, entières, décimales et vides)."""
+    rng = np.random.default_rng(seed)
+    columns = [
+        rng.choice(["H", "F"], n_rows).tolist(),
+        rng.choice(["jeune", "adulte", "senior"], n_rows).tolist(),
+        rng.choice(["pluie", "soleil", "neige", "brouillard"], n_rows).tolist(),
+        [f"R{i}" for i in rng.integers(0, 200, n_rows)],
+        rng.integers(30, 130, n_rows).tolist(),
+        np.round(rng.random(n_rows), 3).tolist(),
+        rng.choice(["leger", "grave", "mortel", ""], n_rows).tolist(),
+    ]
+    # Mode write_only : génération rapide, même pour 1M de lignes
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(COLUMNS)
+    for row in zip(*columns):
+        sheet.append([value if value != "" else None for value in row])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def time_engine(data: bytes, engine: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        excel_reader.read_excel(io.BytesIO(data), "benchmark.xlsx", engine)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--engines", nargs="+", default=excel_reader.available_engines())
+    parser.add_argument("--repeat", type=int, default=1, help="meilleur temps sur N lectures")
+    args = parser.parse_args()
+
+    print(f"Moteurs disponibles : {', '.join(excel_reader.available_engines())}")
+    print(f"{'lignes':>10} {'taille (Mo)':>12} " + " ".join(f"{engine:>12}" for engine in args.engines))
+    for n_rows in args.rows:
+        data = generate_workbook(n_rows)
+        timings = []
+        for engine in args.engines:
+            try:
+                timings.append(f"{time_engine(data, engine, args.repeat):>11.2f}s")
+            except ValueError:
+                timings.append(f"{'n/d':>12}")
+        print(f"{n_rows:>10} {len(data) / 1e6:>12.1f} " + " ".join(timings))
+
+
+if __name__ == "__main__":
+    main()
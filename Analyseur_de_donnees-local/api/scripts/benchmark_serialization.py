@@ -0,0 +1,79 @@
+"""
+Compare la sérialisation des listes de valeurs : boucle isinstance + jsonable_encoder +
+JSONResponse (chemin historique) contre services.serialization + FastJSONResponse (orjson).
+
+Usage (depuis le dossier api/) :
+    python scripts/benchmark_serialization.py
+    python scripts/benchmark_serialization.py --rows 100000 1000000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from services import serialization  # noqa: E402
+from services.serialization import FastJSONResponse  # noqa: E402
+
+
+def legacy_convert(values):
+    converted = []
+    for val in values:
+        if pd.isna(val):
+            converted.append(None)
+        elif isinstance(val, (np.integer, np.floating)):
+            converted.append(float(val) if isinstance(val, np.floating) else int(val))
+        else:
+            converted.append(str(val))
+    return converted
+
+
+def generate_columns(n_rows: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    return {
+        "texte (catégorie)": pd.Series(rng.choice(["pluie", "soleil", "neige", None], n_rows)).astype("category"),
+        "texte (objet)": pd.Series([f"ID{i}" for i in rng.integers(0, n_rows, n_rows)], dtype=object),
+        "entier": pd.Series(rng.integers(0, 1000, n_rows)),
+        "décimal": pd.Series(np.where(rng.random(n_rows) < 0.1, np.nan, rng.random(n_rows))),
+    }
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3, help="meilleur temps sur N exécutions")
+    args = parser.parse_args()
+
+    print(f"{'lignes':>10} {'colonne':<20} {'historique':>12} {'vectorisé':>12} {'gain':>7}")
+    for n_rows in args.rows:
+        for name, series in generate_columns(n_rows).items():
+            def legacy():
+                content = jsonable_encoder({"values": legacy_convert(series.tolist())})
+                JSONResponse(content)
+
+            def vectorized():
+                FastJSONResponse({"values": serialization.string_values(series)})
+
+            assert legacy_convert(series.tolist()) == serialization.string_values(series)
+            t_legacy = best_of(legacy, args.repeat)
+            t_fast = best_of(vectorized, args.repeat)
+            print(f"{n_rows:>10} {name:<20} {t_legacy:>11.3f}s {t_fast:>11.3f}s {t_legacy / t_fast:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
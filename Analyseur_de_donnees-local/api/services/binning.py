@@ -0,0 +1,84 @@
+import math
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Discrétisation vectorisée de colonnes numériques.
+# Les bornes sont calculées selon une stratégie (largeur fixe, quantiles, bornes explicites),
+# chaque valeur est rangée par np.searchsorted, et le résultat est stocké en Categorical
+# ordonné (codes entiers + étiquettes des intervalles) plutôt qu'en texte.
+# Intervalles : borne gauche incluse, borne droite ouverte, sauf le dernier qui inclut sa borne droite.
+
+STRATEGIES = ("width", "quantile", "edges")
+
+
+def trim_float(x: float) -> str:
+    # Supprimer .0 inutiles, limiter à 6 décimales pour propreté
+    try:
+        s = ("%f" % x).rstrip('0').rstrip('.')
+        if s == "-0":
+            s = "0"
+        return s
+    except Exception:
+        return str(x)
+
+
+def format_label(left: float, right: float, is_last: bool) -> str:
+    # Etiquette avec borne gauche incluse, borne droite ouverte sauf le dernier intervalle
+    if is_last:
+        return f"[{trim_float(left)}–{trim_float(right)}]"
+    return f"[{trim_float(left)}–{trim_float(right)}["
+
+
+def width_edges(s_min: float, s_max: float, bin_size: Optional[float] = None,
+                n_bins: Optional[int] = None) -> np.ndarray:
+    """
+    Bornes à largeur fixe : pas `bin_size` aligné sur ses multiples
+    (floor(min/pas)*pas ... ceil(max/pas)*pas), ou `n_bins` intervalles égaux entre min et max.
+    """
+    if bin_size is not None:
+        start = math.floor(s_min / bin_size) * bin_size
+        end = math.ceil(s_max / bin_size) * bin_size
+        if end <= start:
+            end = start + bin_size
+        return start + bin_size * np.arange(int(round((end - start) / bin_size)) + 1)
+    if s_max <= s_min:
+        return np.array([s_min, s_min + 1.0])
+    return np.linspace(s_min, s_max, n_bins + 1)
+
+
+def quantile_edges(values: np.ndarray, n_bins: int) -> np.ndarray:
+    """Bornes aux quantiles (effectifs à peu près égaux) ; bornes confondues fusionnées."""
+    edges = np.unique(np.nanquantile(values, np.linspace(0, 1, n_bins + 1)))
+    if len(edges) < 2:
+        edges = np.array([edges[0], edges[0] + 1.0])
+    return edges
+
+
+def _merge_close_edges(edges: np.ndarray) -> np.ndarray:
+    """Retire les bornes dont l'étiquette arrondie serait identique à la précédente."""
+    texts = [trim_float(float(edge)) for edge in edges]
+    keep = [0] + [i for i in range(1, len(texts)) if texts[i] != texts[i - 1]]
+    if len(keep) < 2:
+        return edges[[0, -1]]
+    # La borne supérieure reste la vraie borne maximale
+    keep[-1] = len(edges) - 1
+    return edges[keep]
+
+
+def cut(values: np.ndarray, edges: np.ndarray) -> Tuple[pd.Categorical, List[int]]:
+    """
+    Range chaque valeur dans son intervalle (valeurs manquantes ou hors bornes -> manquant).
+    Retourne (Categorical ordonné, effectif de chaque intervalle).
+    """
+    edges = _merge_close_edges(np.asarray(edges, dtype=np.float64))
+    n_bins = len(edges) - 1
+    codes = np.searchsorted(edges, values, side="right") - 1
+    # La borne supérieure appartient au dernier intervalle
+    codes[values == edges[-1]] = n_bins - 1
+    codes[np.isnan(values) | (codes < 0) | (codes >= n_bins)] = -1
+
+    labels = [format_label(float(edges[i]), float(edges[i + 1]), i == n_bins - 1) for i in range(n_bins)]
+    counts = np.bincount(codes[codes >= 0], minlength=n_bins)
+    return pd.Categorical.from_codes(codes, categories=labels, ordered=True), counts.tolist()
@@ -0,0 +1,100 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Index inversé d'une colonne à faible cardinalité, construit à la demande et mémorisé
+# avec le jeu de données (dataset_store.derived, invalidé avec la colonne) :
+# - les lignes de chaque modalité (tableaux d'indices triés, obtenus par un seul tri stable) ;
+# - pour les modalités utilisées dans un filtre, un bitset compacté (np.packbits, 1 bit par ligne),
+#   mémorisé dans la limite de BITMAP_CACHE_MAX_MB par colonne (les moins récemment utilisés
+#   sont oubliés) ; leur taille est comptée dans le budget du stockage (nbytes).
+# Un filtre sur plusieurs colonnes devient un OU des bitsets des valeurs retenues par colonne,
+# puis un ET entre colonnes, sur n/8 octets, au lieu d'un isin sur toute la colonne.
+
+# Au-delà de ce nombre de modalités, la colonne n'est pas indexée (filtre par isin)
+BITMAP_MAX_CARDINALITY = int(os.getenv("BITMAP_MAX_CARDINALITY", "4096"))
+
+# Taille maximale des bitsets mémorisés pour une colonne
+BITMAP_CACHE_MAX_BYTES = int(float(os.getenv("BITMAP_CACHE_MAX_MB", "64")) * 1024 * 1024)
+
+
+class ColumnBitmaps:
+    """Lignes de chaque modalité d'une colonne, et bitsets compactés construits à la demande."""
+
+    def __init__(self, series: pd.Series, codes: np.ndarray, uniques: pd.Index,
+                 max_cache_bytes: int = BITMAP_CACHE_MAX_BYTES):
+        self.n_rows = int(len(codes))
+        self.uniques = uniques
+        # Lignes triées par code (-1 = manquant en tête), bornes de chaque code
+        order = np.argsort(codes, kind="stable")
+        self._rows = order.astype(np.int32 if self.n_rows < np.iinfo(np.int32).max else np.int64)
+        self._bounds = np.concatenate([[0], np.cumsum(np.bincount(codes + 1, minlength=len(uniques) + 1))])
+        # Une ligne manquante (même type que la colonne) pour appliquer la sémantique de isin
+        self._missing_probe = series.iloc[self._rows[:1]] if self._bounds[1] > 0 else None
+        # Bitsets mémorisés, du moins au plus récemment utilisé
+        self._bitsets: "OrderedDict[int, np.ndarray]" = OrderedDict()
+        self._cached_bytes = 0
+        self.max_cache_bytes = max_cache_bytes
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self) -> int:
+        """Empreinte (octets) de l'index et des bitsets mémorisés."""
+        return self._rows.nbytes + self._bounds.nbytes + self._cached_bytes
+
+    def rows(self, code: int) -> np.ndarray:
+        """Indices (croissants) des lignes de la modalité `code` (-1 : valeurs manquantes)."""
+        return self._rows[self._bounds[code + 1]:self._bounds[code + 2]]
+
+    def bitset(self, code: int) -> np.ndarray:
+        """Bitset compacté des lignes de la modalité `code`, mémorisé (LRU) au premier appel."""
+        with self._lock:
+            bits = self._bitsets.get(code)
+            if bits is not None:
+                self._bitsets.move_to_end(code)
+                return bits
+        mask = np.zeros(self.n_rows, dtype=bool)
+        mask[self.rows(code)] = True
+        bits = np.packbits(mask)
+        if bits.nbytes > self.max_cache_bytes:
+            return bits
+        with self._lock:
+            if code not in self._bitsets:
+                self._bitsets[code] = bits
+                self._cached_bytes += bits.nbytes
+            while self._cached_bytes > self.max_cache_bytes:
+                _, evicted = self._bitsets.popitem(last=False)
+                self._cached_bytes -= evicted.nbytes
+        return bits
+
+    def matching_codes(self, values: List[Any]) -> List[int]:
+        """Codes des modalités retenues par `Series.isin(values)` (-1 si les manquants le sont)."""
+        codes = np.flatnonzero(self.uniques.isin(values)).tolist()
+        if self._missing_probe is not None and bool(self._missing_probe.isin(values).iloc[0]):
+            codes.append(-1)
+        return codes
+
+    def isin(self, values: List[Any]) -> np.ndarray:
+        """Bitset compacté équivalent à `Series.isin(values)`."""
+        result = np.zeros((self.n_rows + 7) // 8, dtype=np.uint8)
+        for code in self.matching_codes(values):
+            np.bitwise_or(result, self.bitset(code), out=result)
+        return result
+
+
+def build(series: pd.Series) -> Optional[ColumnBitmaps]:
+    """Index de la colonne, ou None si elle a trop de modalités pour être indexée."""
+    codes, uniques = pd.factorize(series)
+    if len(uniques) > BITMAP_MAX_CARDINALITY:
+        return None
+    return ColumnBitmaps(series, codes, pd.Index(uniques))
+
+
+def to_mask(bits: np.ndarray, n_rows: int) -> np.ndarray:
+    """Masque booléen (une valeur par ligne) d'un bitset compacté."""
+    return np.unpackbits(bits, count=n_rows).astype(bool)
+
@@ -0,0 +1,445 @@
+import itertools
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from services.disk_cache import CACHE_DIR, DiskCache
+
+# Stockage en mémoire des jeux de données chargés, borné en taille.
+# Chaque colonne est mesurée avec `memory_usage(deep=True)`, une seule fois par tampon de
+# données : les jeux qui partagent des colonnes (copies superficielles d'un même import)
+# ne les comptent qu'une fois. Les résultats dérivés (index, bitmaps, statistiques)
+# s'ajoutent à l'empreinte de leur jeu. Quand le budget est dépassé, les jeux les moins
+# récemment utilisés sont évincés. Les jeux inactifs depuis plus de DATASET_IDLE_TTL
+# secondes sont également évincés.
+# Chaque état est aussi écrit dans le cache disque (services.disk_cache), par un thread
+# dédié (hors du chemin des requêtes) : un jeu évincé, ou perdu au redémarrage, est
+# rechargé à la demande sans ré-import. Un jeu évincé dont l'écriture n'est pas terminée
+# est repris tel quel.
+# Un jeu peut être chargé en arrière-plan (load_async) : get() attend alors la fin
+# du chargement, les autres méthodes ne bloquent pas.
+# Les résultats dérivés d'un jeu (statistiques par colonne...) sont mémorisés avec lui
+# (derived) et invalidés colonne par colonne lors des modifications.
+# Un DataFrame publié n'est jamais modifié : une modification (ajout ou suppression de
+# colonnes) se fait sur une copie superficielle, publiée par replace() sous le verrou
+# d'écriture du jeu (writing) ; les lectures en cours gardent l'état qu'elles ont obtenu.
+
+# Threads dédiés aux chargements en arrière-plan (distincts du pool des endpoints,
+# qui peuvent attendre ces chargements)
+LOADER_WORKERS = int(os.getenv("DATASET_LOADER_WORKERS", "2"))
+
+# Numéros d'état, uniques dans le processus (voir state_token)
+_states = itertools.count(1)
+
+
+def _buffer_key(series: pd.Series) -> Hashable:
+    """Identifiant du tampon de données d'une colonne, commun aux copies superficielles."""
+    array = series.array
+    if isinstance(series.dtype, np.dtype):
+        data = series.to_numpy(copy=False)
+    elif isinstance(series.dtype, pd.CategoricalDtype):
+        data = array.codes
+    else:
+        return ("array", id(array))
+    return ("buffer", data.__array_interface__["data"][0], data.nbytes)
+
+
+def column_sizes(df: pd.DataFrame, known: Optional[Dict[Hashable, int]] = None) -> Dict[Hashable, int]:
+    """
+    Empreinte mémoire réelle (objets Python inclus) de l'index et de chaque colonne, en octets,
+    par tampon de données. Les tampons déjà mesurés (`known`) ne sont pas remesurés.
+    """
+    known = known or {}
+    keys = [("index", id(df.index))] + [_buffer_key(df.iloc[:, i]) for i in range(df.shape[1])]
+    if all(key in known for key in keys):
+        return {key: known[key] for key in keys}
+    usage = df.memory_usage(index=True, deep=True)
+    return {key: known.get(key, int(size)) for key, size in zip(keys, usage)}
+
+
+def object_size(value: Any) -> int:
+    """Empreinte estimée d'un résultat dérivé sans attribut `nbytes` (dict, listes, scalaires)."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(object_size(k) + object_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(object_size(v) for v in value)
+    return size
+
+
+class _Entry:
+    def __init__(self, df: pd.DataFrame, content_hash: Optional[str] = None, version: int = 0):
+        self.df = df
+        self.content_hash = content_hash  # hash du fichier importé
+        self.version = version            # incrémentée à chaque modification en place
+        self.disk_key = content_hash      # clé de cet état dans le cache disque
+        self.state = next(_states)        # renouvelé à chaque modification en place
+        self.columns = column_sizes(df)   # empreinte par tampon de données
+        self.loaded_at = time.time()
+        self.last_access = self.loaded_at
+        self.hits = 0
+        # Résultats dérivés, par clé (type, colonne, ...), et leur empreinte
+        self.derived: Dict[Tuple[Hashable, ...], Any] = {}
+        self.derived_sizes: Dict[Tuple[Hashable, ...], int] = {}
+
+    def derived_bytes(self) -> int:
+        # Les objets exposant `nbytes` (index de valeurs, bitmaps) sont remesurés :
+        # leurs caches internes peuvent grossir après leur mise en mémoire
+        return sum(
+            int(getattr(value, "nbytes", self.derived_sizes.get(key, 0)))
+            for key, value in self.derived.items()
+        )
+
+    @property
+    def size(self) -> int:
+        """Empreinte du jeu (colonnes partagées comprises) et de ses résultats dérivés."""
+        return sum(self.columns.values()) + self.derived_bytes()
+
+
+class DatasetStore:
+    """Jeux de données résidents, avec budget mémoire, éviction LRU et TTL d'inactivité."""
+
+    def __init__(self, max_bytes: int, idle_ttl: float, disk: Optional[DiskCache] = None):
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+        self.disk = disk
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._pending: Dict[str, Future] = {}
+        self._loader = ThreadPoolExecutor(max_workers=max(1, LOADER_WORKERS), thread_name_prefix="dataset-loader")
+        # Écritures disque : un seul thread, dans l'ordre des modifications
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="dataset-writer")
+        # Jeux dont l'écriture sur disque est en cours ou en attente
+        self._unsaved: Dict[str, _Entry] = {}
+        # Verrous d'écriture par jeu : les modifications d'un même jeu sont sérialisées
+        self._write_locks: Dict[str, threading.Lock] = {}
+        self.evictions = 0
+
+    @classmethod
+    def from_env(cls) -> "DatasetStore":
+        max_mb = float(os.getenv("DATASET_STORE_MAX_MB", "2048"))
+        idle_ttl = float(os.getenv("DATASET_IDLE_TTL", str(4 * 3600)))  # 0 = pas d'expiration
+        disk = DiskCache(CACHE_DIR) if CACHE_DIR else None
+        return cls(int(max_mb * 1024 * 1024), idle_ttl, disk)
+
+    def __contains__(self, name: str) -> bool:
+        with self._lock:
+            self._expire_idle()
+            if name in self._entries or name in self._pending or name in self._unsaved:
+                return True
+        return self.disk is not None and self.disk.lookup(name) is not None
+
+    def get(self, name: str) -> Optional[pd.DataFrame]:
+        """
+        Retourne le DataFrame (et le marque comme récemment utilisé), ou None.
+        Un jeu en cours de chargement est attendu (une erreur de lecture est propagée) ;
+        un jeu absent de la mémoire est rechargé depuis le cache disque s'il y figure.
+        """
+        with self._lock:
+            future = self._pending.get(name)
+        if future is not None:
+            future.result()
+        with self._lock:
+            self._expire_idle()
+            entry = self._entries.get(name)
+            if entry is not None:
+                entry.last_access = time.time()
+                entry.hits += 1
+                self._entries.move_to_end(name)
+                return entry.df
+        return self._load_from_disk(name)
+
+    def _load_from_disk(self, name: str) -> Optional[pd.DataFrame]:
+        with self._lock:
+            # Évincé avant la fin de son écriture : l'état en mémoire est repris
+            entry = self._unsaved.get(name)
+            if entry is not None and name not in self._entries:
+                entry.last_access = time.time()
+                entry.hits += 1
+                self._entries[name] = entry
+                self._enforce_budget(keep=name)
+                return entry.df
+        if self.disk is None:
+            return None
+        key = self.disk.lookup(name)
+        df = self.disk.load_key(key) if key else None
+        if df is None:
+            return None
+        # Clé "<hash>" ou "<hash>.v<version>.<jeton>"
+        content_hash, _, suffix = key.partition(".v")
+        with self._lock:
+            # Un autre thread a pu recharger (ou remplacer) le jeu entre-temps
+            if name in self._entries:
+                return self._entries[name].df
+            entry = _Entry(df, content_hash, int(suffix.split(".")[0] or 0))
+            entry.disk_key = key
+            entry.hits += 1
+            self._entries[name] = entry
+            self._enforce_budget(keep=name)
+        return df
+
+    def find_by_hash(self, content_hash: str) -> Optional[pd.DataFrame]:
+        """
+        DataFrame issu d'un fichier de même contenu (tel que chargé, sans modification),
+        en mémoire ou dans le cache disque ; None s'il n'a jamais été analysé.
+        """
+        with self._lock:
+            for entry in self._entries.values():
+                if entry.content_hash == content_hash and entry.version == 0:
+                    # Copie superficielle : les colonnes ajoutées/supprimées ensuite
+                    # sur l'un des jeux n'affectent pas l'autre ; les colonnes communes
+                    # ne sont comptées qu'une fois dans le budget
+                    return entry.df.copy(deep=False)
+        if self.disk is None:
+            return None
+        return self.disk.load_key(content_hash)
+
+    def put(self, name: str, df: pd.DataFrame, content_hash: Optional[str] = None):
+        """Ajoute (ou remplace) un jeu ; avec content_hash, il est aussi écrit sur disque."""
+        entry = _Entry(df, content_hash)
+        with self._lock:
+            # Remplace aussi un éventuel chargement en cours du même nom
+            self._pending.pop(name, None)
+            self._entries[name] = entry
+            self._entries.move_to_end(name)
+            self._enforce_budget(keep=name)
+        self._persist(name, entry)
+
+    def load_async(self, name: str, loader: Callable[[], pd.DataFrame], content_hash: Optional[str] = None) -> Future:
+        """
+        Charge le jeu en arrière-plan avec `loader()` ; en attendant, get(name) bloque.
+        Si le chargement échoue, les get() en attente reçoivent l'erreur, puis le jeu est absent.
+        Un nouvel import du même nom annule l'effet d'un chargement antérieur.
+        """
+        current: Dict[str, Future] = {}
+
+        def run() -> Optional[_Entry]:
+            try:
+                entry = _Entry(loader(), content_hash)
+            except BaseException:
+                # Chargement en échec : le jeu est oublié (les get() déjà en attente reçoivent l'erreur)
+                with self._lock:
+                    if self._pending.get(name) is current["future"]:
+                        del self._pending[name]
+                raise
+            # Inséré avant la fin du futur : au réveil, get() trouve le jeu en mémoire
+            with self._lock:
+                if self._pending.get(name) is not current["future"]:
+                    return None  # remplacé par un import plus récent
+                self._entries[name] = entry
+                self._entries.move_to_end(name)
+                self._enforce_budget(keep=name)
+                del self._pending[name]
+            return entry
+
+        def persist(future: Future):
+            if future.exception() is None and future.result() is not None:
+                self._persist(name, future.result())
+
+        with self._lock:
+            self._entries.pop(name, None)
+            future = self._loader.submit(run)
+            current["future"] = future
+            self._pending[name] = future
+        future.add_done_callback(persist)
+        return future
+
+    @contextmanager
+    def writing(self, name: str) -> Iterator[None]:
+        """
+        Verrou d'écriture du jeu `name` : lire le jeu, en calculer la nouvelle version
+        et la publier (replace) sous ce verrou, pour ne perdre aucune modification concurrente.
+        """
+        with self._lock:
+            lock = self._write_locks.setdefault(name, threading.Lock())
+        with lock:
+            yield
+
+    def replace(self, name: str, df: pd.DataFrame, columns: Iterable[Hashable] = ()):
+        """
+        Publie une nouvelle version du jeu (même origine, version suivante, nouvel identifiant
+        d'état), écrite sur disque, et oublie les résultats dérivés des colonnes `columns`
+        (ajoutées, modifiées ou supprimées).
+        """
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                return
+            # DataFrame, résultats dérivés et état changent ensemble (voir derived)
+            entry.df = df
+            self._invalidate(entry, columns)
+            entry.version += 1
+            entry.state = next(_states)
+            if entry.content_hash is not None:
+                entry.disk_key = f"{entry.content_hash}.v{entry.version}.{uuid.uuid4().hex[:16]}"
+            entry.columns = column_sizes(entry.df, entry.columns)
+            entry.last_access = time.time()
+            self._entries.move_to_end(name)
+            self._enforce_budget(keep=name)
+        self._persist(name, entry)
+
+    def state_token(self, name: str) -> Optional[int]:
+        """
+        Identifiant de l'état courant du jeu `name` (None s'il n'est pas en mémoire).
+        Il change à chaque replace() et à chaque remplacement ou rechargement du jeu :
+        un résultat mémorisé sous cet identifiant correspond exactement aux données actuelles.
+        """
+        with self._lock:
+            entry = self._entries.get(name)
+            return entry.state if entry is not None else None
+
+    def _persist(self, name: str, entry: _Entry):
+        """Écrit l'état courant du jeu sur disque, en arrière-plan."""
+        if self.disk is None or entry.disk_key is None:
+            return
+        # Copie superficielle : l'ensemble des colonnes écrites est celui de cet état
+        key, df = entry.disk_key, entry.df.copy(deep=False)
+        with self._lock:
+            self._unsaved[name] = entry
+
+        def write():
+            try:
+                self.disk.save(name, key, df)
+            except OSError:
+                # Le cache disque est une optimisation : une erreur d'écriture n'est pas bloquante
+                pass
+            finally:
+                with self._lock:
+                    if self._unsaved.get(name) is entry and entry.disk_key == key:
+                        del self._unsaved[name]
+
+        self._writer.submit(write)
+
+    def flush(self):
+        """Attend la fin des écritures disque en attente."""
+        self._writer.submit(lambda: None).result()
+
+    def derived(self, name: str, key: Tuple[Hashable, ...], compute: Callable[[], Any]) -> Any:
+        """
+        Résultat dérivé du jeu `name`, calculé par `compute()` au premier appel puis mémorisé.
+        La clé est un tuple (type, colonne, ...) : voir invalidate_columns.
+        """
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and key in entry.derived:
+                return entry.derived[key]
+            state = entry.state if entry is not None else None
+        value = compute()
+        with self._lock:
+            # Jeu remplacé ou modifié entre-temps : le résultat n'est pas mémorisé
+            if entry is not None and self._entries.get(name) is entry and entry.state == state:
+                entry.derived[key] = value
+                if not hasattr(value, "nbytes"):
+                    entry.derived_sizes[key] = object_size(value)
+                self._enforce_budget(keep=name)
+        return value
+
+    def invalidate_columns(self, name: str, columns: Iterable[Hashable]):
+        """Oublie les résultats dérivés des colonnes modifiées, ajoutées ou supprimées."""
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None:
+                self._invalidate(entry, columns)
+
+    @staticmethod
+    def _invalidate(entry: _Entry, columns: Iterable[Hashable]):
+        columns = set(columns)
+        for key in [key for key in entry.derived if len(key) > 1 and key[1] in columns]:
+            del entry.derived[key]
+            entry.derived_sizes.pop(key, None)
+
+    def remove(self, name: str):
+        with self._lock:
+            self._pending.pop(name, None)
+            self._entries.pop(name, None)
+            self._unsaved.pop(name, None)
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self._used_bytes()
+
+    def _used_bytes(self) -> int:
+        """Empreinte des jeux en mémoire, chaque tampon de données partagé compté une fois."""
+        buffers: Dict[Hashable, int] = {}
+        derived = 0
+        for entry in self._entries.values():
+            buffers.update(entry.columns)
+            derived += entry.derived_bytes()
+        return sum(buffers.values()) + derived
+
+    def _evict(self, name: str):
+        self._entries.pop(name, None)
+        self.evictions += 1
+
+    def _expire_idle(self):
+        if not self.idle_ttl or self.idle_ttl <= 0:
+            return
+        limit = time.time() - self.idle_ttl
+        for name in [name for name, entry in self._entries.items() if entry.last_access < limit]:
+            self._evict(name)
+
+    def _enforce_budget(self, keep: Optional[str] = None):
+        self._expire_idle()
+        total = self._used_bytes()
+        if total <= self.max_bytes:
+            return
+        # Jeux qui référencent chaque tampon : évincer un jeu ne libère que ses colonnes non partagées
+        owners: Dict[Hashable, int] = {}
+        for entry in self._entries.values():
+            for key in entry.columns:
+                owners[key] = owners.get(key, 0) + 1
+        # Du moins récemment utilisé au plus récent ; le jeu courant n'est jamais évincé
+        for name in list(self._entries):
+            if total <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            entry = self._entries[name]
+            total -= entry.derived_bytes()
+            for key, size in entry.columns.items():
+                owners[key] -= 1
+                if owners[key] == 0:
+                    total -= size
+            self._evict(name)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._expire_idle()
+            now = time.time()
+            datasets = [
+                {
+                    "filename": name,
+                    "rows": int(len(entry.df)),
+                    "columns": int(len(entry.df.columns)),
+                    "memory_bytes": entry.size,
+                    "derived_bytes": entry.derived_bytes(),
+                    "content_hash": entry.content_hash,
+                    "version": entry.version,
+                    "hits": entry.hits,
+                    "idle_seconds": round(now - entry.last_access, 1),
+                }
+                for name, entry in reversed(self._entries.items())
+            ]
+            return {
+                "max_bytes": self.max_bytes,
+                "used_bytes": self._used_bytes(),
+                "idle_ttl_seconds": self.idle_ttl,
+                "disk_cache": self.disk.directory if self.disk else None,
+                "disk_cache_max_bytes": self.disk.max_bytes if self.disk else None,
+                "disk_writes_pending": len(self._unsaved),
+                "evictions": self.evictions,
+                "loading": sorted(name for name, future in self._pending.items() if not future.done()),
+                "datasets": datasets,
+            }
+
+
+dataset_store = DatasetStore.from_env()
@@ -0,0 +1,187 @@
+import json
+import os
+import threading
+from typing import Dict, Optional
+
+import pandas as pd
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # pyarrow absent : repli sur pickle
+    feather = None
+
+# Cache disque des jeux de données analysés.
+# Chaque état d'un jeu est écrit une fois, sous une clé dérivée du hash du contenu
+# du fichier importé ("<sha256>" pour le fichier tel que chargé, "<sha256>.v<n>.<jeton>"
+# après modifications : le jeton, unique par état, distingue deux jeux de même contenu
+# modifiés séparément). La taille du cache est bornée (DATASET_CACHE_MAX_MB) : les
+# fichiers les moins récemment utilisés sont supprimés. Le format Feather (non compressé) permet une relecture en
+# mémoire mappée ; les DataFrames qu'Arrow ne sait pas restituer à l'identique
+# (colonnes objet mêlant nombres et None, noms de colonnes non textuels) sont picklés.
+
+# Répertoire du cache (chaîne vide = cache disque désactivé)
+CACHE_DIR = os.getenv("DATASET_CACHE_DIR", "./dataset_cache")
+
+# Taille maximale du cache disque (0 = pas de limite)
+CACHE_MAX_BYTES = int(float(os.getenv("DATASET_CACHE_MAX_MB", "10240")) * 1024 * 1024)
+
+_FORMATS = ("feather", "pkl")
+
+_ARROW_SAFE_OBJECTS = {"string", "empty", "boolean"}
+
+
+def _feather_compatible(df: pd.DataFrame) -> bool:
+    if feather is None:
+        return False
+    if not all(isinstance(col, str) for col in df.columns) or df.columns.has_duplicates:
+        return False
+    if not isinstance(df.index, pd.RangeIndex):
+        return False
+    for col in df.columns:
+        if df[col].dtype == object and pd.api.types.infer_dtype(df[col], skipna=True) not in _ARROW_SAFE_OBJECTS:
+            return False
+    return True
+
+
+class DiskCache:
+    """Cache disque des DataFrames, indexé par nom de fichier importé."""
+
+    def __init__(self, directory: str, max_bytes: int = CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._index_path = os.path.join(directory, "index.json")
+        self._index: Dict[str, Dict[str, str]] = self._read_index()
+
+    def _read_index(self) -> Dict[str, Dict[str, str]]:
+        try:
+            with open(self._index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_index(self):
+        tmp_path = self._index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, self._index_path)
+
+    def _path(self, key: str, fmt: str) -> str:
+        return os.path.join(self.directory, f"{key}.{fmt}")
+
+    def _find(self, key: str) -> Optional[str]:
+        for fmt in _FORMATS:
+            if os.path.exists(self._path(key, fmt)):
+                return fmt
+        return None
+
+    def has_key(self, key: str) -> bool:
+        return self._find(key) is not None
+
+    def lookup(self, name: str) -> Optional[str]:
+        """Clé de l'état courant du fichier `name`, ou None."""
+        with self._lock:
+            entry = self._index.get(name)
+            return entry["key"] if entry else None
+
+    def save(self, name: str, key: str, df: pd.DataFrame):
+        """Écrit le DataFrame sous `key` (si absent) et associe le fichier `name` à cette clé."""
+        if not self.has_key(key):
+            fmt = "feather" if _feather_compatible(df) else "pkl"
+            path = self._path(key, fmt)
+            tmp_path = path + ".tmp"
+            try:
+                if fmt == "feather":
+                    feather.write_feather(df, tmp_path, compression="uncompressed")
+                else:
+                    df.to_pickle(tmp_path)
+            except Exception:
+                # Arrow peut refuser certains contenus : repli sur pickle
+                fmt = "pkl"
+                path = self._path(key, fmt)
+                df.to_pickle(tmp_path)
+            os.replace(tmp_path, path)
+
+        with self._lock:
+            previous = self._index.get(name, {}).get("key")
+            self._index[name] = {"key": key}
+            self._write_index()
+            if previous and previous != key:
+                self._discard_if_unused(previous)
+            self._sweep(keep=key)
+
+    def _sweep(self, keep: str):
+        """Supprime les fichiers les moins récemment utilisés tant que le cache dépasse sa taille."""
+        if not self.max_bytes or self.max_bytes <= 0:
+            return
+        files = []
+        for filename in os.listdir(self.directory):
+            key, _, fmt = filename.rpartition(".")
+            if fmt not in _FORMATS:
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, filename))
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, key, filename))
+        total = sum(size for _, size, _, _ in files)
+        removed = set()
+        # Du moins récemment utilisé au plus récent ; le fichier qui vient d'être écrit est conservé
+        for _, size, key, filename in sorted(files):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            try:
+                os.remove(os.path.join(self.directory, filename))
+            except OSError:
+                continue
+            total -= size
+            removed.add(key)
+        if removed:
+            for name in [name for name, entry in self._index.items() if entry["key"] in removed]:
+                del self._index[name]
+            self._write_index()
+
+    def size_bytes(self) -> int:
+        total = 0
+        for filename in os.listdir(self.directory):
+            if filename.rpartition(".")[2] in _FORMATS:
+                try:
+                    total += os.path.getsize(os.path.join(self.directory, filename))
+                except OSError:
+                    pass
+        return total
+
+    def _discard_if_unused(self, key: str):
+        # Le fichier d'origine (clé = hash du contenu) est conservé pour la déduplication
+        if "." not in key or any(entry["key"] == key for entry in self._index.values()):
+            return
+        fmt = self._find(key)
+        if fmt:
+            try:
+                os.remove(self._path(key, fmt))
+            except OSError:
+                pass
+
+    def load_key(self, key: str) -> Optional[pd.DataFrame]:
+        fmt = self._find(key)
+        if fmt is None:
+            return None
+        path = self._path(key, fmt)
+        try:
+            # Date de modification = dernière utilisation (ordre de suppression de _sweep)
+            os.utime(path)
+        except OSError:
+            pass
+        try:
+            if fmt == "feather":
+                return feather.read_feather(path, memory_map=True)
+            return pd.read_pickle(path)
+        except Exception:
+            return None
+
+    def load(self, name: str) -> Optional[pd.DataFrame]:
+        key = self.lookup(name)
+        return self.load_key(key) if key else None
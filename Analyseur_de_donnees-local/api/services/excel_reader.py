@@ -0,0 +1,137 @@
+import importlib.util
+import os
+from typing import IO, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+# Lecture des classeurs Excel, avec choix du moteur.
+# - "calamine" (python-calamine, en Rust) : de loin le plus rapide, utilisé s'il est installé ;
+# - "openpyxl" : lecture en flux (read_only, valeurs seules) de la feuille demandée ;
+# - "pandas" : pd.read_excel par défaut (seul recours pour les .xls sans calamine).
+# Les trois moteurs produisent le même DataFrame que pd.read_excel.
+# Chaque fonction lit la feuille `sheet_name` (par défaut la première).
+
+# Moteur imposé ("auto" = le plus rapide disponible)
+DEFAULT_ENGINE = os.getenv("EXCEL_ENGINE", "auto")
+
+ENGINES = ("calamine", "openpyxl", "pandas")
+
+_EXCEL_ERRORS = {"#NULL!", "#DIV/0!", "#VALUE!", "#REF!", "#NAME?", "#NUM!", "#N/A"}
+
+Source = Union[str, IO[bytes]]
+
+
+def available_engines() -> List[str]:
+    """Moteurs utilisables dans l'environnement courant, du plus rapide au plus lent."""
+    engines = []
+    if importlib.util.find_spec("python_calamine") is not None:
+        engines.append("calamine")
+    engines += ["openpyxl", "pandas"]
+    return engines
+
+
+def resolve_engine(filename: str, engine: Optional[str] = None) -> str:
+    """Moteur effectif pour ce fichier (l'ancien format .xls n'est pas lu par openpyxl)."""
+    engine = engine or DEFAULT_ENGINE
+    available = available_engines()
+    if engine != "auto":
+        if engine not in ENGINES:
+            raise ValueError(f"Moteur Excel inconnu : {engine}")
+        if engine not in available:
+            raise ValueError(f"Moteur Excel non disponible : {engine}")
+        return engine
+    for candidate in available:
+        if candidate == "openpyxl" and filename.lower().endswith(".xls"):
+            continue
+        return candidate
+    return "pandas"
+
+
+def _convert_value(value):
+    # Mêmes conversions que le lecteur openpyxl de pandas
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        return int(value) if value.is_integer() else value
+    if isinstance(value, str) and value in _EXCEL_ERRORS:
+        return np.nan
+    return value
+
+
+def list_sheets(source: Source, filename: str) -> List[str]:
+    """Noms des feuilles du classeur, dans l'ordre."""
+    if filename.lower().endswith(".xls"):
+        return pd.ExcelFile(source, engine="calamine" if "calamine" in available_engines() else None).sheet_names
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(source, read_only=True, keep_links=False)
+    try:
+        return list(workbook.sheetnames)
+    finally:
+        workbook.close()
+
+
+def _read_openpyxl_streaming(source: Source, nrows: Optional[int] = None,
+                             sheet_name: Optional[str] = None) -> Tuple[pd.DataFrame, Optional[int]]:
+    """
+    Lit la feuille (les `nrows` premières lignes de données si précisé).
+    Retourne aussi le nombre de lignes de données déclaré par le classeur (balise
+    <dimension>, sans lecture de la feuille), ou None s'il est absent.
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(source, read_only=True, data_only=True, keep_links=False)
+    try:
+        sheet = workbook[sheet_name] if sheet_name is not None else workbook.worksheets[0]
+        declared_rows = sheet.max_row - 1 if sheet.max_row else None
+        sheet.reset_dimensions()
+        data = []
+        last_row_with_data = -1
+        for row_number, row in enumerate(sheet.iter_rows(values_only=True)):
+            if nrows is not None and row_number > nrows:
+                break
+            converted = [_convert_value(value) for value in row]
+            while converted and converted[-1] == "":
+                converted.pop()
+            if converted:
+                last_row_with_data = row_number
+            data.append(converted)
+    finally:
+        workbook.close()
+
+    data = data[: last_row_with_data + 1]
+    if not data:
+        return pd.DataFrame(), declared_rows
+    width = max(len(row) for row in data)
+    data = [row + [""] * (width - len(row)) for row in data]
+    # Même inférence de types que pd.read_excel
+    return TextParser(data, header=0, skip_blank_lines=False).read(), declared_rows
+
+
+def read_excel(source: Source, filename: str, engine: Optional[str] = None,
+               sheet_name: Optional[str] = None) -> Tuple[pd.DataFrame, str]:
+    """Lit une feuille du classeur ; retourne (DataFrame, moteur utilisé)."""
+    engine = resolve_engine(filename, engine)
+    sheet = 0 if sheet_name is None else sheet_name
+    if engine == "calamine":
+        return pd.read_excel(source, engine="calamine", sheet_name=sheet), engine
+    if engine == "openpyxl":
+        return _read_openpyxl_streaming(source, sheet_name=sheet_name)[0], engine
+    return pd.read_excel(source, sheet_name=sheet), engine
+
+
+def read_preview(source: Source, filename: str, nrows: int,
+                 sheet_name: Optional[str] = None) -> Tuple[Optional[pd.DataFrame], Optional[int]]:
+    """
+    Lecture rapide de l'en-tête et des `nrows` premières lignes, sans parcourir la feuille.
+    Retourne (DataFrame partiel, nombre de lignes déclaré), ou (None, None) si le
+    format ne le permet pas (.xls, classeur sans dimension) : il faut alors tout lire.
+    """
+    if filename.lower().endswith(".xls"):
+        return None, None
+    df, declared_rows = _read_openpyxl_streaming(source, nrows, sheet_name)
+    if declared_rows is None:
+        return None, None
+    return df, declared_rows
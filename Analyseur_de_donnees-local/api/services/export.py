@@ -0,0 +1,116 @@
+import io
+import os
+from typing import Dict, Iterator, List
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:  # pyarrow absent : export Arrow indisponible
+    pa = None
+
+# Export en flux des lignes d'un échantillon filtré, par blocs de EXPORT_CHUNK_ROWS lignes.
+# Seul le bloc en cours est matérialisé : la mémoire utilisée ne dépend pas du nombre
+# de lignes exportées. Formats : NDJSON (une ligne JSON par enregistrement), CSV,
+# et flux Arrow IPC (un schéma puis un RecordBatch par bloc).
+
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "50000"))
+
+MEDIA_TYPES: Dict[str, str] = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+EXTENSIONS: Dict[str, str] = {"ndjson": "ndjson", "csv": "csv", "arrow": "arrows"}
+
+
+def available_formats() -> List[str]:
+    return [fmt for fmt in MEDIA_TYPES if fmt != "arrow" or pa is not None]
+
+
+def _chunks(columns: Dict[str, pd.Series], positions: np.ndarray, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    for start in range(0, len(positions), chunk_rows):
+        rows = positions[start:start + chunk_rows]
+        yield pd.DataFrame({name: series.iloc[rows].reset_index(drop=True) for name, series in columns.items()})
+
+
+def _iter_ndjson(columns: Dict[str, pd.Series], positions: np.ndarray, chunk_rows: int) -> Iterator[bytes]:
+    for chunk in _chunks(columns, positions, chunk_rows):
+        yield chunk.to_json(orient="records", lines=True, date_format="iso", force_ascii=False).encode("utf-8")
+
+
+def _iter_csv(columns: Dict[str, pd.Series], positions: np.ndarray, chunk_rows: int) -> Iterator[bytes]:
+    header = True
+    if not len(positions):
+        yield pd.DataFrame(columns=list(columns)).to_csv(index=False).encode("utf-8")
+    for chunk in _chunks(columns, positions, chunk_rows):
+        yield chunk.to_csv(index=False, header=header).encode("utf-8")
+        header = False
+
+
+def _arrow_field(name: str, series: pd.Series) -> "pa.Field":
+    """
+    Champ Arrow d'une colonne. Les colonnes objet sont typées d'après toutes leurs valeurs
+    (une colonne vide donnerait le type null) ; les contenus mixtes sont exportés en texte.
+    """
+    if series.dtype != object:
+        return pa.Schema.from_pandas(pd.DataFrame({name: series.iloc[:0]}), preserve_index=False).field(name)
+    object_types = {
+        "boolean": pa.bool_(),
+        "integer": pa.int64(),
+        "floating": pa.float64(),
+        "mixed-integer-float": pa.float64(),
+    }
+    return pa.field(name, object_types.get(pd.api.types.infer_dtype(series, skipna=True), pa.string()))
+
+
+def _as_text(series: pd.Series) -> pd.Series:
+    """Valeurs converties en texte (valeurs manquantes conservées)."""
+    return series.map(lambda value: None if value is None or (not isinstance(value, str) and pd.isna(value))
+                      else str(value))
+
+
+def _iter_arrow(columns: Dict[str, pd.Series], positions: np.ndarray, chunk_rows: int) -> Iterator[bytes]:
+    sink = io.BytesIO()
+    schema = pa.schema([_arrow_field(name, series) for name, series in columns.items()])
+    text_columns = [field.name for field in schema
+                    if field.type == pa.string() and columns[field.name].dtype == object]
+    writer = pa.ipc.new_stream(sink, schema)
+
+    def drain() -> bytes:
+        data = sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        return data
+
+    yield drain()
+    for chunk in _chunks(columns, positions, chunk_rows):
+        for name in text_columns:
+            chunk[name] = _as_text(chunk[name])
+        writer.write_batch(pa.RecordBatch.from_pandas(chunk, schema=schema, preserve_index=False))
+        yield drain()
+    writer.close()
+    yield drain()
+
+
+def iter_rows(df: pd.DataFrame, mask: pd.Series, fmt: str, columns: List[str] = None,
+              chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[bytes]:
+    """
+    Lignes de `df` retenues par `mask` (colonnes `columns`, par défaut toutes), encodées
+    au format `fmt` et produites bloc par bloc.
+    Les colonnes sont référencées dès l'appel : une modification ultérieure du DataFrame
+    (colonne supprimée ou recalculée) n'affecte pas un export en cours.
+    """
+    selected = {str(col): df[col] for col in (columns if columns is not None else df.columns)}
+    positions = np.flatnonzero(mask.to_numpy(dtype=bool))
+    if fmt == "ndjson":
+        return _iter_ndjson(selected, positions, chunk_rows)
+    if fmt == "csv":
+        return _iter_csv(selected, positions, chunk_rows)
+    if fmt == "arrow":
+        if pa is None:
+            raise ValueError("L'export Arrow nécessite pyarrow")
+        return _iter_arrow(selected, positions, chunk_rows)
+    raise ValueError(f"Format d'export inconnu: {fmt}")
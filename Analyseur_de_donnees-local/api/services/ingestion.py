@@ -0,0 +1,217 @@
+import csv
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from services import excel_reader
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # pyarrow absent : lecture CSV par pandas, Parquet indisponible
+    pa = None
+    pa_csv = None
+
+# Lecture des fichiers importés, selon leur extension :
+# - Excel (.xlsx, .xls) : services.excel_reader, feuille choisie par son nom ;
+# - CSV : lecture Arrow par blocs (séparateur détecté), relue sans les types mémorisés
+#   s'ils ne conviennent plus, repli sur pd.read_csv ;
+# - Parquet : pd.read_parquet (types déjà présents dans le fichier).
+# Les types inférés d'un CSV sont mémorisés par en-tête : un export de même structure
+# est ensuite relu avec ces types, sans nouvelle inférence.
+# Après lecture, optimize_dtypes compacte les types (catégories, entiers et décimaux réduits).
+
+SUPPORTED_EXTENSIONS = (".xls", ".xlsx", ".csv", ".parquet")
+
+# Taille des blocs lus par le lecteur CSV d'Arrow
+CSV_BLOCK_SIZE = int(os.getenv("CSV_BLOCK_SIZE", str(8 * 1024 * 1024)))
+# Nombre d'en-têtes CSV dont les types sont mémorisés
+DTYPE_CACHE_SIZE = int(os.getenv("DTYPE_CACHE_SIZE", "256"))
+
+# Une colonne texte devient catégorielle si (modalités / valeurs non manquantes) <= ce ratio
+CATEGORY_MAX_RATIO = float(os.getenv("CATEGORY_MAX_RATIO", "0.5"))
+
+_SNIFF_BYTES = 64 * 1024
+
+
+def file_kind(filename: str) -> Optional[str]:
+    """"excel", "csv", "parquet", ou None si l'extension n'est pas prise en charge."""
+    name = filename.lower()
+    if name.endswith((".xls", ".xlsx")):
+        return "excel"
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith(".parquet"):
+        return "parquet"
+    return None
+
+
+def list_sheets(source: io.BytesIO, filename: str) -> List[str]:
+    """Feuilles du classeur (liste vide pour un CSV ou un Parquet)."""
+    if file_kind(filename) != "excel":
+        return []
+    source.seek(0)
+    return excel_reader.list_sheets(source, filename)
+
+
+class DtypeCache:
+    """Types de colonnes inférés, par signature d'en-tête CSV (LRU borné)."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._types: "OrderedDict[str, Dict[str, object]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, signature: str) -> Optional[Dict[str, object]]:
+        with self._lock:
+            types = self._types.get(signature)
+            if types is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._types.move_to_end(signature)
+            return types
+
+    def put(self, signature: str, types: Dict[str, object]):
+        with self._lock:
+            self._types[signature] = types
+            self._types.move_to_end(signature)
+            while len(self._types) > self.max_entries:
+                self._types.popitem(last=False)
+
+    def discard(self, signature: str):
+        with self._lock:
+            self._types.pop(signature, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._types), "hits": self.hits, "misses": self.misses}
+
+
+dtype_cache = DtypeCache(DTYPE_CACHE_SIZE)
+
+
+def _sniff_csv(sample: bytes) -> Tuple[str, str, str]:
+    """(séparateur, encodage, signature de l'en-tête) à partir du début du fichier."""
+    # Couper à la dernière fin de ligne complète pour ne pas tronquer un caractère
+    if len(sample) == _SNIFF_BYTES and b"\n" in sample:
+        sample = sample[: sample.rindex(b"\n")]
+    try:
+        text = sample.decode("utf-8-sig")
+        encoding = "utf-8"
+    except UnicodeDecodeError:
+        text = sample.decode("latin-1")
+        encoding = "latin-1"
+    try:
+        delimiter = csv.Sniffer().sniff(text, delimiters=",;\t|").delimiter
+    except csv.Error:
+        delimiter = ","
+    header = text.splitlines()[0] if text else ""
+    signature = hashlib.sha256(f"{delimiter}\x00{encoding}\x00{header}".encode("utf-8")).hexdigest()
+    return delimiter, encoding, signature
+
+
+def _read_csv_arrow(source: io.BytesIO, delimiter: str, encoding: str,
+                    column_types: Optional[Dict[str, object]]) -> Tuple[pd.DataFrame, Dict[str, object]]:
+    source.seek(0)
+    reader = pa_csv.open_csv(
+        source,
+        read_options=pa_csv.ReadOptions(block_size=CSV_BLOCK_SIZE, encoding=encoding),
+        parse_options=pa_csv.ParseOptions(delimiter=delimiter),
+        convert_options=pa_csv.ConvertOptions(column_types=column_types or {}, strings_can_be_null=True),
+    )
+    # Les blocs sont convertis au fil de la lecture ; le schéma est fixé par le premier
+    batches = [batch for batch in reader]
+    table = pa.Table.from_batches(batches, schema=reader.schema)
+    types = {field.name: field.type for field in reader.schema}
+    return table.to_pandas(), types
+
+
+def read_csv(source: io.BytesIO) -> Tuple[pd.DataFrame, str]:
+    """Lit un CSV ; retourne (DataFrame, moteur utilisé)."""
+    source.seek(0)
+    delimiter, encoding, signature = _sniff_csv(source.read(_SNIFF_BYTES))
+
+    if pa_csv is not None:
+        cached = dtype_cache.get(signature)
+        # Types mémorisés d'abord ; s'ils sont contredits par le fichier, nouvelle inférence
+        for column_types in ([cached, None] if cached is not None else [None]):
+            try:
+                df, types = _read_csv_arrow(source, delimiter, encoding, column_types)
+                dtype_cache.put(signature, types)
+                return df, "pyarrow" if column_types is None else "pyarrow (types en cache)"
+            except (pa.ArrowInvalid, pa.ArrowTypeError, UnicodeDecodeError):
+                # Types mémorisés (ou inférés sur le premier bloc) contredits par la suite du fichier
+                dtype_cache.discard(signature)
+
+    source.seek(0)
+    return pd.read_csv(source, sep=delimiter, encoding=encoding), "pandas"
+
+
+def read_table(source: io.BytesIO, filename: str, sheet_name: Optional[str] = None) -> Tuple[pd.DataFrame, str]:
+    """Lit le fichier importé (la feuille `sheet_name` pour un classeur) ; retourne (DataFrame, moteur)."""
+    kind = file_kind(filename)
+    source.seek(0)
+    if kind == "csv":
+        return read_csv(source)
+    if kind == "parquet":
+        if pa is None:
+            raise ValueError("La lecture des fichiers Parquet nécessite pyarrow")
+        return pd.read_parquet(source), "pyarrow"
+    return excel_reader.read_excel(source, filename, sheet_name=sheet_name)
+
+
+def _compact_column(series: pd.Series) -> Tuple[pd.Series, Optional[str]]:
+    """Version compacte (sans perte) d'une colonne, et le nom de la conversion appliquée."""
+    kind = series.dtype.kind
+    if kind == "f":
+        # ±inf traités comme des valeurs manquantes (comme l'ancien replace)
+        series = series.replace([np.inf, -np.inf], np.nan)
+        as_float32 = series.astype(np.float32)
+        if series.dtype != np.float32 and ((as_float32.astype(series.dtype) == series) | series.isna()).all():
+            return as_float32, "float32"
+        return series, None
+    if kind in "iu":
+        compact = pd.to_numeric(series, downcast="integer" if kind == "i" else "unsigned")
+        return compact, (str(compact.dtype) if compact.dtype != series.dtype else None)
+    if kind == "O":
+        if pd.api.types.infer_dtype(series, skipna=True) == "string":
+            count = int(series.count())
+            if count and series.nunique(dropna=True) <= CATEGORY_MAX_RATIO * count:
+                return series.astype("category"), "category"
+        # Colonnes objet restantes : valeurs manquantes et infinies -> None
+        return series.replace([np.nan, np.inf, -np.inf], None), None
+    return series, None
+
+
+def optimize_dtypes(df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, object]]:
+    """
+    Compacte les types d'un DataFrame importé :
+    - colonnes numériques conservées numériques (manquants = NaN), entiers réduits
+      (int8/int16/int32) et décimaux passés en float32 quand c'est exact ;
+    - colonnes texte à faible cardinalité converties en `category`.
+    Retourne (DataFrame, rapport mémoire avant/après).
+    """
+    before = int(df.memory_usage(index=True, deep=True).sum())
+    df = df.copy(deep=False)
+    conversions: Dict[str, str] = {}
+    for position, col in enumerate(df.columns):
+        compact, conversion = _compact_column(df.iloc[:, position])
+        df.isetitem(position, compact)
+        if conversion:
+            conversions[str(col)] = conversion
+    after = int(df.memory_usage(index=True, deep=True).sum())
+    return df, {
+        "before_bytes": before,
+        "after_bytes": after,
+        "saved_percent": round((1 - after / before) * 100, 1) if before else 0.0,
+        "conversions": conversions,
+    }
@@ -0,0 +1,179 @@
+import asyncio
+import functools
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+# Exécution des traitements lourds (pandas, ReportLab) hors de la boucle d'événements.
+# Les routeurs passent par `job_runner.run(endpoint, fonction, ...)` : la fonction
+# synchrone du contrôleur s'exécute dans un pool de threads borné, avec une limite
+# de concurrence par endpoint (les requêtes en excès attendent leur tour).
+
+
+# Limites par défaut : les constructions d'arbre ne doivent pas occuper tout le pool
+DEFAULT_LIMITS = {"build-decision-tree": 2}
+
+
+def _parse_limits(raw: str) -> Dict[str, int]:
+    # Format : "build-decision-tree=2,preview=4"
+    limits = {}
+    for item in raw.split(','):
+        if '=' not in item:
+            continue
+        name, value = item.split('=', 1)
+        try:
+            limits[name.strip()] = max(1, int(value))
+        except ValueError:
+            pass
+    return limits
+
+
+class _EndpointStats:
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_run = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        done = self.completed + self.failed
+        return {
+            "limit": self.limit,
+            "queued": self.queued,
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_wait_ms": round(self.total_wait / done * 1000, 2) if done else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 2),
+            "avg_run_ms": round(self.total_run / done * 1000, 2) if done else 0.0,
+        }
+
+
+class JobRunner:
+    """Pool de threads borné avec limites de concurrence et métriques par endpoint."""
+
+    def __init__(self, max_workers: int, limits: Optional[Dict[str, int]] = None):
+        self.max_workers = max_workers
+        self._limits = limits or {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="excel-job")
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._stats: Dict[str, _EndpointStats] = {}
+        self._lock = threading.Lock()
+        # Tâches soumises au pool et pas encore démarrées
+        self._pool_queued = 0
+
+    @classmethod
+    def from_env(cls) -> "JobRunner":
+        max_workers = int(os.getenv("JOB_MAX_WORKERS", str(min(8, (os.cpu_count() or 1) + 2))))
+        limits = dict(DEFAULT_LIMITS)
+        limits.update(_parse_limits(os.getenv("JOB_LIMITS", "")))
+        return cls(max_workers, limits)
+
+    def _endpoint(self, endpoint: str):
+        if endpoint not in self._stats:
+            limit = min(self._limits.get(endpoint, self.max_workers), self.max_workers)
+            self._stats[endpoint] = _EndpointStats(limit)
+            self._semaphores[endpoint] = asyncio.Semaphore(limit)
+        return self._semaphores[endpoint], self._stats[endpoint]
+
+    async def run(self, endpoint: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Exécute fn(*args, **kwargs) dans le pool, en respectant la limite de l'endpoint.
+        La place est rendue quand le thread a terminé (ou si la tâche n'a jamais démarré) :
+        l'annulation de la requête en attente ne libère pas une place encore occupée.
+        """
+        semaphore, stats = self._endpoint(endpoint)
+        loop = asyncio.get_running_loop()
+        queued_at = time.perf_counter()
+
+        def job():
+            started_at = time.perf_counter()
+            with self._lock:
+                stats.running += 1
+            failed = True
+            try:
+                result = fn(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                self._record(stats, queued_at, started_at, failed)
+
+        def release(_future):
+            try:
+                loop.call_soon_threadsafe(semaphore.release)
+            except RuntimeError:
+                pass  # boucle d'événements fermée
+
+        # "queued" = requêtes en attente d'une place pour cet endpoint
+        stats.queued += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            stats.queued -= 1
+
+        try:
+            future = self._submit(job)
+        except BaseException:
+            semaphore.release()
+            raise
+        future.add_done_callback(release)
+        return await asyncio.wrap_future(future)
+
+    def _record(self, stats: _EndpointStats, queued_at: float, started_at: float, failed: bool):
+        now = time.perf_counter()
+        wait = started_at - queued_at
+        with self._lock:
+            stats.running -= 1
+            if failed:
+                stats.failed += 1
+            else:
+                stats.completed += 1
+            stats.total_wait += wait
+            stats.max_wait = max(stats.max_wait, wait)
+            stats.total_run += now - started_at
+
+    def _submit(self, fn: Callable[[], Any]) -> Future:
+        """Soumet fn au pool ; la tâche est comptée en file jusqu'à son démarrage (ou son annulation)."""
+        def task():
+            self._dequeued()
+            return fn()
+
+        def cancelled(future: Future):
+            if future.cancelled():
+                self._dequeued()
+
+        with self._lock:
+            self._pool_queued += 1
+        try:
+            future = self._executor.submit(task)
+        except BaseException:
+            self._dequeued()
+            raise
+        future.add_done_callback(cancelled)
+        return future
+
+    def _dequeued(self):
+        with self._lock:
+            self._pool_queued -= 1
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """Soumet une tâche de fond au pool (sans limite par endpoint)."""
+        return self._submit(functools.partial(fn, *args, **kwargs))
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            queued = self._pool_queued
+        return {
+            "max_workers": self.max_workers,
+            "pool_queue_depth": queued,
+            "endpoints": {name: stats.as_dict() for name, stats in self._stats.items()},
+        }
+
+
+job_runner = JobRunner.from_env()
@@ -0,0 +1,171 @@
+import os
+import threading
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from services import tree_engine
+
+# Construction parallèle (optionnelle) de l'arbre de décision.
+# Le processus principal développe la racine de chaque arbre, puis les sous-arbres
+# des branches de premier niveau sont répartis sur un ProcessPoolExecutor.
+# Les tableaux de codes sont placés en mémoire partagée : les workers ne reçoivent
+# que les indices de lignes de leur branche, jamais le DataFrame.
+# Un seul pool de processus, dimensionné au nombre de cœurs, sert toutes les constructions ;
+# chacune limite à `workers` le nombre de ses sous-arbres en cours.
+
+# Nombre de processus par défaut (0 ou 1 = construction séquentielle)
+DEFAULT_WORKERS = int(os.getenv("TREE_BUILD_WORKERS", "0"))
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+# Côté worker : jeu encodé attaché pour la construction en cours
+_attached: Dict[str, Any] = {}
+
+
+def resolve_workers(n_workers: Optional[int]) -> int:
+    """Nombre de processus effectif (borné par le nombre de cœurs)."""
+    workers = DEFAULT_WORKERS if n_workers is None else int(n_workers)
+    return max(0, min(workers, os.cpu_count() or 1))
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    # "spawn" : le serveur est multi-thread, un fork pourrait hériter de verrous tenus
+    # (les processus sont créés à la demande, au plus un par cœur)
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=os.cpu_count() or 1, mp_context=get_context("spawn"))
+        return _executor
+
+
+class SharedDataset:
+    """Copie les codes d'un EncodedDataset et les masques cibles en mémoire partagée."""
+
+    def __init__(self, dataset: tree_engine.EncodedDataset, hits_list: List[np.ndarray]):
+        self._blocks: List[SharedMemory] = []
+        self.spec = {
+            "build_id": uuid.uuid4().hex,
+            "columns": {col: self._share(codes) for col, codes in dataset.codes.items()},
+            "uniques": dataset.uniques,
+            "hits": [self._share(hits) for hits in hits_list],
+        }
+
+    def _share(self, array: np.ndarray) -> Tuple[str, str, Tuple[int, ...]]:
+        block = SharedMemory(create=True, size=max(array.nbytes, 1))
+        self._blocks.append(block)
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+        return block.name, array.dtype.str, array.shape
+
+    def close(self):
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+
+def _attach(spec: Dict[str, Any]) -> Tuple[tree_engine.EncodedDataset, List[np.ndarray]]:
+    """Côté worker : rattache (une seule fois par construction) les tableaux partagés."""
+    cached = _attached.get("build_id")
+    if cached == spec["build_id"]:
+        return _attached["dataset"], _attached["hits"]
+
+    # Libérer la construction précédente
+    old_blocks = _attached.get("blocks", [])
+    _attached.clear()
+    for block in old_blocks:
+        try:
+            block.close()
+        except BufferError:
+            pass
+
+    blocks = []
+
+    def view(desc):
+        name, dtype, shape = desc
+        block = SharedMemory(name=name)
+        blocks.append(block)
+        return np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+
+    codes = {col: view(desc) for col, desc in spec["columns"].items()}
+    dataset = tree_engine.EncodedDataset.from_codes(codes, spec["uniques"])
+    hits_list = [view(desc) for desc in spec["hits"]]
+    _attached.update({"build_id": spec["build_id"], "dataset": dataset, "hits": hits_list, "blocks": blocks})
+    return dataset, hits_list
+
+
+def _build_subtree(spec: Dict[str, Any], tree_index: int, rows: np.ndarray, available_vars: List[str],
+                   current_path: List[str], min_population_threshold: Optional[int],
+                   budget: Optional[tree_engine.TreeBudget] = None) -> Dict[str, Any]:
+    dataset, hits_list = _attach(spec)
+    # Sous-arbre d'une branche de premier niveau : ses nœuds sont de profondeur 2
+    return tree_engine.grow_tree(
+        dataset, rows, hits_list[tree_index], available_vars, current_path, min_population_threshold,
+        budget=budget, depth=2
+    )
+
+
+def build_trees(dataset: tree_engine.EncodedDataset, tree_specs: List[Tuple[np.ndarray, List[str]]],
+                min_population_threshold: Optional[int], workers: int,
+                progress: Optional[tree_engine.BuildProgress] = None,
+                budget: Optional[tree_engine.TreeBudget] = None) -> List[Dict[str, Any]]:
+    """
+    Construit plusieurs arbres (un par masque cible) en répartissant les sous-arbres
+    de premier niveau sur `workers` processus. Le résultat est identique au mode séquentiel.
+    tree_specs : liste de (masque cible, variables explicatives).
+    L'avancement est mis à jour à chaque sous-arbre terminé.
+    Seules les limites locales d'un budget (profondeur, branches par nœud) sont applicables
+    ici (voir TreeBudget.parallelizable).
+    """
+    shared = SharedDataset(dataset, [hits for hits, _ in tree_specs])
+    running = {}
+    try:
+        executor = _get_executor()
+        roots = []
+        # Sous-arbres à construire : (arbre, branche, lignes, variables restantes, chemin)
+        tasks = []
+        all_rows = dataset.all_rows()
+        for tree_index, (hits, variables) in enumerate(tree_specs):
+            root, children = tree_engine.expand_node(
+                dataset, all_rows, hits, list(variables), [], min_population_threshold, progress, budget
+            )
+            roots.append(root)
+            for branch_data, branch_rows, remaining_vars, branch_path in children:
+                tasks.append((tree_index, branch_data, branch_rows, remaining_vars, branch_path))
+
+        remaining = [0] * len(tree_specs)
+        for task in tasks:
+            remaining[task[0]] += 1
+        next_task = 0
+        while next_task < len(tasks) or running:
+            # Au plus `workers` sous-arbres de cette construction en cours
+            while next_task < len(tasks) and len(running) < workers:
+                tree_index, branch_data, branch_rows, remaining_vars, branch_path = tasks[next_task]
+                future = executor.submit(
+                    _build_subtree, shared.spec, tree_index, branch_rows,
+                    remaining_vars, branch_path, min_population_threshold, budget
+                )
+                running[future] = (tree_index, branch_data)
+                next_task += 1
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                tree_index, branch_data = running.pop(future)
+                branch_data["subtree"] = future.result()
+                remaining[tree_index] -= 1
+                if progress is not None:
+                    progress.node_expanded(tree_engine.count_nodes(branch_data["subtree"]))
+                    if remaining[tree_index] == 0:
+                        progress.trees_done += 1
+        if progress is not None:
+            # Arbres sans sous-arbre à développer
+            progress.trees_done = len(tree_specs)
+        return roots
+    finally:
+        for future in running:
+            future.cancel()
+        shared.close()
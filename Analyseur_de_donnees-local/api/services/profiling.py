@@ -0,0 +1,136 @@
+import math
+import os
+import warnings
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Profil des colonnes d'un jeu de données, calculé par opérations groupées :
+# valeurs manquantes et cardinalités pour tout le DataFrame en une fois, quantiles
+# de toutes les colonnes numériques en un seul appel, histogrammes de toutes les
+# colonnes numériques en un seul np.bincount. Seules les fréquences (top-k) sont
+# calculées colonne par colonne.
+
+# Au-delà de ce nombre de lignes, le mode échantillonné profile un échantillon aléatoire
+PROFILE_SAMPLE_ROWS = int(os.getenv("PROFILE_SAMPLE_ROWS", "200000"))
+
+QUANTILES = (0.0, 0.05, 0.25, 0.5, 0.75, 0.95, 1.0)
+
+
+def _native(value: Any) -> Any:
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        return float(value)
+    return str(value)
+
+
+def _nice_step(step: float) -> float:
+    """Arrondit un pas à 1, 2 ou 5 × 10^k (pas lisible pour /excel/bin-variable)."""
+    if not step or not math.isfinite(step) or step <= 0:
+        return 0.0
+    exponent = math.floor(math.log10(step))
+    fraction = step / 10 ** exponent
+    nice = 1 if fraction < 1.5 else 2 if fraction < 3.5 else 5 if fraction < 7.5 else 10
+    return float(nice * 10 ** exponent)
+
+
+def _histograms(values: np.ndarray, mins: np.ndarray, maxs: np.ndarray, bins: int) -> np.ndarray:
+    """
+    Histogrammes à `bins` intervalles égaux de chaque colonne d'une matrice (NaN ignorés),
+    en un seul np.bincount sur des indices décalés par colonne. Retourne (colonnes × bins).
+    """
+    n_cols = values.shape[1]
+    widths = np.where(maxs > mins, maxs - mins, 1.0)
+    with np.errstate(invalid="ignore"):
+        positions = np.floor((values - mins) / widths * bins)
+    valid = ~np.isnan(positions)
+    # Le maximum tombe dans le dernier intervalle (borne droite incluse, comme np.histogram)
+    idx = np.clip(positions[valid], 0, bins - 1).astype(np.int64)
+    offsets = np.broadcast_to(np.arange(n_cols) * bins, values.shape)[valid]
+    counts = np.bincount(idx + offsets, minlength=n_cols * bins)
+    return counts.reshape(n_cols, bins)
+
+
+def profile_dataframe(df: pd.DataFrame, columns: Optional[List[str]] = None, top_k: int = 10,
+                      bins: int = 20, sample: bool = False, seed: int = 0) -> Dict[str, Any]:
+    """
+    Profil de chaque colonne : effectif, valeurs manquantes, cardinalité, valeurs les plus
+    fréquentes ; pour les colonnes numériques, moyenne, écart-type, quantiles, histogramme
+    et pas de discrétisation suggéré (règle de Freedman-Diaconis).
+    """
+    if columns is not None:
+        df = df[columns]
+    total_rows = int(len(df))
+    sampled = bool(sample and total_rows > PROFILE_SAMPLE_ROWS)
+    if sampled:
+        df = df.sample(n=PROFILE_SAMPLE_ROWS, random_state=seed)
+    n = int(len(df))
+
+    null_counts = df.isna().sum().to_numpy()
+    unique_counts = df.nunique(dropna=True).to_numpy()
+
+    # Colonnes numériques (booléens exclus)
+    numeric_positions = [
+        i for i in range(df.shape[1])
+        if pd.api.types.is_numeric_dtype(df.iloc[:, i]) and not pd.api.types.is_bool_dtype(df.iloc[:, i])
+    ]
+    numeric_stats: Dict[int, Dict[str, Any]] = {}
+    if numeric_positions and n:
+        values = np.column_stack([df.iloc[:, i].to_numpy(dtype=np.float64, na_value=np.nan) for i in numeric_positions])
+        counts = np.sum(~np.isnan(values), axis=0)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", category=RuntimeWarning)  # colonnes entièrement vides
+            quantiles = np.nanquantile(values, QUANTILES, axis=0)
+            means = np.nanmean(values, axis=0)
+            stds = np.nanstd(values, axis=0, ddof=1)
+        mins, maxs = quantiles[0], quantiles[-1]
+        histograms = _histograms(values, np.nan_to_num(mins), np.nan_to_num(maxs), bins)
+
+        for j, position in enumerate(numeric_positions):
+            if counts[j] == 0:
+                numeric_stats[position] = {"mean": None, "std": None, "quantiles": None,
+                                           "histogram": None, "suggested_bin_size": None}
+                continue
+            iqr = quantiles[4, j] - quantiles[2, j]
+            fd_width = 2 * iqr / counts[j] ** (1 / 3) if iqr > 0 else (maxs[j] - mins[j]) / bins
+            edges = np.linspace(mins[j], maxs[j], bins + 1) if maxs[j] > mins[j] else np.linspace(mins[j], mins[j] + 1, bins + 1)
+            numeric_stats[position] = {
+                "mean": float(means[j]),
+                "std": float(stds[j]) if counts[j] > 1 else None,
+                "quantiles": {str(q): float(quantiles[k, j]) for k, q in enumerate(QUANTILES)},
+                "histogram": {
+                    "edges": [float(edge) for edge in edges],
+                    "counts": [int(c) for c in histograms[j]],
+                },
+                "suggested_bin_size": _nice_step(float(fd_width)) or None,
+            }
+
+    profiles = []
+    for position, col in enumerate(df.columns):
+        series = df.iloc[:, position]
+        top = series.value_counts(dropna=True, sort=True)
+        top = top[top > 0].head(top_k)  # catégories inutilisées exclues
+        profile = {
+            "column": str(col),
+            "dtype": str(series.dtype),
+            "is_numeric": position in numeric_positions,
+            "count": n - int(null_counts[position]),
+            "null_count": int(null_counts[position]),
+            "null_rate": round(float(null_counts[position]) / n, 6) if n else 0.0,
+            "unique_count": int(unique_counts[position]),
+            "top_values": [{"value": _native(value), "count": int(count)} for value, count in top.items()],
+        }
+        if position in numeric_stats:
+            profile.update(numeric_stats[position])
+        profiles.append(profile)
+
+    return {
+        "total_rows": total_rows,
+        "profiled_rows": n,
+        "sampled": sampled,
+        "columns": profiles,
+    }
@@ -0,0 +1,87 @@
+from typing import Any, Callable, List
+
+import numpy as np
+import pandas as pd
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse
+
+# Conversion groupée des valeurs d'une colonne en types Python natifs, et réponse JSON
+# sérialisée par orjson.
+# Les conversions travaillent sur le tableau typé de la colonne (tolist(), astype(str),
+# table de correspondance des catégories) au lieu d'un test isinstance par valeur.
+# Elles produisent exactement les mêmes listes que les boucles qu'elles remplacent ;
+# les types sans chemin rapide (dates, colonnes objet mixtes) passent par la boucle.
+
+
+def _convert_native(val: Any) -> Any:
+    # Conversion historique, valeur par valeur
+    if pd.isna(val):
+        return None
+    if isinstance(val, (np.integer, np.floating)):
+        return float(val) if isinstance(val, np.floating) else int(val)
+    return str(val)
+
+
+def _convert_str(val: Any) -> Any:
+    return None if pd.isna(val) else str(val)
+
+
+def _as_series(values: Any) -> pd.Series:
+    return values if isinstance(values, pd.Series) else pd.Series(values, copy=False)
+
+
+def _convert(values: Any, numbers_as_str: bool, fallback: Callable[[Any], Any]) -> List[Any]:
+    series = _as_series(values)
+    dtype = series.dtype
+
+    if isinstance(dtype, pd.CategoricalDtype):
+        # Conversion des seules catégories, puis lecture par code (-1 = manquant -> None).
+        # Valeurs Python natives, comme en itérant sur la colonne (un entier devient "1")
+        lookup = np.empty(len(series.cat.categories) + 1, dtype=object)
+        lookup[:-1] = [fallback(val) for val in series.cat.categories.tolist()]
+        return lookup[series.cat.codes.to_numpy()].tolist()
+
+    array = series.to_numpy()
+    if dtype.kind in "iu":
+        return array.astype(str).tolist() if numbers_as_str else array.tolist()
+    if dtype.kind == "f":
+        array = array.astype(np.float64, copy=False)
+        out = array.astype(str).astype(object) if numbers_as_str else array.astype(object)
+        out[np.isnan(array)] = None
+        return out.tolist()
+    if dtype.kind == "b":
+        return np.where(array, "True", "False").tolist()
+    if dtype.kind == "O" and pd.api.types.infer_dtype(array, skipna=True) in ("string", "empty"):
+        out = array.copy()
+        out[pd.isna(array)] = None
+        return out.tolist()
+    # Itération sur la Series : dates et durées sont restituées en Timestamp/Timedelta
+    return [fallback(val) for val in series]
+
+
+def native_values(values: Any) -> List[Any]:
+    """
+    Valeurs en types natifs : manquant -> None, entier/décimal numpy -> int/float,
+    toute autre valeur -> str (ex: listes de valeurs uniques).
+    """
+    return _convert(values, numbers_as_str=False, fallback=_convert_native)
+
+
+def string_values(values: Any) -> List[Any]:
+    """Valeurs en texte : manquant -> None, sinon str(valeur) (ex: données sélectionnées)."""
+    return _convert(values, numbers_as_str=True, fallback=_convert_str)
+
+
+class FastJSONResponse(ORJSONResponse):
+    """
+    Réponse JSON sérialisée par orjson (types numpy acceptés, NaN -> null).
+    Les types qu'orjson ne connaît pas passent par jsonable_encoder.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content,
+            default=jsonable_encoder,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+        )
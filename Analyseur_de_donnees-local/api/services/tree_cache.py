@@ -0,0 +1,130 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from services.dataset_store import object_size
+
+# Résultats de construction d'arbre (arbre + PDF) mémorisés, LRU borné en nombre d'entrées
+# et en taille estimée (octets, objets Python compris) : résultats et arbres de base ont
+# chacun TREE_CACHE_MAX_MB, un résultat plus grand n'est pas mémorisé.
+# La clé contient l'état du jeu de données (dataset_store.state_token) : toute modification
+# en place (discrétisation, suppression de colonnes) ou tout remplacement du jeu change cet
+# état, les anciens résultats ne sont donc plus jamais servis. invalidate() les libère aussitôt
+# (à chaque modification ou nouvel import du jeu).
+# Pour chaque jeu de paramètres hors seuil d'effectif, l'arbre construit au plus petit seuil
+# demandé (avec les effectifs des branches) est aussi conservé : un seuil supérieur s'en
+# déduit par élagage (tree_engine.prune_tree), sans reconstruction.
+# Les limites de croissance (tree_engine.TreeBudget) font partie des paramètres de la clé.
+
+TREE_CACHE_SIZE = int(os.getenv("TREE_CACHE_SIZE", "32"))
+TREE_CACHE_MAX_BYTES = int(float(os.getenv("TREE_CACHE_MAX_MB", "256")) * 1024 * 1024)
+
+
+class TreeResultCache:
+    """Résultats d'arbre par (fichier, état du jeu, paramètres)."""
+
+    def __init__(self, max_entries: int, max_bytes: int = TREE_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._results: "OrderedDict[Tuple[str, Hashable, str], Dict[str, Any]]" = OrderedDict()
+        # Arbres de base : clé sans seuil -> (seuil de construction, résultat avec effectifs)
+        self._bases: "OrderedDict[Tuple[str, Hashable, str], Tuple[int, Dict[str, Any]]]" = OrderedDict()
+        # Taille estimée de chaque entrée, et total par table
+        self._sizes: Dict[Tuple[int, Tuple[str, Hashable, str]], int] = {}
+        self._bytes = {id(self._results): 0, id(self._bases): 0}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.pruned = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(filename: str, state: Hashable, variables_explicatives: List[str],
+                 variables_a_expliquer: List[str], selected_data: Dict[str, Any],
+                 min_population_threshold: Optional[int], treatment_mode: str,
+                 budget_limits: Optional[Dict[str, Any]] = None) -> Tuple[str, Hashable, str]:
+        """Clé d'un résultat : (fichier, état du jeu, paramètres sérialisés de façon canonique)."""
+        params = json.dumps(
+            [variables_explicatives, variables_a_expliquer, selected_data, min_population_threshold, treatment_mode,
+             budget_limits],
+            sort_keys=True, default=str, ensure_ascii=False,
+        )
+        return filename, state, params
+
+    def get(self, key: Tuple[str, Hashable, str]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            result = self._results.get(key)
+            if result is None:
+                return None
+            self.hits += 1
+            self._results.move_to_end(key)
+            return result
+
+    def _store(self, table: "OrderedDict", key: Tuple[str, Hashable, str], value: Any, size: int):
+        """Ajoute une entrée à `table`, puis évince les plus anciennes au-delà des limites."""
+        self._discard(table, key)
+        table[key] = value
+        self._sizes[id(table), key] = size
+        self._bytes[id(table)] += size
+        while len(table) > self.max_entries or self._bytes[id(table)] > self.max_bytes:
+            self._discard(table, next(iter(table)))
+
+    def _discard(self, table: "OrderedDict", key: Tuple[str, Hashable, str]):
+        if table.pop(key, None) is not None:
+            self._bytes[id(table)] -= self._sizes.pop((id(table), key))
+
+    def put(self, key: Tuple[str, Hashable, str], result: Dict[str, Any]):
+        if self.max_entries <= 0:
+            return
+        size = object_size(result)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._store(self._results, key, result, size)
+
+    def get_base(self, key: Tuple[str, Hashable, str], threshold: int) -> Optional[Dict[str, Any]]:
+        """Arbre de base élagable au seuil `threshold` (construit à un seuil inférieur ou égal)."""
+        with self._lock:
+            base = self._bases.get(key)
+            if base is None or base[0] > threshold:
+                return None
+            self.pruned += 1
+            self._bases.move_to_end(key)
+            return base[1]
+
+    def miss(self):
+        """Compte une construction complète (ni résultat mémorisé, ni arbre élagable)."""
+        with self._lock:
+            self.misses += 1
+
+    def put_base(self, key: Tuple[str, Hashable, str], threshold: int, result: Dict[str, Any]):
+        """Conserve l'arbre construit au seuil `threshold` s'il est le plus bas connu pour cette clé."""
+        if self.max_entries <= 0:
+            return
+        size = object_size(result)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            base = self._bases.get(key)
+            if base is not None and base[0] <= threshold:
+                return
+            self._store(self._bases, key, (threshold, result), size)
+
+    def invalidate(self, filename: str):
+        """Oublie tous les résultats calculés sur le jeu `filename`."""
+        with self._lock:
+            for table in (self._results, self._bases):
+                for key in [key for key in table if key[0] == filename]:
+                    self._discard(table, key)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._results), "base_trees": len(self._bases),
+                    "max_entries": self.max_entries,
+                    "bytes": self._bytes[id(self._results)], "base_bytes": self._bytes[id(self._bases)],
+                    "max_bytes": self.max_bytes,
+                    "hits": self.hits, "pruned": self.pruned, "misses": self.misses}
+
+
+tree_cache = TreeResultCache(TREE_CACHE_SIZE)
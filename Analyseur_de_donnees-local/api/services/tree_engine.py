@@ -0,0 +1,535 @@
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, Optional, Tuple
+
+# Moteur de calcul vectorisé pour l'arbre de décision.
+# Les comptages par modalité sont obtenus en une seule passe (factorisation + np.bincount)
+# au lieu de construire deux masques booléens complets par modalité.
+
+
+def target_indicator(target: pd.Series, target_value: Any) -> np.ndarray:
+    """
+    Retourne un tableau booléen indiquant les lignes où la variable cible vaut target_value.
+    Même sémantique que `(df[target_var] == target_value) & df[target_var].notna()`.
+    """
+    mask = (target == target_value) & target.notna()
+    return mask.to_numpy(dtype=bool, na_value=False)
+
+
+def modality_counts(explanatory: pd.Series, hits_mask: np.ndarray) -> Tuple[Any, np.ndarray, np.ndarray]:
+    """
+    Calcule en une passe, pour chaque modalité (non manquante) d'une variable explicative :
+    - l'effectif total de la modalité,
+    - le nombre de lignes de la modalité où la cible est atteinte.
+
+    Les modalités sont retournées dans leur ordre de première apparition,
+    comme `Series.dropna().unique()`.
+    """
+    codes, uniques = pd.factorize(explanatory)
+    valid = codes >= 0
+    k = len(uniques)
+    totals = np.bincount(codes[valid], minlength=k)
+    hits = np.bincount(codes[valid & hits_mask], minlength=k)
+    return uniques, totals, hits
+
+
+def branch_percentages(totals: np.ndarray, hits: np.ndarray) -> np.ndarray:
+    """Pourcentage de cas cibles parmi l'effectif de chaque modalité."""
+    return (hits / totals) * 100
+
+
+def percentage_std(totals: np.ndarray, hits: np.ndarray) -> float:
+    """
+    Écart-type (population) des pourcentages par modalité.
+    Retourne 0.0 s'il n'y a aucun cas cible ou moins de deux modalités.
+    """
+    if len(totals) <= 1 or not hits.any():
+        return 0.0
+    return float(np.std(branch_percentages(totals, hits)))
+
+
+def branch_table(uniques: Any, totals: np.ndarray, hits: np.ndarray) -> Dict[str, Dict[str, Any]]:
+    """Construit la table des branches (comptage, effectif, pourcentage) d'une variable."""
+    percentages = branch_percentages(totals, hits)
+    branches = {}
+    for explanatory_value, total, count, percentage in zip(uniques, totals, hits, percentages):
+        branches[str(explanatory_value)] = {
+            "count": int(count),            # cas cibles
+            "total": int(total),            # effectif total de la branche
+            "percentage": round(float(percentage), 2),
+            "subtree": None  # Sera rempli récursivement
+        }
+    return branches
+
+
+class EncodedDataset:
+    """
+    Représentation compacte et colonnaire des données utilisées par l'arbre.
+
+    Chaque colonne est encodée une seule fois en dictionnaire : un tableau de codes
+    entiers (int16 ou int32, -1 = valeur manquante) et l'index des modalités.
+    Un nœud de l'arbre n'est plus qu'un tableau d'indices de lignes : la récursion
+    ne recopie jamais de DataFrame.
+    """
+
+    def __init__(self, df: pd.DataFrame, columns: List[str]):
+        self.n_rows = int(len(df))
+        self.codes: Dict[str, np.ndarray] = {}
+        self.uniques: Dict[str, pd.Index] = {}
+        for col in dict.fromkeys(columns):
+            codes, uniques = pd.factorize(df[col])
+            dtype = np.int16 if len(uniques) < np.iinfo(np.int16).max else np.int32
+            self.codes[col] = codes.astype(dtype, copy=False)
+            self.uniques[col] = pd.Index(uniques)
+
+    @classmethod
+    def from_codes(cls, codes: Dict[str, np.ndarray], uniques: Dict[str, pd.Index]) -> "EncodedDataset":
+        """Reconstruit un jeu encodé à partir de tableaux de codes existants (ex: mémoire partagée)."""
+        dataset = cls.__new__(cls)
+        dataset.codes = dict(codes)
+        dataset.uniques = dict(uniques)
+        dataset.n_rows = int(len(next(iter(codes.values())))) if codes else 0
+        return dataset
+
+    def all_rows(self) -> np.ndarray:
+        """Indices de toutes les lignes (nœud racine)."""
+        dtype = np.int32 if self.n_rows < np.iinfo(np.int32).max else np.int64
+        return np.arange(self.n_rows, dtype=dtype)
+
+    def matching_codes(self, column: str, value: Any) -> np.ndarray:
+        """Codes des modalités égales à value (même sémantique que `Series == value`)."""
+        return modality_codes(self.uniques[column], value)
+
+    def indicator(self, column: str, value: Any) -> np.ndarray:
+        """Masque booléen des lignes où la colonne vaut value (valeurs manquantes exclues)."""
+        return np.isin(self.codes[column], self.matching_codes(column, value))
+
+    def isin(self, column: str, values: List[Any]) -> np.ndarray:
+        """Masque booléen équivalent à `Series.isin(values)`."""
+        matching = np.flatnonzero(self.uniques[column].isin(values))
+        return np.isin(self.codes[column], matching)
+
+    def notna(self, column: str) -> np.ndarray:
+        """Masque booléen des valeurs non manquantes."""
+        return self.codes[column] >= 0
+
+
+class CodeGroups:
+    """
+    Positions des lignes d'un nœud regroupées par code, par un tri stable unique :
+    les lignes d'une modalité sont ensuite une tranche contiguë (recherche dichotomique),
+    au lieu d'un parcours de tout le nœud par branche.
+    """
+
+    def __init__(self, codes: np.ndarray):
+        self.order = np.argsort(codes, kind="stable")
+        self.sorted_codes = codes[self.order]
+
+    def positions(self, matching: np.ndarray) -> np.ndarray:
+        """Positions (croissantes) des lignes dont le code est dans `matching`."""
+        parts = [
+            self.order[np.searchsorted(self.sorted_codes, code, side="left"):np.searchsorted(self.sorted_codes, code, side="right")]
+            for code in matching
+        ]
+        if not parts:
+            return np.zeros(0, dtype=np.intp)
+        return parts[0] if len(parts) == 1 else np.sort(np.concatenate(parts))
+
+
+def batch_modality_counts(codes_list: List[np.ndarray], hits_mask: np.ndarray) -> List[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Version groupée de `modality_counts` pour toutes les variables candidates d'un nœud,
+    à partir des codes (-1 = manquant) restreints aux lignes du nœud.
+
+    Les codes de chaque variable sont renumérotés dans l'ordre de première apparition
+    (comme `dropna().unique()` sur le nœud), puis décalés dans un espace commun pour
+    obtenir tous les effectifs en un seul np.bincount.
+    Retourne, par variable : (codes globaux présents, effectifs, cas cibles).
+    """
+    offsets = []
+    present_list = []
+    all_codes = []
+    all_hits = []
+    offset = 0
+    for codes in codes_list:
+        valid = codes >= 0
+        local, present = pd.factorize(codes[valid])
+        offsets.append(offset)
+        present_list.append(present)
+        all_codes.append(local + offset)
+        all_hits.append(hits_mask[valid])
+        offset += len(present)
+
+    if all_codes:
+        stacked = np.concatenate(all_codes)
+        stacked_hits = np.concatenate(all_hits)
+        totals = np.bincount(stacked, minlength=offset)
+        hits = np.bincount(stacked[stacked_hits], minlength=offset)
+    else:
+        totals = hits = np.zeros(0, dtype=np.int64)
+
+    results = []
+    for present, start in zip(present_list, offsets):
+        end = start + len(present)
+        results.append((present, totals[start:end], hits[start:end]))
+    return results
+
+
+def score_node(dataset: EncodedDataset, rows: np.ndarray, hits: np.ndarray,
+               available_vars: List[str]) -> Tuple[Optional[str], float, Dict[str, Dict[str, Any]]]:
+    """
+    Évalue toutes les variables candidates d'un nœud en une seule passe groupée.
+    Retourne la meilleure variable, son écart-type et sa table de branches,
+    pour éviter de recompter les modalités de la variable retenue.
+    """
+    if not available_vars:
+        return None, -1, {}
+
+    counts = batch_modality_counts([dataset.codes[var][rows] for var in available_vars], hits[rows])
+
+    var_variances = {}
+    for var, (_, totals, var_hits) in zip(available_vars, counts):
+        var_variances[var] = percentage_std(totals, var_hits)
+
+    # Sélectionner la variable avec la plus grande variance
+    best_var = max(var_variances, key=var_variances.get)
+    present, totals, var_hits = counts[available_vars.index(best_var)]
+    branches = branch_table(dataset.uniques[best_var][present], totals, var_hits)
+
+    return best_var, var_variances[best_var], branches
+
+
+class BuildCancelled(Exception):
+    """Levée quand une construction d'arbre a été annulée en cours de route."""
+
+
+class BuildProgress:
+    """Avancement d'une construction d'arbre, consultable depuis un autre thread, et annulable."""
+
+    def __init__(self):
+        self.stage = "queued"
+        self.nodes_expanded = 0
+        self.trees_total = 0
+        self.trees_done = 0
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def check(self):
+        if self._cancelled.is_set():
+            raise BuildCancelled()
+
+    def node_expanded(self, count: int = 1):
+        self.check()
+        self.nodes_expanded += count
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "stage": self.stage,
+            "nodes_expanded": self.nodes_expanded,
+            "target_values_done": self.trees_done,
+            "target_values_total": self.trees_total,
+        }
+
+
+def count_nodes(tree: Optional[Dict[str, Any]]) -> int:
+    """Nombre de nœuds de décision (hors feuilles) d'un arbre."""
+    if not tree or tree.get("type") != "node":
+        return 0
+    return 1 + sum(count_nodes(branch.get("subtree")) for branch in tree["branches"].values())
+
+
+def branch_key_value(branch_value: str) -> Any:
+    """Convertit la clé texte d'une branche en valeur comparable à la colonne."""
+    if branch_value == 'False':
+        return False
+    if branch_value == 'True':
+        return True
+    return branch_value
+
+
+def modality_codes(uniques: pd.Index, value: Any) -> np.ndarray:
+    """Codes des modalités `uniques` égales à value (même sémantique que `Series == value`)."""
+    try:
+        return np.flatnonzero(np.asarray(uniques == value, dtype=bool))
+    except Exception:
+        return np.zeros(0, dtype=np.intp)
+
+
+def branches_expandable(uniques: pd.Index, sample: int = 64) -> bool:
+    """
+    Les branches d'une variable de modalités `uniques` peuvent-elles recevoir un sous-arbre ?
+    Règle de expand_node : les lignes d'une branche sont celles dont la valeur égale sa clé
+    texte convertie (branch_key_value) ; une clé qui ne retrouve aucune modalité (ex : valeurs
+    numériques, comparées à leur texte) donne une branche vide, jamais développée.
+    Vérifié sur les `sample` premières modalités.
+    """
+    return any(len(modality_codes(uniques, branch_key_value(str(value)))) for value in uniques[:sample])
+
+
+# Clé interne des branches : effectif de la branche (lignes qui y descendent)
+POPULATION_KEY = "_population"
+
+
+def below_threshold(population: int, min_population_threshold: Optional[int]) -> bool:
+    """Effectif sous le seuil minimum (seuil absent ou <= 0 : pas de limite)."""
+    return bool(min_population_threshold and min_population_threshold > 0 and population < min_population_threshold)
+
+
+def stopped_leaf(population: int, min_population_threshold: int) -> Dict[str, Any]:
+    return {
+        "type": "leaf",
+        "message": f"[ARRET] Branche arrêtée - Effectif insuffisant ({population} < {min_population_threshold})"
+    }
+
+
+# Budgets par défaut de la construction (0 = pas de limite), appliqués si la requête n'en fixe pas
+DEFAULT_MAX_NODES = int(os.getenv("TREE_MAX_NODES", "0"))
+DEFAULT_TIME_LIMIT = float(os.getenv("TREE_TIME_LIMIT", "0"))
+
+# Motifs de troncature d'une branche (clé "truncated" de la feuille)
+TRUNCATION_REASONS = ("max_depth", "max_nodes", "max_branches_per_node", "time_limit")
+
+
+class TreeBudget:
+    """
+    Limites de croissance d'un arbre (None = pas de limite) :
+    - max_depth : nombre de niveaux de nœuds de décision ;
+    - max_nodes : nombre de nœuds de décision par arbre ;
+    - max_branches_per_node : branches développées par nœud (les plus peuplées) ;
+    - time_limit : durée (secondes) de la construction de tous les arbres, depuis start().
+    Une branche arrêtée par le budget devient une feuille portant le motif ("truncated").
+    """
+
+    def __init__(self, max_depth: Optional[int] = None, max_nodes: Optional[int] = None,
+                 max_branches_per_node: Optional[int] = None, time_limit: Optional[float] = None):
+        self.max_depth = max_depth or None
+        self.max_nodes = max_nodes or None
+        self.max_branches_per_node = max_branches_per_node or None
+        self.time_limit = time_limit or None
+        self.deadline: Optional[float] = None
+
+    @classmethod
+    def from_request(cls, max_depth: Optional[int] = None, max_nodes: Optional[int] = None,
+                     max_branches_per_node: Optional[int] = None,
+                     time_limit: Optional[float] = None) -> "TreeBudget":
+        """Budget demandé, complété par les limites par défaut du serveur."""
+        return cls(max_depth, DEFAULT_MAX_NODES if max_nodes is None else max_nodes,
+                   max_branches_per_node, DEFAULT_TIME_LIMIT if time_limit is None else time_limit)
+
+    def limits(self) -> Dict[str, Any]:
+        return {
+            "max_depth": self.max_depth,
+            "max_nodes": self.max_nodes,
+            "max_branches_per_node": self.max_branches_per_node,
+            "time_limit": self.time_limit,
+        }
+
+    @property
+    def limited(self) -> bool:
+        return any(value is not None for value in self.limits().values())
+
+    @property
+    def prunable(self) -> bool:
+        """
+        Un arbre construit sous ce budget s'élague-t-il à un seuil supérieur comme une construction
+        directe ? Oui pour les limites locales à un nœud (profondeur, branches), non pour le nombre
+        de nœuds (le seuil change les nœuds consommés) ni pour le temps (non déterministe).
+        """
+        return self.max_nodes is None and self.time_limit is None
+
+    @property
+    def parallelizable(self) -> bool:
+        """Les limites globales (nœuds, temps) demandent une construction séquentielle."""
+        return self.prunable
+
+    def start(self):
+        if self.time_limit is not None:
+            self.deadline = time.monotonic() + self.time_limit
+
+    def exceeded(self, depth: int, nodes: int) -> Optional[str]:
+        """Motif de troncature d'un nœud de profondeur `depth`, `nodes` nœuds étant déjà construits."""
+        if self.max_depth is not None and depth > self.max_depth:
+            return "max_depth"
+        if self.max_nodes is not None and nodes >= self.max_nodes:
+            return "max_nodes"
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            return "time_limit"
+        return None
+
+    def truncated_leaf(self, reason: str) -> Dict[str, Any]:
+        if reason == "max_depth":
+            detail = f"Profondeur maximale atteinte ({self.max_depth})"
+        elif reason == "max_nodes":
+            detail = f"Nombre maximal de nœuds atteint ({self.max_nodes})"
+        elif reason == "max_branches_per_node":
+            detail = f"Hors des {self.max_branches_per_node} branches les plus peuplées"
+        else:
+            detail = f"Temps de construction écoulé ({self.time_limit:g} s)"
+        return {
+            "type": "leaf",
+            "message": f"[LIMITE] Branche tronquée - {detail}",
+            "truncated": reason,
+        }
+
+
+def tree_usage(tree: Optional[Dict[str, Any]], depth: int = 1) -> Dict[str, Any]:
+    """Nœuds de décision, profondeur atteinte et branches tronquées (par motif) d'un arbre."""
+    usage = {"nodes": 0, "depth": 0, "truncated": dict.fromkeys(TRUNCATION_REASONS, 0)}
+    if not tree:
+        return usage
+    if tree.get("type") != "node":
+        if tree.get("truncated") in usage["truncated"]:
+            usage["truncated"][tree["truncated"]] += 1
+        return usage
+    usage["nodes"] = 1
+    usage["depth"] = depth
+    for branch in tree["branches"].values():
+        child = tree_usage(branch.get("subtree"), depth + 1)
+        usage["nodes"] += child["nodes"]
+        usage["depth"] = max(usage["depth"], child["depth"])
+        for reason, count in child["truncated"].items():
+            usage["truncated"][reason] += count
+    return usage
+
+
+def prune_tree(tree: Optional[Dict[str, Any]], min_population_threshold: Optional[int]) -> Optional[Dict[str, Any]]:
+    """
+    Arbre au seuil `min_population_threshold`, obtenu en élaguant (en O(nœuds)) un arbre
+    construit avec un seuil inférieur ou égal : une branche dont l'effectif est sous le seuil
+    devient une feuille d'arrêt. Même résultat qu'une construction directe à ce seuil.
+    Retourne une copie sans les effectifs internes (l'arbre d'origine n'est pas modifié).
+    """
+    if not tree or tree.get("type") != "node":
+        return tree
+    branches = {}
+    for branch_value, branch_data in tree["branches"].items():
+        population = branch_data.get(POPULATION_KEY)
+        pruned = {key: value for key, value in branch_data.items() if key != POPULATION_KEY}
+        if population and below_threshold(population, min_population_threshold):
+            pruned["subtree"] = stopped_leaf(population, min_population_threshold)
+        else:
+            pruned["subtree"] = prune_tree(branch_data.get("subtree"), min_population_threshold)
+        branches[branch_value] = pruned
+    return {**tree, "branches": branches}
+
+
+def expand_node(dataset: EncodedDataset, rows: np.ndarray, hits: np.ndarray,
+                available_explanatory_vars: List[str], current_path: List[str],
+                min_population_threshold: Optional[int] = None,
+                progress: Optional[BuildProgress] = None,
+                budget: Optional[TreeBudget] = None) -> Tuple[Dict[str, Any], List[Tuple[Dict[str, Any], np.ndarray, List[str], List[str]]]]:
+    """
+    Construit un nœud (sans ses sous-arbres) sur les lignes `rows` du jeu encodé.
+    `hits` est le masque (sur toutes les lignes) des cas correspondant à la valeur cible.
+    Avec un budget limitant les branches par nœud, seules les plus peuplées sont développées.
+
+    Retourne le nœud et la liste des branches restant à développer :
+    (branche, lignes de la branche, variables restantes, chemin).
+    """
+    # Critère d'arrêt : plus de variables explicatives disponibles
+    if not available_explanatory_vars:
+        return {
+            "type": "leaf",
+            "message": "Plus de variables explicatives disponibles"
+        }, []
+
+    # Sélectionner la meilleure variable explicative (avec sa table de branches)
+    best_var, best_variance, branches = score_node(dataset, rows, hits, available_explanatory_vars)
+
+    if best_var is None:
+        return {
+            "type": "leaf",
+            "message": "Aucune variable explicative valide trouvée"
+        }, []
+
+    if progress is not None:
+        progress.node_expanded()
+
+    # Créer le nœud de l'arbre
+    tree_node = {
+        "type": "node",
+        "variable": best_var,
+        "variance": round(best_variance, 4),
+        "branches": branches,
+        "path": current_path + [best_var]
+    }
+
+    # Variables explicatives restantes pour les sous-arbres
+    remaining_vars = [var for var in available_explanatory_vars if var != best_var]
+    if not remaining_vars:
+        return tree_node, []
+
+    # Lignes du nœud regroupées par modalité de la variable retenue (un seul tri)
+    groups = CodeGroups(dataset.codes[best_var][rows])
+    children = []
+
+    for branch_value, branch_data in branches.items():
+        # Lignes de la branche (comparaison avec la clé convertie, comme `df[best_var] == valeur`)
+        matching = dataset.matching_codes(best_var, branch_key_value(branch_value))
+        branch_rows = rows[groups.positions(matching)]
+        population = len(branch_rows)
+
+        if population > 0:
+            # Effectif mémorisé pour l'élagage à un seuil supérieur (retiré par prune_tree)
+            branch_data[POPULATION_KEY] = population
+            # Vérifier le seuil d'effectif minimum (0 = pas de limite)
+            if below_threshold(population, min_population_threshold):
+                # Arrêter la construction si l'effectif est trop faible
+                branch_data["subtree"] = stopped_leaf(population, min_population_threshold)
+            else:
+                children.append((branch_data, branch_rows, remaining_vars, current_path + [best_var, branch_value]))
+
+    if budget is not None and budget.max_branches_per_node and len(children) > budget.max_branches_per_node:
+        # Développer seulement les branches les plus peuplées (ordre des branches en cas d'égalité)
+        order = sorted(range(len(children)), key=lambda i: -len(children[i][1]))
+        kept = set(order[:budget.max_branches_per_node])
+        for i, (branch_data, _, _, _) in enumerate(children):
+            if i not in kept:
+                branch_data["subtree"] = budget.truncated_leaf("max_branches_per_node")
+        children = [child for i, child in enumerate(children) if i in kept]
+
+    return tree_node, children
+
+
+def grow_tree(dataset: EncodedDataset, rows: np.ndarray, hits: np.ndarray,
+              available_explanatory_vars: List[str], current_path: List[str],
+              min_population_threshold: Optional[int] = None,
+              progress: Optional[BuildProgress] = None,
+              budget: Optional[TreeBudget] = None, depth: int = 1) -> Dict[str, Any]:
+    """
+    Construit l'arbre de décision sur les lignes `rows` du jeu encodé.
+    Les nœuds sont développés en largeur (niveau par niveau) : sous un budget, ce sont les
+    niveaux les plus profonds qui sont tronqués. Sans budget atteint, le résultat est celui
+    de la récursion en profondeur (chaque sous-arbre ne dépend que de ses lignes).
+    `depth` est la profondeur du nœud `rows` (1 pour la racine).
+    """
+    root: Dict[str, Any] = {}
+    pending = deque([(root, rows, available_explanatory_vars, current_path, depth)])
+    nodes = 0
+    while pending:
+        slot, node_rows, node_vars, node_path, node_depth = pending.popleft()
+        reason = budget.exceeded(node_depth, nodes) if budget is not None and node_vars else None
+        if reason is not None:
+            slot["subtree"] = budget.truncated_leaf(reason)
+            continue
+        tree_node, children = expand_node(
+            dataset, node_rows, hits, node_vars, node_path, min_population_threshold, progress, budget
+        )
+        if tree_node["type"] == "node":
+            nodes += 1
+        slot["subtree"] = tree_node
+        pending.extend((branch_data, branch_rows, remaining_vars, branch_path, node_depth + 1)
+                       for branch_data, branch_rows, remaining_vars, branch_path in children)
+
+    return root["subtree"]
@@ -0,0 +1,92 @@
+import os
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from services import tree_engine
+
+# Estimation a priori (sans construction) du coût d'un arbre de décision.
+# Bornes supérieures par niveau, à partir des cardinalités des variables explicatives :
+# - un nœud de niveau L+1 correspond à un chemin de L variables distinctes, donc le niveau L+1
+#   compte au plus le produit des L plus grands facteurs de branchement ;
+# - les nœuds d'un même niveau se partagent les lignes de l'échantillon : au plus
+#   n / seuil d'effectif nœuds (n lignes si pas de seuil), au plus n branches non vides ;
+# - une variable dont les branches ne peuvent pas être développées (règle de
+#   tree_engine.branches_expandable, celle de expand_node) termine le chemin.
+# Les limites d'un TreeBudget (profondeur, nœuds, branches par nœud) resserrent ces bornes.
+
+# Taille moyenne (octets JSON) d'un nœud hors branches, d'une branche, et du PDF (base64) par nœud
+NODE_BYTES = 120
+BRANCH_BYTES = 50
+PDF_BYTES_PER_NODE = 260
+
+# Coûts moyens de construction (secondes) par nœud, par ligne examinée, et de PDF par nœud
+SECONDS_PER_NODE = float(os.getenv("TREE_ESTIMATE_SECONDS_PER_NODE", "0.00017"))
+SECONDS_PER_ROW_VISIT = float(os.getenv("TREE_ESTIMATE_SECONDS_PER_ROW_VISIT", "0.000000075"))
+PDF_SECONDS_PER_NODE = float(os.getenv("TREE_ESTIMATE_PDF_SECONDS_PER_NODE", "0.009"))
+
+# Au-delà de cette durée estimée, la construction est signalée comme lourde
+HEAVY_BUILD_SECONDS = float(os.getenv("TREE_ESTIMATE_HEAVY_SECONDS", "60"))
+
+
+def branches_recurse(series: pd.Series) -> bool:
+    """Les branches d'une variable peuvent-elles avoir un sous-arbre ? (voir tree_engine.branches_expandable)"""
+    _, uniques = pd.factorize(series)
+    return tree_engine.branches_expandable(pd.Index(uniques))
+
+
+def estimate_tree(n_rows: int, cardinalities: List[int], recurse: List[bool],
+                  min_population_threshold: Optional[int] = None, max_depth: Optional[int] = None,
+                  max_nodes: Optional[int] = None,
+                  max_branches_per_node: Optional[int] = None) -> Dict[str, int]:
+    """
+    Bornes d'un arbre sur `n_rows` lignes : nœuds de décision, branches, profondeur
+    et lignes examinées (somme, sur les nœuds, des lignes x variables candidates).
+    `cardinalities` et `recurse` décrivent chaque variable explicative.
+    """
+    n_vars = len(cardinalities)
+    if n_vars == 0:
+        return {"nodes": 0, "branches": 0, "depth": 0, "row_visits": 0}
+
+    # Facteurs de branchement des variables développables, du plus grand au plus petit
+    factors = sorted((min(card, n_rows, max_branches_per_node or card)
+                      for card, rec in zip(cardinalities, recurse) if rec), reverse=True)
+    widest = min(max(cardinalities), n_rows)
+    per_level_cap = n_rows // min_population_threshold if min_population_threshold and min_population_threshold > 0 else n_rows
+    depth_cap = min(n_vars, len(factors) + 1, max_depth or n_vars)
+
+    nodes = branches = depth = row_visits = 0
+    level_nodes = 1
+    for level in range(1, depth_cap + 1):
+        if level > 1:
+            level_nodes = min(level_nodes * factors[level - 2], per_level_cap)
+        if max_nodes:
+            level_nodes = min(level_nodes, max_nodes - nodes)
+        if level_nodes <= 0:
+            break
+        nodes += level_nodes
+        branches += min(level_nodes * widest, n_rows)
+        depth = level
+        # Chaque niveau examine au plus toutes les lignes, pour chaque variable encore candidate
+        row_visits += n_rows * (n_vars - level + 1)
+    return {"nodes": nodes, "branches": branches, "depth": depth, "row_visits": row_visits}
+
+
+def estimate_cost(n_trees: int, tree: Dict[str, int]) -> Dict[str, Any]:
+    """Taille de réponse et durée estimées pour `n_trees` arbres bornés par `tree`."""
+    nodes = n_trees * tree["nodes"]
+    branches = n_trees * tree["branches"]
+    row_visits = n_trees * tree["row_visits"]
+    json_bytes = nodes * NODE_BYTES + branches * BRANCH_BYTES
+    pdf_bytes = nodes * PDF_BYTES_PER_NODE
+    seconds = nodes * (SECONDS_PER_NODE + PDF_SECONDS_PER_NODE) + row_visits * SECONDS_PER_ROW_VISIT
+    return {
+        "estimated_nodes": nodes,
+        "estimated_branches": branches,
+        "estimated_row_visits": row_visits,
+        "estimated_response_bytes": json_bytes + pdf_bytes,
+        "estimated_tree_json_bytes": json_bytes,
+        "estimated_pdf_bytes": pdf_bytes,
+        "estimated_seconds": round(seconds, 2),
+        "heavy": seconds > HEAVY_BUILD_SECONDS,
+    }
@@ -0,0 +1,130 @@
+import os
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from services.tree_engine import BuildProgress
+
+# Constructions d'arbre asynchrones : la soumission renvoie un identifiant de job,
+# l'avancement et le résultat (arbre + PDF) sont récupérés ensuite par polling.
+# Les jobs terminés expirent après TREE_JOB_TTL secondes. Au plus TREE_JOB_MAX_ACTIVE jobs
+# sont en attente ou en cours : au-delà, les nouvelles soumissions sont refusées.
+
+JOB_TTL_SECONDS = int(os.getenv("TREE_JOB_TTL", "3600"))
+MAX_ACTIVE_JOBS = int(os.getenv("TREE_JOB_MAX_ACTIVE", "16"))
+
+
+class TreeJob:
+    def __init__(self, params: Dict[str, Any]):
+        self.id = uuid.uuid4().hex
+        self.params = params
+        self.status = "queued"  # queued | running | done | failed | cancelled
+        self.progress = BuildProgress()
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.task = None  # tâche asyncio qui exécute le job
+
+    def expired(self, now: float) -> bool:
+        return self.finished_at is not None and now - self.finished_at > JOB_TTL_SECONDS
+
+    def status_dict(self) -> Dict[str, Any]:
+        now = time.time()
+        elapsed_from = self.started_at or now
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "progress": self.progress.as_dict(),
+            "error": self.error,
+            "created_at": self.created_at,
+            "elapsed_seconds": round((self.finished_at or now) - elapsed_from, 3),
+            "expires_at": self.finished_at + JOB_TTL_SECONDS if self.finished_at else None,
+        }
+
+
+class TreeJobRegistry:
+    """Registre en mémoire des jobs de construction d'arbre."""
+
+    def __init__(self, max_active: int = MAX_ACTIVE_JOBS):
+        self.max_active = max_active
+        self._jobs: Dict[str, TreeJob] = {}
+        self._lock = threading.Lock()
+
+    def _purge(self):
+        now = time.time()
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.expired(now)]:
+            del self._jobs[job_id]
+
+    def create(self, params: Dict[str, Any]) -> Optional[TreeJob]:
+        """Nouveau job en attente, ou None si TREE_JOB_MAX_ACTIVE jobs sont déjà actifs."""
+        job = TreeJob(params)
+        with self._lock:
+            self._purge()
+            if self.active() >= self.max_active:
+                return None
+            self._jobs[job.id] = job
+        return job
+
+    def active(self) -> int:
+        """Nombre de jobs en attente ou en cours."""
+        return sum(1 for job in self._jobs.values() if job.status in ("queued", "running"))
+
+    def get(self, job_id: str) -> Optional[TreeJob]:
+        with self._lock:
+            self._purge()
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[TreeJob]:
+        """Annule un job en cours, ou supprime le résultat d'un job terminé."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job.status in ("queued", "running"):
+                job.progress.cancel()
+                job.status = "cancelled"
+                job.finished_at = time.time()
+                if job.task is not None:
+                    job.task.cancel()
+            else:
+                del self._jobs[job_id]
+                job.result = None
+            return job
+
+    def run(self, job: TreeJob, fn, *args, **kwargs):
+        """Exécute (de façon synchrone, dans un thread du pool) la fonction du job."""
+        # Les changements de statut se font sous le verrou, comme l'annulation :
+        # un job annulé n'est jamais repassé en "running", "done" ou "failed"
+        with self._lock:
+            if job.progress.cancelled:
+                return
+            job.status = "running"
+            job.started_at = time.time()
+        try:
+            result = fn(*args, progress=job.progress, **kwargs)
+        except Exception as e:
+            with self._lock:
+                if not job.progress.cancelled:
+                    job.status = "failed"
+                    job.error = str(e)
+        else:
+            with self._lock:
+                if job.progress.cancelled:
+                    return
+                if isinstance(result, dict) and "error" in result:
+                    job.status = "failed"
+                    job.error = result["error"]
+                else:
+                    job.status = "done"
+                    job.result = result
+                    job.progress.stage = "done"
+        finally:
+            with self._lock:
+                if job.finished_at is None:
+                    job.finished_at = time.time()
+
+
+tree_jobs = TreeJobRegistry()
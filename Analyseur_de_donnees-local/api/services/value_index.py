@@ -0,0 +1,75 @@
+import sys
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from services import serialization
+
+# Index des valeurs distinctes d'une colonne, construit une fois par colonne et mémorisé
+# avec le jeu de données (dataset_store.derived) :
+# - valeurs converties en types natifs (comme la liste historique), avec leur effectif ;
+# - libellés en minuscules triés, pour la recherche par préfixe (recherche dichotomique)
+#   et par sous-chaîne (np.char.find sur tout le tableau) ;
+# - ordre naturel (numérique pour les colonnes numériques, celui des catégories pour une colonne
+#   catégorielle ordonnée, alphabétique sinon) pour la pagination.
+
+MATCH_MODES = ("prefix", "contains")
+ORDERS = ("value", "count", "appearance")
+
+
+class ValueIndex:
+    """Valeurs distinctes d'une colonne (ordre d'apparition), effectifs et clés de recherche triées."""
+
+    def __init__(self, series: pd.Series):
+        codes, uniques = pd.factorize(series, sort=False, use_na_sentinel=True)
+        self.values: List[Any] = serialization.native_values(uniques)
+        self.counts = np.bincount(codes[codes >= 0], minlength=len(self.values)).astype(np.int64)
+        self.keys = np.array([str(value).lower() for value in self.values], dtype=str)
+        self.by_key = np.argsort(self.keys, kind="stable")
+
+        if isinstance(series.dtype, pd.CategoricalDtype) and series.dtype.ordered:
+            # Intervalles de discrétisation : ordre des catégories
+            self.natural = np.argsort(np.asarray(uniques.codes), kind="stable")
+        elif pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            self.natural = np.argsort(np.asarray(self.values, dtype=np.float64), kind="stable")
+        else:
+            self.natural = self.by_key
+        self.rank = np.empty(len(self.values), dtype=np.int64)
+        self.rank[self.natural] = np.arange(len(self.values))
+        # Empreinte (octets), comptée dans le budget du stockage des jeux de données
+        arrays = {id(array): array.nbytes for array in (self.counts, self.keys, self.by_key, self.natural, self.rank)}
+        self.nbytes = sum(arrays.values()) + sys.getsizeof(self.values) + sum(map(sys.getsizeof, self.values))
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def _matches(self, search: Optional[str], match: str) -> np.ndarray:
+        """Positions (ordre naturel) des valeurs correspondant à la recherche."""
+        if not search:
+            return self.natural
+        term = search.lower()
+        if match == "prefix":
+            sorted_keys = self.keys[self.by_key]
+            lo = np.searchsorted(sorted_keys, term, side="left")
+            hi = np.searchsorted(sorted_keys, term + "\U0010ffff", side="left")
+            found = self.by_key[lo:hi]
+            return found[np.argsort(self.rank[found], kind="stable")]
+        return self.natural[np.char.find(self.keys[self.natural], term) >= 0]
+
+    def page(self, search: Optional[str] = None, match: str = "prefix", offset: int = 0,
+             limit: Optional[int] = None, order: str = "value") -> Dict[str, Any]:
+        """Page de valeurs (et effectifs) correspondant à la recherche, dans l'ordre demandé."""
+        positions = self._matches(search, match)
+        if order == "count":
+            positions = positions[np.argsort(-self.counts[positions], kind="stable")]
+        elif order == "appearance":
+            positions = np.sort(positions)
+        end = len(positions) if limit is None else offset + limit
+        selected = positions[offset:end]
+        return {
+            "unique_values": [self.values[i] for i in selected],
+            "counts": self.counts[selected].tolist(),
+            "matched_values": int(len(positions)),
+            "has_more": bool(end < len(positions)),
+        }
@@ -0,0 +1,4 @@
+import os
+
+# Pas de cache disque partagé pendant les tests (chaque test crée le sien si besoin)
+os.environ.setdefault("DATASET_CACHE_DIR", "")
@@ -0,0 +1,100 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from controllers import excel_controller
+from services.dataset_store import dataset_store
+
+
+@pytest.fixture
+def numbers():
+    dataset_store.put("bin.xlsx", pd.DataFrame({"x": [0.5, 1.5, 2.5, 7.0, None], "y": [1, 2, 3, 4, 5]}))
+    yield "bin.xlsx"
+    dataset_store.remove("bin.xlsx")
+
+
+@pytest.mark.parametrize("bin_size", [math.nan, math.inf, -math.inf, 0, -1])
+def test_invalid_bin_size_is_rejected(numbers, bin_size):
+    assert "error" in excel_controller.bin_variable(numbers, "x", bin_size)
+    assert "error" in excel_controller.bin_variables(numbers, ["x", "y"], "width", bin_size=bin_size)
+    assert list(dataset_store.get(numbers).columns) == ["x", "y"]
+
+
+def test_column_stats_recomputed_only_for_changed_columns(numbers, monkeypatch):
+    computed = []
+    compute = excel_controller._compute_column_stats
+    monkeypatch.setattr(excel_controller, "_compute_column_stats",
+                        lambda col, series: computed.append(col) or compute(col, series))
+
+    excel_controller.get_column_stats(numbers)
+    new_name = excel_controller.bin_variable(numbers, "x", 2)["new_column"]
+    stats = excel_controller.get_column_stats(numbers)["stats"]
+    assert [s["column"] for s in stats] == ["x", "y", new_name]
+    assert computed == ["x", "y", new_name]
+
+    excel_controller.drop_columns(numbers, ["y"])
+    assert [s["column"] for s in excel_controller.get_column_stats(numbers)["stats"]] == ["x", new_name]
+    assert computed == ["x", "y", new_name]
+
+
+@pytest.fixture
+def measures():
+    rng = np.random.default_rng(0)
+    age = rng.integers(0, 95, 1000).astype(float)
+    age[rng.random(1000) < 0.05] = np.nan
+    dataset_store.put("mesures.xlsx", pd.DataFrame({"age": age, "poids": rng.normal(70, 12, 1000), "nom": "x"}))
+    yield "mesures.xlsx"
+    dataset_store.remove("mesures.xlsx")
+
+
+def test_width_bin_size_matches_bin_variable(measures):
+    single = excel_controller.bin_variable(measures, "age", 10)
+    batch = excel_controller.bin_variables(measures, ["age"], "width", bin_size=10)["columns"][0]
+    df = dataset_store.get(measures)
+    assert batch["new_column"] == single["new_column"] + "_1"
+    assert isinstance(df[batch["new_column"]].dtype, pd.CategoricalDtype) and df[batch["new_column"]].cat.ordered
+    # Mêmes intervalles, mêmes affectations (valeurs manquantes -> "nan" dans l'ancien format texte)
+    assert df[batch["new_column"]].astype(str).tolist() == df[single["new_column"]].tolist()
+    assert sum(batch["counts"]) == int(df["age"].count())
+
+
+def test_width_n_bins_matches_pd_cut(measures):
+    result = excel_controller.bin_variables(measures, ["poids"], "width", n_bins=7)["columns"][0]
+    df = dataset_store.get(measures)
+    expected = pd.cut(df["poids"], 7, include_lowest=True, right=False).cat.codes
+    # pd.cut élargit l'intervalle à droite : le maximum tombe dans le dernier intervalle, comme ici
+    assert df[result["new_column"]].cat.codes.tolist() == expected.tolist()
+    assert len(result["bins"]) == 7 and result["bins"][-1].endswith("]")
+
+
+def test_quantile_bins_balanced(measures):
+    result = excel_controller.bin_variables(measures, ["poids", "age"], "quantile", n_bins=4)
+    poids, age = result["columns"]
+    assert poids["new_column"] == "poids_bin_q4" and age["new_column"] == "age_bin_q4"
+    assert max(poids["counts"]) - min(poids["counts"]) <= 1
+    assert sum(age["counts"]) == int(dataset_store.get(measures)["age"].count())
+
+
+def test_explicit_edges(measures):
+    result = excel_controller.bin_variables(measures, ["age"], "edges", edges=[60, 18, 0], suffix="classe")
+    column = result["columns"][0]
+    assert column["new_column"] == "age_classe" and column["bins"] == ["[0–18[", "[18–60]"]
+    ages = dataset_store.get(measures)["age"]
+    binned = dataset_store.get(measures)["age_classe"]
+    # Valeurs hors bornes ou manquantes -> manquant
+    assert binned.isna().tolist() == (ages.isna() | (ages > 60)).tolist()
+    assert column["counts"] == [int((ages < 18).sum()), int(ages.between(18, 60).sum())]
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"columns": ["age", "nom"], "strategy": "width", "n_bins": 3},
+    {"columns": ["age", "absente"], "strategy": "width", "n_bins": 3},
+    {"columns": ["age"], "strategy": "hasard", "n_bins": 3},
+    {"columns": ["age"], "strategy": "quantile", "n_bins": 0},
+    {"columns": ["age"], "strategy": "edges", "edges": [1]},
+])
+def test_invalid_batch_creates_no_column(measures, kwargs):
+    assert "error" in excel_controller.bin_variables(measures, **kwargs)
+    assert list(dataset_store.get(measures).columns) == ["age", "poids", "nom"]
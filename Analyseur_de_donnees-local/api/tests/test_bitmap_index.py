@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+
+from services import bitmap_index
+
+
+def test_isin_matches_series_isin():
+    rng = np.random.default_rng(0)
+    series = pd.Series(rng.choice(["a", "b", "c", None], 1001))
+    index = bitmap_index.build(series)
+    for values in [["a"], ["a", "c"], [None], ["b", None], ["z"], []]:
+        bits = index.isin(values)
+        assert bitmap_index.to_mask(bits, len(series)).tolist() == series.isin(values).tolist(), values
+
+
+def test_bitset_cache_is_bounded():
+    n = 80000
+    series = pd.Series(np.arange(n) % 1000)
+    # Place pour 4 bitsets de n/8 octets
+    index = bitmap_index.ColumnBitmaps(series, *pd.factorize(series), max_cache_bytes=4 * n // 8)
+    base = index.nbytes
+    bits = index.isin(list(range(1000)))
+    assert bitmap_index.to_mask(bits, n).all()
+    assert index.nbytes == base + 4 * n // 8
+    # Les bitsets les plus récemment utilisés sont gardés
+    assert list(index._bitsets) == [996, 997, 998, 999]
+    index.bitset(996)
+    index.bitset(5)
+    assert list(index._bitsets) == [998, 999, 996, 5]
@@ -0,0 +1,216 @@
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from services.dataset_store import DatasetStore
+from services.disk_cache import DiskCache
+
+
+def _store(directory, max_bytes=1 << 30, disk_max_bytes=1 << 30) -> DatasetStore:
+    return DatasetStore(max_bytes, 0, DiskCache(str(directory), disk_max_bytes))
+
+
+def test_same_content_modified_separately(tmp_path):
+    store = _store(tmp_path)
+    base = pd.DataFrame({"a": [1, 2, 3]})
+    store.put("A.xlsx", base.copy(), "H")
+    store.put("B.xlsx", base.copy(), "H")
+
+    df_a = store.get("A.xlsx").copy(deep=False)
+    df_a["x"] = 1
+    store.replace("A.xlsx", df_a, ["x"])
+    df_b = store.get("B.xlsx").copy(deep=False)
+    df_b["b"] = 2
+    df_b["binned"] = "3"
+    store.replace("B.xlsx", df_b, ["b", "binned"])
+    store.flush()
+
+    # Redémarrage : les deux jeux sont relus depuis le disque
+    restarted = _store(tmp_path)
+    assert list(restarted.get("A.xlsx").columns) == ["a", "x"]
+    assert list(restarted.get("B.xlsx").columns) == ["a", "b", "binned"]
+    # Le fichier d'origine reste disponible pour la déduplication
+    assert list(restarted.find_by_hash("H").columns) == ["a"]
+
+
+def test_disk_cache_size_bound(tmp_path):
+    frame = pd.DataFrame({"a": range(10000)})
+    probe = DiskCache(str(tmp_path / "probe"))
+    probe.save("probe", "probe", frame)
+    one_file = probe.size_bytes()
+
+    disk = DiskCache(str(tmp_path / "cache"), max_bytes=int(one_file * 2.5))
+    for i in range(4):
+        disk.save(f"f{i}.xlsx", f"h{i}", frame)
+        # Dates d'utilisation distinctes et croissantes
+        os.utime(disk._path(f"h{i}", disk._find(f"h{i}")), (i, i))
+    disk.save("f4.xlsx", "h4", frame)
+
+    assert disk.size_bytes() <= disk.max_bytes
+    assert disk.lookup("f4.xlsx") == "h4" and disk.load("f4.xlsx") is not None
+    # Les fichiers les plus anciens sont supprimés et retirés de l'index
+    assert disk.lookup("f0.xlsx") is None and not disk.has_key("h0")
+
+
+def test_evicted_before_write_is_kept(tmp_path):
+    store = _store(tmp_path, max_bytes=1)
+    gate = threading.Event()
+    store._writer.submit(gate.wait)  # Bloque les écritures disque
+
+    df = pd.DataFrame({"a": [1, 2]})
+    store.put("A.xlsx", df, "HA")
+    store.put("B.xlsx", pd.DataFrame({"b": [1]}), "HB")  # Évince A (budget de 1 octet)
+    assert store.get("A.xlsx") is df
+
+    gate.set()
+    store.flush()
+    assert store.stats()["disk_writes_pending"] == 0
+
+
+def test_concurrent_changes_keep_readers_snapshot():
+    from concurrent.futures import ThreadPoolExecutor
+
+    from controllers import excel_controller
+
+    store_df = pd.DataFrame({"x": range(1000), "y": range(1000)})
+    excel_controller.dataset_store.put("concurrent.xlsx", store_df)
+    reader_view = excel_controller.dataset_store.get("concurrent.xlsx")
+
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(
+            lambda i: excel_controller.bin_variables("concurrent.xlsx", ["x"], "width", n_bins=i + 2),
+            range(8)))
+    assert all("error" not in result for result in results)
+
+    df = excel_controller.dataset_store.get("concurrent.xlsx")
+    # Aucune modification perdue, et le DataFrame obtenu avant n'a pas changé
+    assert len(df.columns) == 2 + 8
+    assert list(reader_view.columns) == ["x", "y"]
+
+    excel_controller.drop_columns("concurrent.xlsx", ["y"])
+    assert "y" not in excel_controller.dataset_store.get("concurrent.xlsx").columns
+    assert "y" in reader_view.columns
+    excel_controller.dataset_store.remove("concurrent.xlsx")
+
+
+def test_shared_columns_counted_once():
+    store = DatasetStore(1 << 30, 0)
+    base = pd.DataFrame({"a": [f"v{i}" for i in range(5000)], "b": range(5000)})
+    store.put("A.xlsx", base, "H")
+    single = store.total_bytes()
+    # Même contenu importé sous un autre nom : copie superficielle, mêmes colonnes
+    store.put("B.xlsx", store.find_by_hash("H"), "H")
+    assert store.total_bytes() == single
+
+    # Colonne ajoutée puis colonne supprimée sur une copie : seules les différences comptent
+    with store.writing("B.xlsx"):
+        df = store.get("B.xlsx").copy(deep=False)
+        df["c"] = 1.0
+        store.replace("B.xlsx", df, ["c"])
+    assert store.total_bytes() == single + 5000 * 8
+    with store.writing("B.xlsx"):
+        df = store.get("B.xlsx").copy(deep=False)
+        del df["a"]
+        store.replace("B.xlsx", df, ["a"])
+    assert store.total_bytes() == single + 5000 * 8
+
+
+def test_derived_results_count_in_budget():
+    frame = pd.DataFrame({"a": [f"v{i}" for i in range(5000)]})
+    store = DatasetStore(1 << 30, 0)
+    store.put("A.xlsx", frame)
+    base = store.total_bytes()
+    store.derived("A.xlsx", ("values", "a"), lambda: np.zeros(20000))
+    store.derived("A.xlsx", ("stats", "a"), lambda: {"column": "a", "unique_count": 5000})
+    assert store.total_bytes() > base + 160000
+    store.invalidate_columns("A.xlsx", ["a"])
+    assert store.total_bytes() == base
+
+    # Les résultats dérivés d'un jeu peuvent provoquer l'éviction des autres
+    store.max_bytes = 2 * base + 100000
+    store.put("B.xlsx", frame.copy())
+    store.derived("B.xlsx", ("values", "a"), lambda: np.zeros(20000))
+    assert store.evictions == 1
+    assert [d["filename"] for d in store.stats()["datasets"]] == ["B.xlsx"]
+
+
+def test_eviction_frees_only_unshared_columns():
+    base = pd.DataFrame({"a": [f"v{i}" for i in range(5000)], "b": range(5000)})
+    store = DatasetStore(1 << 30, 0)
+    store.put("A.xlsx", base, "H")
+    single = store.total_bytes()
+    copy = store.find_by_hash("H")
+    copy["c"] = 1.0
+    store.put("B.xlsx", copy, "H")
+    store.put("C.xlsx", pd.DataFrame({"z": range(1000)}))
+
+    # Évincer A ne libère rien (colonnes partagées avec B) : B est évincé à son tour
+    store.max_bytes = single + 5000 * 8
+    store.put("D.xlsx", pd.DataFrame({"d": [0]}))
+    assert [d["filename"] for d in store.stats()["datasets"]] == ["D.xlsx", "C.xlsx"]
+    assert store.evictions == 2
+
+
+def test_failed_background_load_is_forgotten():
+    store = DatasetStore(1 << 30, 0)
+    release = threading.Event()
+
+    def loader():
+        release.wait(5)
+        raise ValueError("classeur illisible")
+
+    future = store.load_async("bad.xlsx", loader)
+    assert store.stats()["loading"] == ["bad.xlsx"]
+    # Un get() en attente reçoit l'erreur
+    errors = []
+
+    def waiting_get():
+        try:
+            store.get("bad.xlsx")
+        except ValueError as e:
+            errors.append(e)
+
+    waiter = threading.Thread(target=waiting_get)
+    waiter.start()
+    time.sleep(0.05)
+    release.set()
+    waiter.join(5)
+    future.exception(5)
+    assert len(errors) == 1
+    assert store.stats()["loading"] == [] and "bad.xlsx" not in store
+    assert store.get("bad.xlsx") is None
+
+
+def test_derived_results_invalidated_by_column(tmp_path):
+    store = _store(tmp_path)
+    store.put("S.xlsx", pd.DataFrame({"a": [1, 2], "b": [3, 4]}))
+    calls = []
+
+    def stat(col):
+        return store.derived("S.xlsx", ("stats", col), lambda: calls.append(col) or len(calls))
+
+    assert (stat("a"), stat("b"), stat("a")) == (1, 2, 1)
+    df = store.get("S.xlsx").copy(deep=False)
+    df["b"] = [5, 6]
+    store.replace("S.xlsx", df, ["b"])
+    # Seule la colonne modifiée est recalculée
+    assert (stat("a"), stat("b")) == (1, 3)
+    # Nouvel import du fichier : tout est recalculé
+    store.put("S.xlsx", pd.DataFrame({"a": [7], "b": [8]}))
+    assert stat("a") == 4 and calls == ["a", "b", "b", "a"]
+
+
+def test_derived_not_kept_when_dataset_changes_meanwhile(tmp_path):
+    store = _store(tmp_path)
+    store.put("S.xlsx", pd.DataFrame({"a": [1, 2]}))
+
+    def compute():
+        # Modification concurrente pendant le calcul
+        store.replace("S.xlsx", pd.DataFrame({"a": [9, 9]}), ["a"])
+        return "périmé"
+
+    assert store.derived("S.xlsx", ("stats", "a"), compute) == "périmé"
+    assert store.derived("S.xlsx", ("stats", "a"), lambda: "frais") == "frais"
@@ -0,0 +1,57 @@
+import io
+
+import openpyxl
+import pandas as pd
+import pytest
+
+from services import excel_reader
+
+
+def _workbook() -> bytes:
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = "Accidents"
+    sheet.append(["zone", "gravite", "age", "taux", "note"])
+    sheet.append(["urbain", "grave", 31, 0.5, None])
+    sheet.append(["rural", None, 45, 1.25, "#N/A"])
+    sheet.append(["urbain", "leger", 27, 2.0, "ok"])
+    other = workbook.create_sheet("Communes")
+    other.append(["commune", "habitants"])
+    other.append(["Lyon", 520000])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("engine", excel_reader.available_engines())
+@pytest.mark.parametrize("sheet_name", [None, "Communes"])
+def test_engines_match_read_excel(engine, sheet_name):
+    data = _workbook()
+    expected = pd.read_excel(io.BytesIO(data), sheet_name=sheet_name or 0)
+    df, used = excel_reader.read_excel(io.BytesIO(data), "t.xlsx", engine, sheet_name)
+    assert used == engine
+    pd.testing.assert_frame_equal(df, expected)
+
+
+def test_engine_selection(monkeypatch):
+    assert excel_reader.resolve_engine("t.xlsx", "openpyxl") == "openpyxl"
+    with pytest.raises(ValueError):
+        excel_reader.resolve_engine("t.xlsx", "xlrd")
+
+    monkeypatch.setattr(excel_reader, "available_engines", lambda: ["calamine", "openpyxl", "pandas"])
+    assert excel_reader.resolve_engine("t.xlsx", "auto") == "calamine"
+    # Sans calamine : lecture en flux pour .xlsx, pandas pour l'ancien format .xls
+    monkeypatch.setattr(excel_reader, "available_engines", lambda: ["openpyxl", "pandas"])
+    assert excel_reader.resolve_engine("t.xlsx", "auto") == "openpyxl"
+    assert excel_reader.resolve_engine("t.xls", "auto") == "pandas"
+    with pytest.raises(ValueError):
+        excel_reader.resolve_engine("t.xlsx", "calamine")
+
+
+
+def test_preview_reads_only_the_first_rows():
+    data = _workbook()
+    head, declared = excel_reader.read_preview(io.BytesIO(data), "t.xlsx", 2)
+    assert declared == 3 and head["zone"].tolist() == ["urbain", "rural"]
+    # Ancien format : pas de lecture partielle
+    assert excel_reader.read_preview(io.BytesIO(data), "t.xls", 2) == (None, None)
@@ -0,0 +1,50 @@
+import pandas as pd
+import pytest
+
+from services import export
+
+pa = pytest.importorskip("pyarrow")
+
+
+def _read_arrow(df: pd.DataFrame, chunk_rows: int) -> pd.DataFrame:
+    mask = pd.Series(True, index=df.index)
+    data = b"".join(export.iter_rows(df, mask, "arrow", chunk_rows=chunk_rows))
+    return pa.ipc.open_stream(data).read_all().to_pandas()
+
+
+@pytest.mark.parametrize("chunk_rows", [1, 2, 100])
+def test_arrow_export_string_columns(chunk_rows):
+    df = pd.DataFrame({
+        "id": ["a", "b", None],
+        "binned": pd.Series([1, 2, 3]).astype(str),
+        "mixed": [1, "x", None],
+        "empty": [None, None, None],
+        "n": [1, 2, 3],
+    })
+    result = _read_arrow(df, chunk_rows)
+    assert result["id"].tolist() == ["a", "b", None]
+    assert result["binned"].tolist() == ["1", "2", "3"]
+    assert result["mixed"].tolist() == ["1", "x", None]
+    assert result["empty"].tolist() == [None, None, None]
+    assert result["n"].tolist() == [1, 2, 3]
+
+
+def test_arrow_export_typed_object_columns():
+    df = pd.DataFrame({
+        "flag": pd.Series([True, None, False], dtype=object),
+        "value": pd.Series([1.5, None, 2.0], dtype=object),
+        "category": pd.Categorical(["u", "v", "u"]),
+    })
+    result = _read_arrow(df, 2)
+    assert result["flag"].tolist() == [True, None, False]
+    assert result["value"].iloc[[0, 2]].tolist() == [1.5, 2.0]
+    assert result["category"].astype(str).tolist() == ["u", "v", "u"]
+
+
+def test_csv_and_ndjson_export():
+    df = pd.DataFrame({"id": ["a", "b", "c"], "n": [1, 2, 3]})
+    mask = pd.Series([True, False, True])
+    csv = b"".join(export.iter_rows(df, mask, "csv", chunk_rows=1)).decode()
+    assert csv.splitlines() == ["id,n", "a,1", "c,3"]
+    ndjson = b"".join(export.iter_rows(df, mask, "ndjson", chunk_rows=1)).decode()
+    assert ndjson.splitlines() == ['{"id":"a","n":1}', '{"id":"c","n":3}']
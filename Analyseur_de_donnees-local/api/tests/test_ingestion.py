@@ -0,0 +1,114 @@
+import io
+
+import pandas as pd
+import pytest
+
+from services import ingestion
+
+
+def test_file_kind():
+    assert ingestion.file_kind("a.XLSX") == ingestion.file_kind("a.xls") == "excel"
+    assert ingestion.file_kind("a.csv") == "csv"
+    assert ingestion.file_kind("a.parquet") == "parquet"
+    assert ingestion.file_kind("a.txt") is None
+    assert ingestion.list_sheets(io.BytesIO(b"x\n1\n"), "a.csv") == []
+
+
+@pytest.mark.parametrize("delimiter", [",", ";", "\t"])
+def test_csv_delimiter_detected(delimiter):
+    data = delimiter.join(["code", "nom", "taux"]) + "\n"
+    data += f"1{delimiter}Paris{delimiter}0.5\n2{delimiter}Lyon{delimiter}1.25\n"
+    df, engine = ingestion.read_table(io.BytesIO(data.encode("utf-8")), "t.csv")
+    assert engine in ("pyarrow", "pyarrow (types en cache)")
+    assert df.columns.tolist() == ["code", "nom", "taux"]
+    assert df["nom"].tolist() == ["Paris", "Lyon"] and df["taux"].tolist() == [0.5, 1.25]
+
+
+def test_csv_latin1():
+    df, _ = ingestion.read_table(io.BytesIO("ville;n\nSète;1\nÉvry;2\n".encode("latin-1")), "t.csv")
+    assert df["ville"].tolist() == ["Sète", "Évry"]
+
+
+def test_same_header_reuses_cached_types():
+    hits = ingestion.dtype_cache.stats()["hits"]
+    first, engine = ingestion.read_csv(io.BytesIO(b"annee,valeur\n2020,1.5\n2021,\n"))
+    assert engine == "pyarrow"
+    second, engine = ingestion.read_csv(io.BytesIO(b"annee,valeur\n2022,3\n"))
+    assert engine == "pyarrow (types en cache)"
+    assert ingestion.dtype_cache.stats()["hits"] == hits + 1
+    # Les types de la première lecture sont imposés (valeur reste décimale)
+    assert second.dtypes.tolist() == first.dtypes.tolist()
+
+
+def test_parquet_round_trip():
+    expected = pd.DataFrame({"id": [1, 2, 3], "zone": ["a", "b", None], "x": [0.5, None, 2.0]})
+    buffer = io.BytesIO()
+    expected.to_parquet(buffer)
+    df, engine = ingestion.read_table(buffer, "t.parquet")
+    assert engine == "pyarrow"
+    pd.testing.assert_frame_equal(df, expected)
+
+
+def test_cached_types_contradicted_retry_arrow():
+    assert ingestion.read_csv(io.BytesIO(b"id;label\n1;a\n2;b\n"))[1] == "pyarrow"
+    # Même en-tête, mais "id" n'est plus numérique : relecture Arrow sans les types mémorisés
+    df, engine = ingestion.read_csv(io.BytesIO(b"id;label\nA1;a\n2;b\n"))
+    assert engine == "pyarrow"
+    assert df["id"].tolist() == ["A1", "2"]
+    # Les types de la nouvelle lecture remplacent les anciens
+    assert ingestion.read_csv(io.BytesIO(b"id;label\nB7;c\n"))[1] == "pyarrow (types en cache)"
+
+
+def test_workbook_sheet_selection():
+    import openpyxl
+
+    workbook = openpyxl.Workbook()
+    workbook.active.title = "Accidents"
+    workbook.active.append(["id"])
+    workbook.active.append([1])
+    other = workbook.create_sheet("Communes")
+    other.append(["commune"])
+    other.append(["Nantes"])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+
+    assert ingestion.list_sheets(buffer, "t.xlsx") == ["Accidents", "Communes"]
+    assert ingestion.read_table(buffer, "t.xlsx")[0].columns.tolist() == ["id"]
+    df, _ = ingestion.read_table(buffer, "t.xlsx", sheet_name="Communes")
+    assert df["commune"].tolist() == ["Nantes"]
+
+
+def test_optimize_dtypes_is_lossless():
+    import numpy as np
+
+    original = pd.DataFrame({
+        "petit": [1, 2, 3, 4],
+        "grand": [0, 70000, 1, 2],
+        "demi": [0.5, 1.25, np.nan, 4.0],
+        "precis": [0.1, 0.2, 0.3, 0.4],
+        "zone": ["urbain", "urbain", "urbain", None],
+        "libre": ["a", "b", "c", "d"],
+    })
+    df, report = ingestion.optimize_dtypes(original)
+    assert report["conversions"] == {"petit": "int8", "grand": "int32", "demi": "float32", "zone": "category"}
+    assert report["after_bytes"] < report["before_bytes"]
+    # float32 uniquement quand la conversion est exacte
+    assert df["precis"].dtype == np.float64
+    assert df["libre"].dtype == object
+    # Mêmes valeurs qu'avant conversion
+    for col in original.columns:
+        assert df[col].astype(object).where(df[col].notna(), None).tolist() == \
+            original[col].astype(object).where(original[col].notna(), None).tolist()
+
+
+def test_category_ratio_threshold(monkeypatch):
+    series = pd.DataFrame({"zone": ["a", "b", "a", "b", "c", "c"]})
+    monkeypatch.setattr(ingestion, "CATEGORY_MAX_RATIO", 0.5)
+    assert ingestion.optimize_dtypes(series)[1]["conversions"] == {"zone": "category"}
+    monkeypatch.setattr(ingestion, "CATEGORY_MAX_RATIO", 0.4)
+    assert ingestion.optimize_dtypes(series)[1]["conversions"] == {}
+
+
+def test_infinite_floats_become_missing():
+    df, _ = ingestion.optimize_dtypes(pd.DataFrame({"x": [1.5, float("inf"), -float("inf")]}))
+    assert df["x"].isna().tolist() == [False, True, True]
@@ -0,0 +1,71 @@
+import asyncio
+import threading
+import time
+
+from services.job_runner import JobRunner
+
+
+def test_cancelled_request_keeps_its_slot_until_the_thread_finishes():
+    async def scenario():
+        runner = JobRunner(max_workers=4, limits={"tree": 1})
+        release = threading.Event()
+        started = []
+
+        def slow():
+            started.append("slow")
+            release.wait(5)
+
+        def fast():
+            started.append("fast")
+
+        first = asyncio.create_task(runner.run("tree", slow))
+        await asyncio.sleep(0.05)
+        first.cancel()
+        second = asyncio.create_task(runner.run("tree", fast))
+        await asyncio.sleep(0.1)
+        # Le thread du premier appel tourne encore : le second attend sa place
+        assert started == ["slow"]
+        assert runner.metrics()["endpoints"]["tree"]["running"] == 1
+
+        release.set()
+        await asyncio.wait_for(second, 5)
+        assert started == ["slow", "fast"]
+        stats = runner.metrics()["endpoints"]["tree"]
+        assert stats["running"] == 0 and stats["completed"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_before_start_releases_its_slot():
+    async def scenario():
+        runner = JobRunner(max_workers=1, limits={"a": 1, "b": 1})
+        release = threading.Event()
+        blocker = asyncio.create_task(runner.run("a", release.wait, 5))
+        await asyncio.sleep(0.05)
+        # Le pool est occupé : la tâche "b" est soumise mais ne démarre pas
+        queued = asyncio.create_task(runner.run("b", time.sleep, 0))
+        await asyncio.sleep(0.05)
+        queued.cancel()
+        await asyncio.sleep(0.05)
+        release.set()
+        await blocker
+        assert await asyncio.wait_for(runner.run("b", lambda: "ok"), 5) == "ok"
+
+    asyncio.run(scenario())
+
+
+def test_pool_queue_depth_counts_tasks_not_started():
+    runner = JobRunner(max_workers=1)
+    release = threading.Event()
+    running = runner.submit(release.wait, 5)
+    waiting = [runner.submit(time.sleep, 0) for _ in range(3)]
+    time.sleep(0.05)
+    assert runner.metrics()["pool_queue_depth"] == 3
+    # Une tâche annulée avant son démarrage quitte la file
+    assert waiting[0].cancel()
+    assert runner.metrics()["pool_queue_depth"] == 2
+    release.set()
+    running.result(5)
+    for future in waiting[1:]:
+        future.result(5)
+    assert runner.metrics()["pool_queue_depth"] == 0
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from controllers import excel_controller
+from services import profiling
+from services.dataset_store import dataset_store
+
+
+def _frame() -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "age": rng.integers(0, 90, 500),
+        "taux": np.where(rng.random(500) < 0.1, np.nan, rng.normal(10, 3, 500)),
+        "zone": pd.Series(rng.choice(["urbain", "rural", "périurbain"], 500)).astype("category"),
+        "vide": np.full(500, np.nan),
+        "actif": rng.random(500) < 0.5,
+    })
+
+
+def test_profile_matches_pandas():
+    df = _frame()
+    profiles = {p["column"]: p for p in profiling.profile_dataframe(df, bins=10)["columns"]}
+
+    taux = profiles["taux"]
+    assert taux["null_count"] == int(df["taux"].isna().sum()) and taux["count"] == int(df["taux"].count())
+    assert taux["mean"] == pytest.approx(df["taux"].mean())
+    assert taux["std"] == pytest.approx(df["taux"].std())
+    for q, value in taux["quantiles"].items():
+        assert value == pytest.approx(df["taux"].quantile(float(q)))
+    counts, edges = np.histogram(df["taux"].dropna(), bins=10)
+    assert taux["histogram"]["counts"] == counts.tolist()
+    assert taux["histogram"]["edges"] == pytest.approx(edges.tolist())
+    assert taux["suggested_bin_size"] > 0
+
+    zone = profiles["zone"]
+    assert not zone["is_numeric"] and zone["unique_count"] == 3
+    expected = df["zone"].value_counts()
+    assert [(t["value"], t["count"]) for t in zone["top_values"]] == list(zip(expected.index.astype(str), expected.tolist()))
+
+    # Booléens non numériques ; colonne vide sans statistiques
+    assert not profiles["actif"]["is_numeric"]
+    assert profiles["vide"]["mean"] is None and profiles["vide"]["null_rate"] == 1.0
+
+
+def test_sampled_profile(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_SAMPLE_ROWS", 100)
+    result = profiling.profile_dataframe(_frame(), ["age"], sample=True)
+    assert (result["total_rows"], result["profiled_rows"], result["sampled"]) == (500, 100, True)
+    assert profiling.profile_dataframe(_frame(), ["age"])["sampled"] is False
+
+
+def test_profile_columns_errors():
+    dataset_store.put("profil.xlsx", _frame())
+    try:
+        assert "error" in excel_controller.profile_columns("profil.xlsx", ["absente"])
+        assert "error" in excel_controller.profile_columns("profil.xlsx", top_k=0)
+        result = excel_controller.profile_columns("profil.xlsx", ["zone"], top_k=1)
+        assert len(result["columns"][0]["top_values"]) == 1
+    finally:
+        dataset_store.remove("profil.xlsx")
+    assert "error" in excel_controller.profile_columns("profil.xlsx")
@@ -0,0 +1,48 @@
+import pandas as pd
+import pytest
+
+from controllers import excel_controller
+from services.dataset_store import dataset_store
+
+
+@pytest.fixture
+def accidents():
+    dataset_store.put("acc.xlsx", pd.DataFrame({
+        "gravite": ["léger", "grave", "léger", "mortel", "léger", "grave"],
+        "zone": pd.Series(["urbain", "rural", "rural", "urbain", "urbain", "périurbain"], dtype="category"),
+        "heure": [8, 17, 17, 23, 8, 12],
+        "age": [30, 45, 22, 67, 30, 51],
+    }))
+    yield "acc.xlsx"
+    dataset_store.remove("acc.xlsx")
+
+
+def test_selection_summarized_with_counts(accidents):
+    result = excel_controller.select_columns(
+        accidents, ["age"], ["gravite"],
+        selected_data={"zone": ["urbain", "rural", "absente"], "heure": [17, 8], "inconnue": ["x"]},
+    )
+    # Modalités retenues présentes dans les données, en texte et dans l'ordre d'apparition
+    assert result["selected_data"] == {"zone": ["urbain", "rural"], "heure": ["8", "17"]}
+    assert result["selected_counts"] == {
+        "zone": {"counts": [3, 2], "total_rows": 5},
+        "heure": {"counts": [2, 2], "total_rows": 4},
+    }
+    assert result["summary"]["total_rows"] == 6 and result["summary"]["total_selected_columns"] == 3
+    (target,) = result["results"]
+    assert target["y_preview"] == ["léger", "grave", "léger", "mortel", "léger"]
+    assert target["y_stats"]["count"] == 6 and target["y_stats"]["mean"] is None
+
+
+def test_remaining_columns_cardinalities(accidents):
+    result = excel_controller.select_columns(accidents, ["age"], ["gravite"])
+    assert sorted(result["remaining_columns"]) == ["heure", "zone"]
+    assert result["remaining_cardinalities"] == {"zone": 3, "heure": 4}
+    assert "remaining_data" not in result
+
+    values = excel_controller.select_columns(accidents, ["age"], ["gravite"], include_values=True)["remaining_data"]
+    assert values == {"zone": ["urbain", "rural", "périurbain"], "heure": [8, 17, 23, 12]}
+
+
+def test_unknown_column(accidents):
+    assert "error" in excel_controller.select_columns(accidents, ["absente"], ["gravite"])
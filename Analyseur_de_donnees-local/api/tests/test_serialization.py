@@ -0,0 +1,56 @@
+import json
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services import serialization
+from services.serialization import FastJSONResponse
+
+
+def test_numpy_values_and_nan_serialized():
+    content = {
+        "entier": np.int64(3),
+        "petit": np.int8(-2),
+        "decimal": np.float32(0.5),
+        "manquant": float("nan"),
+        "infini": np.float64("inf"),
+        "booleen": np.bool_(True),
+        "tableau": np.array([1, 2, 3]),
+        1: "clé entière",
+        "date": date(2024, 5, 1),
+        "horodatage": pd.Timestamp("2024-05-01 12:30"),
+    }
+    parsed = json.loads(FastJSONResponse(content).body)
+    assert parsed == {
+        "entier": 3,
+        "petit": -2,
+        "decimal": 0.5,
+        "manquant": None,
+        "infini": None,
+        "booleen": True,
+        "tableau": [1, 2, 3],
+        "1": "clé entière",
+        "date": "2024-05-01",
+        "horodatage": "2024-05-01T12:30:00",
+    }
+
+
+@pytest.mark.parametrize("series", [
+    pd.Series([1, 2, 3], dtype="int16"),
+    pd.Series([1.5, None, 3.0]),
+    pd.Series([1.5, None], dtype="float32"),
+    pd.Series([True, False]),
+    pd.Series(["a", None, "b"]),
+    pd.Series(["a", None, "a"], dtype="category"),
+    pd.Series([1, 2, None], dtype="category"),
+    pd.Series([0.1, None], dtype="float32").astype("category"),
+    pd.Series(pd.to_datetime(["2024-01-01", None])),
+    pd.Series([1, "a", None], dtype=object),
+])
+def test_vectorized_conversion_matches_loop(series):
+    # Mêmes entrées que les appelants : valeurs uniques pour native_values, Series pour string_values
+    unique = series.dropna().unique()
+    assert serialization.native_values(unique) == [serialization._convert_native(v) for v in unique]
+    assert serialization.string_values(series) == [serialization._convert_str(v) for v in series]
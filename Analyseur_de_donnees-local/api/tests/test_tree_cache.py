@@ -0,0 +1,44 @@
+import io
+from types import SimpleNamespace
+
+from controllers import excel_controller
+from services.dataset_store import dataset_store, object_size
+from services.tree_cache import TreeResultCache, tree_cache
+
+
+def _result(size: int):
+    return {"decision_trees": {}, "pdf_base64": "x" * size}
+
+
+def test_results_bounded_in_bytes():
+    entry = object_size(_result(10000))
+    cache = TreeResultCache(32, max_bytes=3 * entry)
+    for i in range(5):
+        cache.put(("a.xlsx", 1, str(i)), _result(10000))
+    # Les plus anciens sont évincés dès que la taille dépasse la limite
+    assert [cache.get(("a.xlsx", 1, str(i))) is not None for i in range(5)] == [False, False, True, True, True]
+    assert cache.stats()["bytes"] == 3 * entry
+    # Un résultat plus grand que la limite n'est pas mémorisé
+    cache.put(("a.xlsx", 1, "big"), _result(50000))
+    assert cache.get(("a.xlsx", 1, "big")) is None and cache.stats()["bytes"] == 3 * entry
+
+    cache.put_base(("a.xlsx", 1, "base"), 5, _result(10000))
+    assert cache.get_base(("a.xlsx", 1, "base"), 10) is not None
+    assert cache.stats()["base_bytes"] == entry
+    cache.invalidate("a.xlsx")
+    stats = cache.stats()
+    assert stats["entries"] == stats["base_trees"] == stats["bytes"] == stats["base_bytes"] == 0
+
+
+def _upload():
+    return SimpleNamespace(filename="reup.csv", file=io.BytesIO(b"a,b\n1,x\n2,y\n"))
+
+
+def test_reupload_drops_cached_trees():
+    excel_controller.preview_excel(_upload())
+    key = tree_cache.make_key("reup.csv", 1, ["a"], ["b"], {}, None, "independent")
+    tree_cache.put(key, _result(10))
+    tree_cache.put_base(key, 0, _result(10))
+    excel_controller.preview_excel(_upload())
+    assert tree_cache.get(key) is None and tree_cache.get_base(key, 0) is None
+    dataset_store.remove("reup.csv")
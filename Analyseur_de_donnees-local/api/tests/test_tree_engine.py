@@ -0,0 +1,184 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from controllers import excel_controller
+from services import parallel_tree, tree_engine
+from services.dataset_store import dataset_store
+from services.tree_cache import tree_cache
+
+EXPLANATORY = ["sexe", "age", "meteo", "flag", "num", "route"]
+
+
+def make_df(n: int = 3000, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "sexe": rng.choice(["H", "F", None], n, p=[.45, .45, .1]),
+        "age": rng.choice(["jeune", "adulte", "senior", "inconnu"], n),
+        "meteo": rng.choice(["pluie", "soleil", "neige", "brouillard", "vent"], n),
+        "flag": rng.choice([True, False], n),
+        "num": rng.integers(0, 6, n),
+        "flt": np.where(rng.random(n) < .1, np.nan, rng.integers(0, 4, n).astype(float)),
+        "route": rng.choice([f"R{i}" for i in range(12)], n),
+        "gravite": rng.choice(["leger", "grave", "mortel", None], n),
+        "zone": rng.choice(["urbain", "rural"], n),
+    })
+    return df.replace([np.nan, np.inf, -np.inf], None)
+
+
+# Implémentation d'origine (boucle par modalité), référence des tests de non-régression
+
+def legacy_percentage_variance(df, explanatory_var, target_var, target_value):
+    target_mask = (df[target_var] == target_value) & (df[target_var].notna())
+    if len(df[target_mask]) == 0:
+        return 0.0
+    percentages = []
+    for explanatory_value in df[explanatory_var].dropna().unique():
+        total = len(df[df[explanatory_var] == explanatory_value])
+        hits = len(df[(df[explanatory_var] == explanatory_value) & target_mask])
+        if total > 0:
+            percentages.append(hits / total * 100)
+    return float(np.std(percentages)) if len(percentages) > 1 else 0.0
+
+
+def legacy_branch_percentages(df, explanatory_var, target_var, target_value):
+    target_mask = (df[target_var] == target_value) & (df[target_var].notna())
+    branches = {}
+    for explanatory_value in df[explanatory_var].dropna().unique():
+        total = len(df[df[explanatory_var] == explanatory_value])
+        hits = len(df[(df[explanatory_var] == explanatory_value) & target_mask])
+        if total > 0:
+            branches[str(explanatory_value)] = {
+                "count": int(hits), "total": int(total),
+                "percentage": round(hits / total * 100, 2), "subtree": None,
+            }
+    return branches
+
+
+def legacy_tree(df, target_value, target_var, available_vars, current_path=None, threshold=None):
+    current_path = current_path or []
+    if not available_vars:
+        return {"type": "leaf", "message": "Plus de variables explicatives disponibles"}
+    variances = {var: legacy_percentage_variance(df, var, target_var, target_value) for var in available_vars}
+    best_var = max(variances, key=variances.get)
+    branches = legacy_branch_percentages(df, best_var, target_var, target_value)
+    node = {"type": "node", "variable": best_var, "variance": round(variances[best_var], 4),
+            "branches": branches, "path": current_path + [best_var]}
+    remaining = [var for var in available_vars if var != best_var]
+    for branch_value, branch_data in branches.items():
+        converted = {"False": False, "True": True}.get(branch_value, branch_value)
+        branch_df = df[(df[best_var] == converted) & df[best_var].notna()]
+        if len(branch_df) > 0 and remaining:
+            if threshold and threshold > 0 and len(branch_df) < threshold:
+                branch_data["subtree"] = {
+                    "type": "leaf",
+                    "message": f"[ARRET] Branche arrêtée - Effectif insuffisant ({len(branch_df)} < {threshold})"
+                }
+            else:
+                branch_data["subtree"] = legacy_tree(branch_df, target_value, target_var, remaining,
+                                                     current_path + [best_var, branch_value], threshold)
+    return node
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+@pytest.mark.parametrize("target_value", ["grave", "leger", "absent"])
+def test_percentage_std_matches_loop(seed, target_value):
+    df = make_df(2000, seed)
+    hits_mask = tree_engine.target_indicator(df["gravite"], target_value)
+    for var in EXPLANATORY + ["flt"]:
+        _, totals, hits = tree_engine.modality_counts(df[var], hits_mask)
+        assert tree_engine.percentage_std(totals, hits) == pytest.approx(
+            legacy_percentage_variance(df, var, "gravite", target_value), abs=1e-9), var
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_branch_table_matches_loop(seed):
+    df = make_df(2000, seed)
+    hits_mask = tree_engine.target_indicator(df["gravite"], "grave")
+    for var in EXPLANATORY + ["flt"]:
+        uniques, totals, hits = tree_engine.modality_counts(df[var], hits_mask)
+        branches = tree_engine.branch_table(uniques, totals, hits)
+        expected = legacy_branch_percentages(df, var, "gravite", "grave")
+        # Même ordre des branches (première apparition), mêmes effectifs et pourcentages
+        assert list(branches) == list(expected), var
+        assert branches == expected, var
+
+
+def test_missing_values_are_ignored():
+    df = pd.DataFrame({
+        "x": ["a", None, "b", "a", np.nan, "b"],
+        "target": ["t", "t", None, "u", "t", np.nan],
+    })
+    hits_mask = tree_engine.target_indicator(df["target"], "t")
+    assert hits_mask.tolist() == [True, True, False, False, True, False]
+    uniques, totals, hits = tree_engine.modality_counts(df["x"], hits_mask)
+    assert list(uniques) == ["a", "b"] and totals.tolist() == [2, 2] and hits.tolist() == [1, 0]
+    assert tree_engine.branch_table(uniques, totals, hits) == legacy_branch_percentages(df, "x", "target", "t")
+
+
+@pytest.mark.parametrize("threshold", [None, 0, 25, 200])
+def test_tree_matches_recursive_build(threshold):
+    df = make_df(1500, 3)
+    variables = ["sexe", "age", "meteo", "flag", "num"]
+    for target_value in ["grave", "mortel"]:
+        tree = excel_controller.construct_tree_for_value(df, target_value, "gravite", variables,
+                                                         min_population_threshold=threshold)
+        expected = legacy_tree(df, target_value, "gravite", variables, threshold=threshold)
+        assert tree_engine.prune_tree(tree, threshold) == expected
+
+
+def _trees(dataset, variables, threshold, budget=None):
+    hits_list = [dataset.indicator("gravite", value) for value in ["grave", "leger"]]
+    return hits_list, [
+        tree_engine.grow_tree(dataset, dataset.all_rows(), hits, list(variables), [], threshold, None, budget)
+        for hits in hits_list
+    ]
+
+
+@pytest.mark.parametrize("budget", [None, tree_engine.TreeBudget(max_depth=2, max_branches_per_node=3)])
+def test_parallel_build_matches_serial(budget):
+    df = make_df(3000, 4)
+    dataset = tree_engine.EncodedDataset(df, EXPLANATORY + ["gravite"])
+    hits_list, serial = _trees(dataset, EXPLANATORY, 10, budget)
+    parallel = parallel_tree.build_trees(dataset, [(hits, EXPLANATORY) for hits in hits_list], 10, 2, None, budget)
+    assert parallel == serial
+
+
+def test_pruned_tree_matches_direct_build():
+    df = make_df(3000, 5)
+    dataset = tree_engine.EncodedDataset(df, EXPLANATORY + ["gravite"])
+    _, base_trees = _trees(dataset, EXPLANATORY, 5)
+    for threshold in [5, 10, 40, 300, 5000]:
+        _, direct_trees = _trees(dataset, EXPLANATORY, threshold)
+        for base, direct in zip(base_trees, direct_trees):
+            assert tree_engine.prune_tree(base, threshold) == tree_engine.prune_tree(direct, threshold)
+
+
+def test_cached_results_match_direct_builds(monkeypatch):
+    # Le PDF n'intervient pas dans la comparaison
+    monkeypatch.setattr(excel_controller, "generate_tree_pdf", lambda trees, filename, deadline=None: "")
+    dataset_store.put("cache.xlsx", make_df(3000, 6))
+    tree_cache.invalidate("cache.xlsx")
+    variables = ["sexe", "age", "meteo", "route"]
+    statuses = []
+    for mode, selected in [("independent", {"gravite": ["grave", "leger"]}), ("together", {"gravite": ["grave"]})]:
+        for threshold in [10, 40, None, 5, 40]:
+            result = excel_controller.build_decision_tree_with_pdf(
+                "cache.xlsx", variables, ["gravite"], selected, threshold, mode)
+            direct = excel_controller.build_decision_tree(
+                "cache.xlsx", variables, ["gravite"], selected, threshold, mode)
+            assert result["decision_trees"] == direct["decision_trees"], (mode, threshold)
+            statuses.append(result["tree_cache"])
+    assert statuses == ["miss", "pruned", "miss", "pruned", "hit"] * 2
+    dataset_store.remove("cache.xlsx")
+
+
+def test_builds_share_one_process_pool():
+    df = make_df(1000, 7)
+    dataset = tree_engine.EncodedDataset(df, EXPLANATORY + ["gravite"])
+    hits_list, serial = _trees(dataset, EXPLANATORY, 10)
+    specs = [(hits, EXPLANATORY) for hits in hits_list]
+    assert parallel_tree.build_trees(dataset, specs, 10, 1) == serial
+    executor = parallel_tree._executor
+    assert parallel_tree.build_trees(dataset, specs, 10, 2) == serial
+    assert parallel_tree._executor is executor
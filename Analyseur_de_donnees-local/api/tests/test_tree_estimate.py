@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from services import tree_engine, tree_estimate
+
+N = 400
+
+
+def _column(kind: str) -> pd.Series:
+    values = np.arange(N) % 4
+    return {
+        "text": pd.Series(np.array(["a", "b", "c", "d"])[values]),
+        "bool": pd.Series(values < 2),
+        "int": pd.Series(values),
+        "float": pd.Series(values * 1.5),
+        "category": pd.Series(np.array(["a", "b", "c", "d"])[values]).astype("category"),
+        "int_category": pd.Series(values).astype("category"),
+        "digits_text": pd.Series(values.astype(str)),
+    }[kind]
+
+
+@pytest.mark.parametrize("kind", ["text", "bool", "int", "float", "category", "int_category", "digits_text"])
+def test_recursion_rule_matches_engine(kind):
+    column = _column(kind)
+    df = pd.DataFrame({
+        "x": column,
+        "other": np.arange(N) % 3,
+        "target": np.where(np.arange(N) % 4 == 0, "t", "u"),
+    })
+    dataset = tree_engine.EncodedDataset(df, ["x", "other", "target"])
+    hits = dataset.indicator("target", "t")
+    node, children = tree_engine.expand_node(dataset, dataset.all_rows(), hits, ["x", "other"], [])
+    assert node["variable"] == "x"
+    assert tree_estimate.branches_recurse(column) == bool(children), kind
+
+
+def test_estimate_bounds_built_tree():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "a": rng.choice(["p", "q", "r"], 2000),
+        "b": rng.choice(["s", "t"], 2000),
+        "c": rng.choice(["u", "v", "w", "x"], 2000),
+        "target": rng.choice(["y", "n"], 2000),
+    })
+    variables = ["a", "b", "c"]
+    dataset = tree_engine.EncodedDataset(df, variables + ["target"])
+    hits = dataset.indicator("target", "y")
+    for threshold in [None, 50, 400]:
+        tree = tree_engine.prune_tree(
+            tree_engine.grow_tree(dataset, dataset.all_rows(), hits, variables, [], threshold), threshold)
+        usage = tree_engine.tree_usage(tree)
+        bound = tree_estimate.estimate_tree(len(df), [3, 2, 4], [True] * 3, threshold)
+        assert usage["nodes"] <= bound["nodes"] and usage["depth"] <= bound["depth"]
+    # Sans seuil, les 1 + 4 + 4 x 3 nœuds sont atteints
+    assert tree_estimate.estimate_tree(len(df), [3, 2, 4], [True] * 3)["nodes"] == 17
+
+
+def test_estimate_respects_budget_and_leaf_variables():
+    bound = tree_estimate.estimate_tree(10000, [5, 5, 5], [True, True, True], max_depth=2)
+    assert bound["depth"] == 2 and bound["nodes"] == 1 + 5
+    assert tree_estimate.estimate_tree(10000, [5, 5, 5], [True] * 3, max_nodes=4)["nodes"] == 4
+    # Une seule variable développable : deux niveaux au plus
+    assert tree_estimate.estimate_tree(10000, [5, 5, 5], [True, False, False])["depth"] == 2
+    cost = tree_estimate.estimate_cost(3, {"nodes": 10, "branches": 40, "depth": 2, "row_visits": 1000})
+    assert cost["estimated_nodes"] == 30 and cost["estimated_branches"] == 120
+    assert cost["estimated_response_bytes"] == cost["estimated_tree_json_bytes"] + cost["estimated_pdf_bytes"]
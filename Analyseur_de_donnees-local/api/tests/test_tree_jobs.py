@@ -0,0 +1,74 @@
+import threading
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from routers import excel_router
+from services.tree_engine import BuildProgress
+from services.tree_jobs import TreeJobRegistry
+
+
+class RacingProgress(BuildProgress):
+    """Déclenche une annulation juste après la première lecture de `cancelled`."""
+
+    def __init__(self, registry, job_id):
+        super().__init__()
+        self.registry = registry
+        self.job_id = job_id
+        self.checked = False
+
+    @property
+    def cancelled(self) -> bool:
+        value = super().cancelled
+        if not self.checked:
+            self.checked = True
+            threading.Thread(target=self.registry.cancel, args=(self.job_id,)).start()
+            time.sleep(0.05)
+        return value
+
+
+def test_cancel_racing_with_start_is_not_lost():
+    registry = TreeJobRegistry()
+    job = registry.create({})
+    job.progress = RacingProgress(registry, job.id)
+
+    def build(progress):
+        time.sleep(0.2)
+        return {"decision_trees": {}}
+
+    registry.run(job, build)
+    assert job.status == "cancelled"
+    assert job.result is None and job.finished_at is not None
+
+
+def test_cancelled_job_does_not_run():
+    registry = TreeJobRegistry()
+    job = registry.create({})
+    registry.cancel(job.id)
+    calls = []
+    registry.run(job, lambda progress: calls.append(1))
+    assert calls == [] and job.status == "cancelled"
+
+
+def test_active_jobs_are_capped():
+    registry = TreeJobRegistry(max_active=2)
+    first, second = registry.create({}), registry.create({})
+    assert registry.create({}) is None
+    # Un job terminé ou annulé libère sa place
+    registry.run(first, lambda progress: {"decision_trees": {}})
+    third = registry.create({})
+    assert third is not None and registry.create({}) is None
+    registry.cancel(second.id)
+    assert registry.create({}) is not None
+
+
+def test_submit_rejected_with_429_when_full(monkeypatch):
+    monkeypatch.setattr(excel_router, "tree_jobs", TreeJobRegistry(max_active=0))
+    app = FastAPI()
+    app.include_router(excel_router.router)
+    response = TestClient(app).post("/excel/decision-tree-jobs", data={
+        "filename": "x.xlsx", "variables_explicatives": '["a"]',
+        "variable_a_expliquer": '["b"]', "selected_data": "{}",
+    })
+    assert response.status_code == 429 and "error" in response.json()
@@ -0,0 +1,39 @@
+import time
+
+import pytest
+
+from controllers import excel_controller
+from services.dataset_store import dataset_store
+from services.tree_cache import tree_cache
+from tests.test_tree_engine import make_df
+
+
+def _trees():
+    df = make_df(500, 8)
+    tree = excel_controller.construct_tree_for_value(df, "grave", "gravite", ["sexe", "age", "meteo"])
+    return {"gravite": {"grave": tree}}
+
+
+def test_pdf_stops_at_deadline():
+    trees = _trees()
+    assert excel_controller.generate_tree_pdf(trees, "t.xlsx")
+    assert excel_controller.generate_tree_pdf(trees, "t.xlsx", time.monotonic() + 60)
+    with pytest.raises(excel_controller.PdfTimeout):
+        excel_controller.generate_tree_pdf(trees, "t.xlsx", time.monotonic() - 1)
+
+
+def test_pdf_skipped_when_time_limit_is_spent(monkeypatch):
+    def slow_pdf(trees, filename, deadline=None):
+        raise excel_controller.PdfTimeout()
+
+    monkeypatch.setattr(excel_controller, "generate_tree_pdf", slow_pdf)
+    dataset_store.put("pdf.xlsx", make_df(500, 9))
+    tree_cache.invalidate("pdf.xlsx")
+    for _ in range(2):
+        result = excel_controller.build_decision_tree_with_pdf(
+            "pdf.xlsx", ["sexe", "age"], ["gravite"], {"gravite": ["grave"]}, time_limit=30)
+        assert result["pdf_generated"] is False and "pdf_base64" not in result
+        assert result["tree_budget"]["pdf_skipped"] is True
+        # Résultat incomplet : non mémorisé
+        assert result["tree_cache"] == "miss"
+    dataset_store.remove("pdf.xlsx")
@@ -0,0 +1,74 @@
+import io
+import threading
+from types import SimpleNamespace
+
+import openpyxl
+import pandas as pd
+import pytest
+
+from controllers import excel_controller
+from services import ingestion
+from services.dataset_store import dataset_store
+
+CSV = b"zone;gravite;age\nurbain;grave;31\nrural;leger;45\nurbain;leger;27\n"
+
+
+def _upload(filename: str, data: bytes):
+    return SimpleNamespace(filename=filename, file=io.BytesIO(data))
+
+
+def test_reupload_of_same_content_skips_parsing(monkeypatch):
+    first = excel_controller.preview_excel(_upload("first.csv", CSV))
+    assert first["cache_hit"] is False and first["parse_ms"] is not None
+
+    def no_parse(*args, **kwargs):
+        pytest.fail("le contenu déjà analysé ne doit pas être relu")
+
+    monkeypatch.setattr(ingestion, "read_table", no_parse)
+    second = excel_controller.preview_excel(_upload("second.csv", CSV))
+    assert second["cache_hit"] is True and second["parse_ms"] is None
+    assert second["rows"] == first["rows"] == 3 and second["preview"] == first["preview"]
+    assert dataset_store.get("second.csv").equals(dataset_store.get("first.csv"))
+
+    # Un contenu différent est analysé
+    monkeypatch.undo()
+    other = excel_controller.preview_excel(_upload("second.csv", CSV + b"rural;grave;60\n"))
+    assert other["cache_hit"] is False and other["rows"] == 4
+    for name in ("first.csv", "second.csv"):
+        dataset_store.remove(name)
+
+
+def _workbook(rows: int) -> bytes:
+    workbook = openpyxl.Workbook()
+    workbook.active.append(["id", "zone"])
+    for i in range(rows):
+        workbook.active.append([i, "urbain" if i % 2 else "rural"])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def test_large_workbook_preview_before_full_parse(monkeypatch):
+    monkeypatch.setattr(excel_controller, "INSTANT_PREVIEW_MIN_BYTES", 0)
+    release = threading.Event()
+    parse = excel_controller._parse_upload
+
+    def slow_parse(*args, **kwargs):
+        release.wait(5)
+        return parse(*args, **kwargs)
+
+    monkeypatch.setattr(excel_controller, "_parse_upload", slow_parse)
+    data = _workbook(50)
+    result = excel_controller.preview_excel(_upload("big.xlsx", data))
+    # Réponse immédiate : en-tête, premières lignes et nombre de lignes déclaré
+    assert result["parse_status"] == "loading" and result["rows"] == 50
+    assert result["columns"] == ["id", "zone"] and [row["id"] for row in result["preview"]] == [0, 1, 2, 3, 4]
+    assert dataset_store.stats()["loading"] == ["big.xlsx"]
+
+    # get() attend la fin de la lecture complète
+    release.set()
+    df = dataset_store.get("big.xlsx")
+    assert len(df) == 50 and df["id"].tolist() == list(range(50))
+    assert df["zone"].astype(str).tolist() == pd.read_excel(io.BytesIO(data))["zone"].tolist()
+    assert dataset_store.stats()["loading"] == []
+    dataset_store.remove("big.xlsx")
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from controllers import excel_controller
+from services.dataset_store import dataset_store
+from services.value_index import ValueIndex
+
+
+@pytest.fixture
+def communes():
+    rng = np.random.default_rng(0)
+    names = ["Nantes", "nancy", "Nice", "Nîmes", "Paris", "Pau", "Lyon", "Saint-Nazaire", "Annecy"]
+    series = pd.Series(rng.choice(names, 300))
+    series[rng.random(300) < 0.1] = None
+    dataset_store.put("villes.xlsx", pd.DataFrame({"ville": series, "n": rng.integers(-5, 50, 300)}))
+    yield series
+    dataset_store.remove("villes.xlsx")
+
+
+@pytest.mark.parametrize("search, match", [("na", "prefix"), ("NA", "prefix"), ("an", "contains"), ("x", "prefix"), ("", "contains")])
+def test_search_matches_filter(communes, search, match):
+    counts = communes.value_counts()
+    expected = sorted(
+        (value for value in counts.index
+         if (value.lower().startswith(search.lower()) if match == "prefix" else search.lower() in value.lower())),
+        key=str.lower,
+    )
+    page = ValueIndex(communes).page(search, match)
+    assert page["unique_values"] == expected
+    assert page["counts"] == [int(counts[value]) for value in expected]
+    assert page["matched_values"] == len(expected) and not page["has_more"]
+
+
+@pytest.mark.parametrize("order", ["value", "count", "appearance"])
+def test_pages_cover_all_values(communes, order):
+    index = ValueIndex(communes)
+    full = index.page(order=order)["unique_values"]
+    pages, offset = [], 0
+    while True:
+        page = index.page(offset=offset, limit=4, order=order)
+        pages += page["unique_values"]
+        offset += 4
+        if not page["has_more"]:
+            break
+    assert pages == full and len(full) == communes.nunique()
+    if order == "appearance":
+        assert full == communes.dropna().unique().tolist()
+    if order == "count":
+        assert index.page(order=order)["counts"] == sorted(communes.value_counts().tolist(), reverse=True)
+
+
+def test_numeric_values_in_numeric_order(communes):
+    page = excel_controller.get_column_unique_values("villes.xlsx", "n", limit=5)
+    assert page["unique_values"] == sorted(set(dataset_store.get("villes.xlsx")["n"].tolist()))[:5]
+    assert page["has_more"] and page["total_unique_values"] == dataset_store.get("villes.xlsx")["n"].nunique()
+
+
+def test_controller_defaults_and_errors(communes):
+    # Sans recherche ni limite : toutes les valeurs, dans l'ordre d'apparition
+    result = excel_controller.get_column_unique_values("villes.xlsx", "ville")
+    assert result["unique_values"] == communes.dropna().unique().tolist()
+    assert "error" in excel_controller.get_column_unique_values("villes.xlsx", "absente")
+    assert "error" in excel_controller.get_column_unique_values("villes.xlsx", "ville", match="regex")
+    assert "error" in excel_controller.get_column_unique_values("villes.xlsx", "ville", order="hasard")
+    assert "error" in excel_controller.get_column_unique_values("villes.xlsx", "ville", offset=-1)
+    assert "error" in excel_controller.get_column_unique_values("villes.xlsx", "ville", limit=0)
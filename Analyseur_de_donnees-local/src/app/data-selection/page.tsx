@@ -7,13 +7,14 @@ import { ArrowLeft, Home } from "lucide-react"
 import { useEffect, useState } from "react"
 import StepProgress from "@/components/ui/step-progress"
 import { API_URL } from "@/lib/api"
+import DataSelectionAccordion from "@/components/ui/data-selection-accordion"
 
 interface RemainingData {
   filename: string
   variables_explicatives: string[]
   variables_a_expliquer: string[]
   remaining_columns: string[]
-  remaining_data: { [columnName: string]: any[] }
+  remaining_cardinalities: { [columnName: string]: number }
   message: string
 }
 
@@ -239,29 +240,14 @@ export default function DataSelection() {
             
             <div className="max-h-96 overflow-y-auto space-y-4 pr-2">
               {filteredColumns.map((columnName) => (
-                <div key={columnName} className="border rounded-lg p-4">
-                  <h4 className="font-semibold text-purple-600 mb-3">📊 {columnName}</h4>
-                  <div className="grid grid-cols-2 md:grid-cols-4 lg:grid-cols-6 gap-2">
-                    {remainingData.remaining_data[columnName]?.map((value, index) => (
-                      <label key={index} className="flex items-center space-x-2 p-2 border rounded hover:bg-gray-50 cursor-pointer">
-                        <input
-                          type="checkbox"
-                          checked={selectedData[columnName]?.includes(value) || false}
-                          onChange={(e) => handleDataSelection(columnName, value, e.target.checked)}
-                          className="h-4 w-4 rounded border-gray-300 text-blue-600 focus:ring-blue-500"
-                        />
-                        <span className="text-sm truncate" title={String(value)}>
-                          {String(value)}
-                        </span>
-                      </label>
-                    ))}
-                  </div>
-                  {selectedData[columnName] && selectedData[columnName].length > 0 && (
-                    <p className="text-xs text-purple-500 mt-2">
-                      {selectedData[columnName].length} valeur(s) sélectionnée(s)
-                    </p>
-                  )}
-                </div>
+                <DataSelectionAccordion
+                  key={columnName}
+                  filename={remainingData.filename}
+                  columnName={columnName}
+                  cardinality={remainingData.remaining_cardinalities?.[columnName] || 0}
+                  selectedData={selectedData[columnName] || []}
+                  onDataSelection={handleDataSelection}
+                />
               ))}
             </div>
           </CardContent>
@@ -7,7 +7,7 @@ import { useEffect, useState } from "react"
 import StepProgress from "@/components/ui/step-progress"
 import DecisionTree from "@/components/ui/decision-tree"
 import QuickEditModal from "@/components/ui/quick-edit-modal"
-import { API_URL } from "@/lib/api"
+import { API_URL, estimateDecisionTree } from "@/lib/api"
 
 interface DecisionTreeData {
   filename: string
@@ -117,6 +117,15 @@ export default function DecisionTreePage() {
       
       formData.append("selected_data", JSON.stringify(allSelectedData))
 
+      // Prévenir avant une construction coûteuse (estimation indisponible : on construit quand même)
+      const estimate = await estimateDecisionTree(formData).catch(() => null)
+      if (estimate?.heavy && !window.confirm(
+        `Construction lourde : environ ${estimate.estimated_nodes.toLocaleString()} nœuds, ` +
+        `${Math.ceil(estimate.estimated_seconds)} s et ${(estimate.estimated_response_bytes / 1e6).toFixed(1)} Mo estimés. Continuer ?`
+      )) {
+        return
+      }
+
       const response = await fetch(`${API_URL}/excel/build-decision-tree`, {
         method: "POST",
         body: formData,
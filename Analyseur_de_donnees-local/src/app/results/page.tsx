@@ -81,6 +81,7 @@ interface AnalysisResult {
   variables_explicatives: string[]
   variables_a_expliquer: string[]
   selected_data: { [columnName: string]: any[] }
+  selected_counts: { [columnName: string]: { counts: number[]; total_rows: number } }
   results: Array<{
     variable_a_expliquer: string
     variables_explicatives: string[]
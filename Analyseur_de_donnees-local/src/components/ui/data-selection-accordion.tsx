@@ -0,0 +1,198 @@
+"use client"
+
+import { useState, useEffect, useRef } from "react"
+import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card"
+import { fetchColumnValues } from "@/lib/api"
+import { ChevronDown, ChevronRight } from "lucide-react"
+
+// Nombre de modalités chargées à la fois
+const PAGE_SIZE = 200
+
+// Composant accordéon pour la sélection des données
+// Les modalités sont chargées page par page à l'ouverture (recherche faite côté serveur)
+export default function DataSelectionAccordion({
+  filename,
+  columnName,
+  cardinality,
+  selectedData,
+  onDataSelection,
+  isBinned = false
+}: {
+  filename: string
+  columnName: string
+  cardinality: number
+  selectedData: any[]
+  onDataSelection: (columnName: string, value: any, checked: boolean) => void
+  isBinned?: boolean
+}) {
+  const [isExpanded, setIsExpanded] = useState(false)
+  const [searchTerm, setSearchTerm] = useState('')
+  const [values, setValues] = useState<any[]>([])
+  const [counts, setCounts] = useState<number[]>([])
+  const [matchedValues, setMatchedValues] = useState(0)
+  const [hasMore, setHasMore] = useState(false)
+  const [loading, setLoading] = useState(false)
+  const [error, setError] = useState<string | null>(null)
+  // Seule la réponse de la dernière requête est prise en compte
+  const requestId = useRef(0)
+
+  const loadPage = async (offset: number) => {
+    const id = ++requestId.current
+    setLoading(true)
+    try {
+      const page = await fetchColumnValues(filename, columnName, {
+        search: searchTerm,
+        match: "contains",
+        offset,
+        limit: PAGE_SIZE,
+      })
+      if (id !== requestId.current) return
+      setValues(prev => offset === 0 ? page.unique_values : [...prev, ...page.unique_values])
+      setCounts(prev => offset === 0 ? page.counts : [...prev, ...page.counts])
+      setMatchedValues(page.matched_values)
+      setHasMore(page.has_more)
+      setError(null)
+    } catch (err) {
+      if (id === requestId.current) {
+        setError(err instanceof Error ? err.message : "Erreur lors du chargement des valeurs")
+      }
+    } finally {
+      if (id === requestId.current) setLoading(false)
+    }
+  }
+
+  // Première page à l'ouverture, puis à chaque modification de la recherche
+  useEffect(() => {
+    if (!isExpanded) return
+    const timer = setTimeout(() => loadPage(0), searchTerm ? 250 : 0)
+    return () => clearTimeout(timer)
+  }, [isExpanded, searchTerm])
+
+  const selectAll = async () => {
+    try {
+      // Toutes les modalités de la colonne, pas seulement celles affichées
+      const page = await fetchColumnValues(filename, columnName)
+      page.unique_values.forEach(value => {
+        if (!selectedData.includes(value)) {
+          onDataSelection(columnName, value, true)
+        }
+      })
+    } catch (err) {
+      setError(err instanceof Error ? err.message : "Erreur lors du chargement des valeurs")
+    }
+  }
+
+  return (
+    <Card className="border-2">
+      <CardHeader
+        className="cursor-pointer hover:bg-gray-50"
+        onClick={() => setIsExpanded(!isExpanded)}
+      >
+        <div className="flex items-center justify-between">
+          <div className="flex-1">
+            <CardTitle className="text-lg">📊 {columnName} {isBinned && (
+              <span className="ml-2 text-[10px] px-2 py-0.5 rounded-full bg-emerald-50 text-emerald-700 border border-emerald-200 align-middle">intervalles</span>
+            )}</CardTitle>
+            <p className="text-sm text-gray-600">
+              {selectedData.length > 0
+                ? `${selectedData.length} valeur(s) sélectionnée(s) sur ${cardinality}`
+                : `${cardinality} modalité(s) - cliquez pour sélectionner les valeurs`
+              }
+            </p>
+          </div>
+
+          <div className="flex items-center space-x-4">
+            {/* Checkbox pour sélectionner toutes les modalités */}
+            <div className="flex items-center space-x-2">
+              <input
+                type="checkbox"
+                checked={selectedData.length === cardinality && cardinality > 0}
+                onClick={(e) => e.stopPropagation()}
+                onChange={(e) => {
+                  e.stopPropagation()
+                  if (e.target.checked) {
+                    // Cocher toutes les modalités
+                    selectAll()
+                  } else {
+                    // Décocher toutes les modalités
+                    selectedData.forEach(value => {
+                      onDataSelection(columnName, value, false)
+                    })
+                  }
+                }}
+                className="h-4 w-4 rounded border-gray-300 text-blue-600 focus:ring-blue-500"
+              />
+
+            </div>
+
+            {/* Indicateur d'expansion */}
+            {isExpanded ? (
+              <ChevronDown className="h-5 w-5 text-gray-500" />
+            ) : (
+              <ChevronRight className="h-5 w-5 text-gray-500" />
+            )}
+          </div>
+        </div>
+      </CardHeader>
+
+      {isExpanded && (
+        <CardContent>
+          {/* Barre de recherche pour les modalités */}
+          <div className="mb-4">
+            <div className="relative">
+              <input
+                type="text"
+                placeholder="🔍 Rechercher une modalité..."
+                value={searchTerm}
+                onChange={(e) => setSearchTerm(e.target.value)}
+                className="w-full px-4 py-2 pl-10 border border-gray-300 rounded-lg focus:ring-2 focus:ring-blue-500 focus:border-transparent"
+              />
+              <div className="absolute inset-y-0 left-0 pl-3 flex items-center pointer-events-none">
+                <svg className="h-5 w-5 text-gray-400" fill="none" stroke="currentColor" viewBox="0 0 24 24">
+                  <path strokeLinecap="round" strokeLinejoin="round" strokeWidth={2} d="M21 21l-6-6m2-5a7 7 0 11-14 0 7 7 0 0114 0z" />
+                </svg>
+              </div>
+            </div>
+            {searchTerm && (
+              <p className="text-sm text-gray-500 mt-1">
+                {matchedValues} modalité(s) trouvée(s) sur {cardinality}
+              </p>
+            )}
+            {error && (
+              <p className="text-sm text-red-600 mt-1">{error}</p>
+            )}
+          </div>
+
+          <div className="grid grid-cols-2 md:grid-cols-4 lg:grid-cols-6 gap-2">
+            {values.map((value, index) => (
+              <label key={index} className="flex items-center space-x-2 p-2 border rounded hover:bg-gray-50 cursor-pointer">
+                <input
+                  type="checkbox"
+                  checked={selectedData.includes(value)}
+                  onChange={(e) => onDataSelection(columnName, value, e.target.checked)}
+                  className="h-4 w-4 rounded border-gray-300 text-blue-600 focus:ring-blue-500"
+                />
+                <span className="text-sm truncate" title={`${String(value)} (${counts[index]} lignes)`}>
+                  {String(value)}
+                </span>
+              </label>
+            ))}
+          </div>
+
+          {(hasMore || loading) && (
+            <div className="mt-3 text-center">
+              <button
+                type="button"
+                disabled={loading}
+                onClick={() => loadPage(values.length)}
+                className="text-sm text-blue-600 hover:underline disabled:text-gray-400"
+              >
+                {loading ? "Chargement..." : `Afficher plus (${values.length} sur ${matchedValues})`}
+              </button>
+            </div>
+          )}
+        </CardContent>
+      )}
+    </Card>
+  )
+}
@@ -6,6 +6,7 @@ import { Button } from "@/components/ui/button"
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card"
 import { useRouter } from "next/navigation"
 import { API_URL } from "@/lib/api"
+import DataSelectionAccordion from "@/components/ui/data-selection-accordion"
 import { ChevronDown, ChevronRight, Home } from "lucide-react"
 
 interface PreviewData {
@@ -27,135 +28,10 @@ interface RemainingData {
   variables_explicatives: string[]
   variables_a_expliquer: string[]
   remaining_columns: string[]
-  remaining_data: { [columnName: string]: any[] }
+  remaining_cardinalities: { [columnName: string]: number }
   message: string
 }
 
-// Composant accordéon pour la sélection des données
-function DataSelectionAccordion({ 
-  columnName, 
-  data, 
-  selectedData, 
-  onDataSelection,
-  isBinned = false
-}: { 
-  columnName: string
-  data: any[]
-  selectedData: any[]
-  onDataSelection: (columnName: string, value: any, checked: boolean) => void
-  isBinned?: boolean
-}) {
-  const [isExpanded, setIsExpanded] = useState(false)
-  const [searchTerm, setSearchTerm] = useState('')
-
-  return (
-    <Card className="border-2">
-      <CardHeader 
-        className="cursor-pointer hover:bg-gray-50"
-        onClick={() => setIsExpanded(!isExpanded)}
-      >
-        <div className="flex items-center justify-between">
-          <div className="flex-1">
-            <CardTitle className="text-lg">📊 {columnName} {isBinned && (
-              <span className="ml-2 text-[10px] px-2 py-0.5 rounded-full bg-emerald-50 text-emerald-700 border border-emerald-200 align-middle">intervalles</span>
-            )}</CardTitle>
-            <p className="text-sm text-gray-600">
-              {selectedData.length > 0 
-                ? `${selectedData.length} valeur(s) sélectionnée(s)` 
-                : "Cliquez pour sélectionner les valeurs"
-              }
-            </p>
-          </div>
-          
-          <div className="flex items-center space-x-4">
-            {/* Checkbox pour sélectionner toutes les modalités */}
-            <div className="flex items-center space-x-2">
-              <input
-                type="checkbox"
-                checked={selectedData.length === data.length && data.length > 0}
-                onChange={(e) => {
-                  e.stopPropagation()
-                  if (e.target.checked) {
-                    // Cocher toutes les modalités
-                    data.forEach(value => {
-                      if (!selectedData.includes(value)) {
-                        onDataSelection(columnName, value, true)
-                      }
-                    })
-                  } else {
-                    // Décocher toutes les modalités
-                    selectedData.forEach(value => {
-                      onDataSelection(columnName, value, false)
-                    })
-                  }
-                }}
-                className="h-4 w-4 rounded border-gray-300 text-blue-600 focus:ring-blue-500"
-              />
-
-            </div>
-            
-            {/* Indicateur d'expansion */}
-            {isExpanded ? (
-              <ChevronDown className="h-5 w-5 text-gray-500" />
-            ) : (
-              <ChevronRight className="h-5 w-5 text-gray-500" />
-            )}
-          </div>
-        </div>
-      </CardHeader>
-      
-      {isExpanded && (
-        <CardContent>
-          {/* Barre de recherche pour les modalités */}
-          <div className="mb-4">
-            <div className="relative">
-              <input
-                type="text"
-                placeholder="🔍 Rechercher une modalité..."
-                value={searchTerm}
-                onChange={(e) => setSearchTerm(e.target.value)}
-                className="w-full px-4 py-2 pl-10 border border-gray-300 rounded-lg focus:ring-2 focus:ring-blue-500 focus:border-transparent"
-              />
-              <div className="absolute inset-y-0 left-0 pl-3 flex items-center pointer-events-none">
-                <svg className="h-5 w-5 text-gray-400" fill="none" stroke="currentColor" viewBox="0 0 24 24">
-                  <path strokeLinecap="round" strokeLinejoin="round" strokeWidth={2} d="M21 21l-6-6m2-5a7 7 0 11-14 0 7 7 0 0114 0z" />
-                </svg>
-              </div>
-            </div>
-            {searchTerm && (
-              <p className="text-sm text-gray-500 mt-1">
-                {data.filter((value: any) => 
-                  String(value).toLowerCase().includes(searchTerm.toLowerCase())
-                ).length} modalité(s) trouvée(s) sur {data.length}
-              </p>
-            )}
-          </div>
-          
-          <div className="grid grid-cols-2 md:grid-cols-4 lg:grid-cols-6 gap-2">
-            {data
-              .filter((value: any) => 
-                !searchTerm || String(value).toLowerCase().includes(searchTerm.toLowerCase())
-              )
-              .map((value, index) => (
-              <label key={index} className="flex items-center space-x-2 p-2 border rounded hover:bg-gray-50 cursor-pointer">
-                <input
-                  type="checkbox"
-                  checked={selectedData.includes(value)}
-                  onChange={(e) => onDataSelection(columnName, value, e.target.checked)}
-                  className="h-4 w-4 rounded border-gray-300 text-blue-600 focus:ring-blue-500"
-                />
-                <span className="text-sm truncate" title={String(value)}>
-                  {String(value)}
-                </span>
-              </label>
-            ))}
-          </div>
-        </CardContent>
-      )}
-    </Card>
-  )
-}
-
 interface ExcelPreviewProps {
   onStepChange?: (step: number, title: string) => void
 }
@@ -1285,8 +1161,9 @@ export default function ExcelPreview({ onStepChange }: ExcelPreviewProps) {
                 return (
                 <DataSelectionAccordion
                   key={columnName}
+                  filename={remainingData?.filename || ''}
                   columnName={columnName}
-                  data={remainingData?.remaining_data[columnName] || []}
+                  cardinality={remainingData?.remaining_cardinalities?.[columnName] || 0}
                   selectedData={selectedRemainingData[columnName] || []}
                   onDataSelection={handleDataSelection}
                   isBinned={isBinned}
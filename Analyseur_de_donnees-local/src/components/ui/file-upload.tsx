@@ -41,13 +41,13 @@ const { file, setFile } = useFile()
 
   const processFiles = (newFiles: File[]) => {
     const excelFiles = newFiles.filter((file) =>
-      file.name.toLowerCase().endsWith(".xlsx") || file.name.toLowerCase().endsWith(".xls")
+      [".xlsx", ".xls", ".csv", ".parquet"].some((ext) => file.name.toLowerCase().endsWith(ext))
     )
 
     if (excelFiles.length > 0) {
       setFile(excelFiles[0]) // ✅ on garde le vrai File
     } else if (newFiles.length > 0) {
-      alert("Aucun fichier Excel valide détecté. Veuillez sélectionner un fichier .xlsx ou .xls")
+      alert("Aucun fichier valide détecté. Veuillez sélectionner un fichier .xlsx, .xls, .csv ou .parquet")
     }
   }
 
@@ -109,14 +109,14 @@ const { file, setFile } = useFile()
             Sélectionner un fichier Excel
           </Button>
 
-          <p className="text-xs text-muted-foreground">Formats supportés: .xlsx, .xls (Max 50MB)</p>
+          <p className="text-xs text-muted-foreground">Formats supportés: .xlsx, .xls, .csv, .parquet (Max 50MB)</p>
 
           <input
             ref={fileInputRef}
             type="file"
             className="hidden"
             onChange={handleFileSelect}
-            accept=".xlsx,.xls,application/vnd.openxmlformats-officedocument.spreadsheetml.sheet,application/vnd.ms-excel"
+            accept=".xlsx,.xls,.csv,.parquet,application/vnd.openxmlformats-officedocument.spreadsheetml.sheet,application/vnd.ms-excel,text/csv"
           />
         </CardContent>
       </Card>
@@ -1,3 +1,67 @@
 export const API_URL = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000";
 
+export interface ColumnValuesPage {
+  unique_values: any[]
+  counts: number[]
+  matched_values: number
+  total_unique_values: number
+  has_more: boolean
+}
 
+// Valeurs uniques d'une colonne (avec effectifs), filtrées et paginées côté serveur.
+// Sans option : toutes les valeurs de la colonne.
+export async function fetchColumnValues(
+  filename: string,
+  columnName: string,
+  options: { search?: string; match?: "prefix" | "contains"; offset?: number; limit?: number } = {}
+): Promise<ColumnValuesPage> {
+  const formData = new FormData()
+  formData.append("filename", filename)
+  formData.append("column_name", columnName)
+  if (options.search) formData.append("search", options.search)
+  if (options.match) formData.append("match", options.match)
+  if (options.offset !== undefined) formData.append("offset", String(options.offset))
+  if (options.limit !== undefined) formData.append("limit", String(options.limit))
+
+  const response = await fetch(`${API_URL}/excel/get-column-values`, {
+    method: "POST",
+    body: formData,
+  })
+  if (!response.ok) {
+    const errorText = await response.text()
+    throw new Error(`Erreur HTTP: ${response.status} - ${errorText}`)
+  }
+  const result = await response.json()
+  if (result.error) {
+    throw new Error(result.error)
+  }
+  return result
+}
+
+export interface DecisionTreeEstimate {
+  filtered_sample_size: number
+  trees: number
+  worst_case_depth: number
+  estimated_nodes: number
+  estimated_response_bytes: number
+  estimated_seconds: number
+  heavy: boolean
+}
+
+// Coût estimé d'une construction d'arbre (mêmes champs que /excel/build-decision-tree),
+// calculé sans construire l'arbre.
+export async function estimateDecisionTree(formData: FormData): Promise<DecisionTreeEstimate> {
+  const response = await fetch(`${API_URL}/excel/estimate-decision-tree`, {
+    method: "POST",
+    body: formData,
+  })
+  if (!response.ok) {
+    const errorText = await response.text()
+    throw new Error(`Erreur HTTP: ${response.status} - ${errorText}`)
+  }
+  const result = await response.json()
+  if (result.error) {
+    throw new Error(result.error)
+  }
+  return result
+}